@@ -0,0 +1,151 @@
+import pandas as pd
+import numpy as np
+
+import stale_gios as sg
+
+#Epizody smogowe: średnie kroczące 24h i 8h oraz ciągłe okresy, w których średnia 24h przekracza próg, dla każdej
+#stacji. Wszystko liczone na całej macierzy godzinowej (czas x stacja) naraz - średnie kroczące z sum skumulowanych,
+#a epizody przez kodowanie długości serii (różnice maski przekroczeń), bez pętli po stacjach.
+
+KOLUMNA_DATY = "Miejscowość_Kod stacji"
+PROG = sg.NORMA
+MIN_GODZIN = 24
+#Średnia krocząca liczona, gdy w oknie jest co najmniej 75% pomiarów (18 z 24, 6 z 8)
+MIN_POKRYCIE = 0.75
+DOKLADNOSC = 6
+
+#--------------------------------------------------------------------------------------------
+
+def macierz_godzinowa(df: pd.DataFrame) -> tuple[pd.DatetimeIndex, np.ndarray]:
+    """
+    Funkcja układa dane godzinowe na ciągłej osi czasu (brakujące godziny jako NaN)
+
+    :param df: df z danymi godzinowymi (kolumna z datą + kolumny stacji)
+    :return: Oś czasu (godziny) oraz macierz wartości (czas, stacja)
+    """
+    czas = pd.DatetimeIndex(pd.to_datetime(df[KOLUMNA_DATY]))
+    #Pomiar o północy przypisany jest do poprzedniego dnia (poprzedni_dzien) - na osi czasu to koniec tej doby
+    czas = czas + pd.to_timedelta((czas.hour == 0).astype(int), unit="D")
+
+    wartosci = df.drop(columns=KOLUMNA_DATY).to_numpy(dtype="float64")
+    os_czasu = pd.date_range(czas.min(), czas.max(), freq="h")
+
+    macierz = np.full((len(os_czasu), wartosci.shape[1]), np.nan)
+    macierz[os_czasu.get_indexer(czas)] = wartosci
+
+    return os_czasu, macierz
+
+
+def srednie_kroczace(macierz: np.ndarray, okno: int, min_pomiarow: int | None = None) -> np.ndarray:
+    """
+    Funkcja liczy średnie kroczące z okna kończącego się na danej godzinie (jak rolling(okno).mean() w pandas)
+
+    :param macierz: Macierz wartości (czas, stacja)
+    :param okno: Długość okna w godzinach
+    :param min_pomiarow: Minimalna liczba pomiarów w oknie (domyślnie MIN_POKRYCIE okna)
+    :return: Macierz średnich kroczących (NaN przy zbyt małej liczbie pomiarów)
+    """
+    if min_pomiarow is None:
+        min_pomiarow = int(np.ceil(okno * MIN_POKRYCIE))
+
+    n = len(macierz)
+    jest = ~np.isnan(macierz)
+
+    #Suma i liczba pomiarów w oknie to różnica sum skumulowanych odległych o okno wierszy
+    #(pierwsze okno-1 godzin - okna niepełne, od początku danych)
+    suma_okna = np.cumsum(np.where(jest, macierz, 0.0), axis=0)
+    liczba_okna = np.cumsum(jest, axis=0, dtype=np.int32)
+    if n > okno:
+        suma_okna[okno:] -= suma_okna[:n - okno].copy()
+        liczba_okna[okno:] -= liczba_okna[:n - okno].copy()
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        srednie = suma_okna / liczba_okna
+    srednie[liczba_okna < max(min_pomiarow, 1)] = np.nan
+
+    #Różnica dużych sum skumulowanych ma błąd zaokrągleń rzędu 1e-12 - bez zaokrąglenia średnia równa
+    #progowi (np. 25.0) potrafi go "przekroczyć"
+    return np.round(srednie, DOKLADNOSC, out=srednie)
+
+
+def serie(maska: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Funkcja znajduje ciągłe serie wartości True w każdej kolumnie maski (kodowanie długości serii)
+
+    :param maska: Maska (czas, stacja)
+    :return: Numery stacji, godziny początku i godziny końca (włącznie) serii - posortowane po stacji i czasie
+    """
+    #Ramka z False na obu końcach - każda seria ma wtedy dokładnie jeden początek (+1) i jeden koniec (-1)
+    ramka = np.zeros((maska.shape[0] + 2, maska.shape[1]), dtype=np.int8)
+    ramka[1:-1] = maska
+    zmiany = np.diff(ramka, axis=0).T
+
+    stacja, poczatek = np.nonzero(zmiany == 1)
+    _, koniec = np.nonzero(zmiany == -1)
+
+    return stacja, poczatek, koniec - 1
+
+
+def maksima_serii(macierz: np.ndarray, stacja: np.ndarray, poczatek: np.ndarray, koniec: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Funkcja zwraca wartość maksymalną i godzinę jej pierwszego wystąpienia w każdej serii
+
+    :param macierz: Macierz wartości (czas, stacja)
+    :param stacja: Numery stacji serii
+    :param poczatek: Godziny początku serii
+    :param koniec: Godziny końca serii (włącznie)
+    :return: Maksima serii (-inf dla serii bez wartości) oraz godziny maksimów
+    """
+    if len(stacja) == 0:
+        return np.array([]), np.array([], dtype=int)
+
+    #Wartości wszystkich serii zebrane jedna za drugą - serie to kolejne przedziały od "przesuniecia"
+    dlugosci = koniec - poczatek + 1
+    przesuniecia = np.cumsum(dlugosci) - dlugosci
+    nr_serii = np.repeat(np.arange(len(stacja)), dlugosci)
+    godzina = poczatek[nr_serii] + np.arange(len(nr_serii)) - przesuniecia[nr_serii]
+    wartosci = np.nan_to_num(macierz[godzina, stacja[nr_serii]], nan=-np.inf)
+
+    maksima = np.maximum.reduceat(wartosci, przesuniecia)
+
+    #Pierwsze trafienie maksimum w każdej serii (każda seria ma co najmniej jedno)
+    trafienia = np.flatnonzero(wartosci == maksima[nr_serii])
+    _, pierwsze = np.unique(nr_serii[trafienia], return_index=True)
+
+    return maksima, godzina[trafienia[pierwsze]]
+
+
+def znajdz_epizody(df: pd.DataFrame, prog: float = PROG, min_godzin: int = MIN_GODZIN) -> pd.DataFrame:
+    """
+    Funkcja wyznacza epizody smogowe - ciągłe okresy, w których średnia krocząca 24h przekracza próg
+    (co najmniej min_godzin godzin), z ich szczytami średniej 24h i 8h
+
+    :param df: df z danymi godzinowymi (kolumna z datą + kolumny stacji)
+    :param prog: Próg średniej 24h [µg/m³]
+    :param min_godzin: Minimalna długość epizodu w godzinach
+    :return: df z epizodami (wiersz na epizod)
+    """
+    stacje = df.columns.drop(KOLUMNA_DATY)
+    os_czasu, macierz = macierz_godzinowa(df)
+
+    srednie_24h = srednie_kroczace(macierz, 24)
+    srednie_8h = srednie_kroczace(macierz, 8)
+
+    stacja, poczatek, koniec = serie(srednie_24h > prog)
+    godziny = koniec - poczatek + 1
+    dlugie = godziny >= min_godzin
+    stacja, poczatek, koniec, godziny = stacja[dlugie], poczatek[dlugie], koniec[dlugie], godziny[dlugie]
+
+    szczyt_24h, godzina_szczytu = maksima_serii(srednie_24h, stacja, poczatek, koniec)
+    szczyt_8h, _ = maksima_serii(srednie_8h, stacja, poczatek, koniec)
+
+    return pd.DataFrame({
+        "Miejscowosc": [stacje[s].split('_')[0] for s in stacja],
+        "Kod stacji": [stacje[s].split('_')[-1] for s in stacja],
+        "Poczatek": os_czasu[poczatek],
+        "Koniec": os_czasu[koniec],
+        "Godziny": godziny,
+        "Szczyt_24h": np.round(szczyt_24h, 2),
+        "Czas_szczytu_24h": os_czasu[godzina_szczytu],
+        "Szczyt_8h": np.round(np.where(np.isinf(szczyt_8h), np.nan, szczyt_8h), 2),
+    })
@@ -0,0 +1,294 @@
+import fcntl
+import glob
+import io
+import json
+import os
+import re
+import shutil
+import zipfile
+from typing import Any
+
+import wczytywanie_i_czyszczenie_danych as wicd
+import stale_gios as sg
+
+import sesja_http
+import historia_uruchomien as hist
+
+#Katalog archiwum GIOŚ: rok -> identyfikator archiwum -> nazwa pliku PM2.5 (dane 1-godzinne) w archiwum.
+#Katalog zapisywany jest w pliku json i uzupełniany tylko o brakujące lata:
+# - identyfikatory z listy archiwum (zapisana strona html lub adres) albo z lokalnego lustra (katalog z plikami zip),
+# - nazwy plików z listy plików pobranego archiwum (wzorzec nazwy), bez dodatkowych pobrań.
+
+KATALOG_PLIK = "results/pm25/surowe/katalog_gios.json"
+
+#Nazwy plików różnią się między latami (2014_PM2.5_1g.xlsx, 2015_PM25_1g.xlsx, ...)
+WZORZEC_PM25 = re.compile(r"(?:^|/)(\d{4})_PM2\.?5_1g\.xlsx$", re.IGNORECASE)
+#Link do pliku na stronie archiwum: <a href=".../downloadFile/322">2019.zip</a>
+WZORZEC_LINKU = re.compile(r'href="[^"]*downloadFile/(\d+)"[^>]*>(.*?)</a>', re.IGNORECASE | re.DOTALL)
+WZORZEC_ROKU = re.compile(r"\b((?:19|20)\d{2})\b")
+#Archiwum danych roku to link nazwany samym rokiem ("2019", "2019.zip") albo z opisem danych pomiarowych.
+#Raporty, statystyki i metadane z rokiem w nazwie pomijamy, nawet jeśli są na liście przed archiwum danych.
+WZORZEC_ARCHIWUM_ROKU = re.compile(r"^\s*(?:19|20)\d{2}(?:\.zip)?\s*$", re.IGNORECASE)
+SLOWA_POMIAROW = ("pomiar", "dane", "measurement", "pm2")
+SLOWA_POMOCNICZE = ("metadane", "statystyk", "raport", "kody", "opis")
+
+
+def katalog_wbudowany() -> dict[str, Any]:
+    """
+    Funkcja zwraca katalog z danymi znanymi wcześniej (identyfikatory wpisane dotąd w kodzie)
+
+    :return: Słownik katalogu
+    """
+    return {
+        "lata": {
+            str(rok): {"id": gios_id, "plik": sg.GIOS_PM25_FILE.get(rok)}
+            for rok, gios_id in sg.GIOS_URL_IDS.items()
+        },
+        "metadane": {"id": sg.GIOS_METADANE_ID, "plik": sg.GIOS_METADANE_FILE},
+    }
+
+#----------------------------------------ZAPIS_ODCZYT-------------------------------------------
+
+def wczytaj_katalog(path: str = KATALOG_PLIK) -> dict[str, Any]:
+    """
+    Funkcja wczytuje zapisany katalog (uzupełniony o dane wbudowane)
+
+    :param path: Ścieżka katalogu
+    :return: Słownik katalogu
+    """
+    katalog = katalog_wbudowany()
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            zapisany = json.load(f)
+        katalog["lata"].update(zapisany.get("lata", {}))
+        katalog["metadane"].update(zapisany.get("metadane", {}))
+
+    return katalog
+
+
+def aktualizuj_katalog(zmiany: dict[str, dict[str, Any]], path: str = KATALOG_PLIK) -> dict[str, Any]:
+    """
+    Funkcja dopisuje wpisy lat do katalogu na dysku - pod blokadą pliku, bo lata przetwarzane są w równoległych jobach
+
+    :param zmiany: Słownik rok -> pola wpisu do uzupełnienia
+    :param path: Ścieżka katalogu
+    :return: Zaktualizowany katalog
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+        katalog = wczytaj_katalog(path)
+        for rok, pola in zmiany.items():
+            katalog["lata"].setdefault(str(rok), {}).update(pola)
+
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(katalog, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+    finally:
+        os.close(fd)
+
+    return katalog
+
+#----------------------------------------ODKRYWANIE-------------------------------------------
+
+def parsuj_liste(html: str) -> dict[str, dict[str, Any]]:
+    """
+    Funkcja wyciąga identyfikatory archiwów danych pomiarowych z listy archiwum GIOŚ
+
+    :param html: Treść strony z listą archiwum
+    :return: Słownik rok -> {"id": identyfikator}
+    """
+    lata = {}
+    for gios_id, opis in WZORZEC_LINKU.findall(html):
+        opis = re.sub(r"<[^>]+>", " ", opis).strip()
+        rok = WZORZEC_ROKU.search(opis)
+        if rok is None or not czy_archiwum_danych(opis):
+            continue
+        lata.setdefault(rok.group(1), {"id": gios_id})
+
+    return lata
+
+
+def czy_archiwum_danych(opis: str) -> bool:
+    """
+    Funkcja sprawdza czy opis linku z listy archiwum wskazuje archiwum danych pomiarowych roku
+
+    :param opis: Tekst linku
+    :return: "True" dla archiwum danych, "False" dla plików pomocniczych (metadane, statystyki, raporty)
+    """
+    opis = opis.lower()
+    if any(slowo in opis for slowo in SLOWA_POMOCNICZE):
+        return False
+
+    return bool(WZORZEC_ARCHIWUM_ROKU.match(opis)) or any(slowo in opis for slowo in SLOWA_POMIAROW)
+
+
+def plik_pm25(nazwy: list[str], rok: int | None = None) -> str | None:
+    """
+    Funkcja wybiera z listy plików archiwum plik z danymi 1-godzinnymi PM2.5
+
+    :param nazwy: Nazwy plików w archiwum
+    :param rok: Jeśli podany - tylko plik z tego roku
+    :return: Nazwa pliku albo "None"
+    """
+    for nazwa in nazwy:
+        dopasowanie = WZORZEC_PM25.search(nazwa)
+        if dopasowanie and (rok is None or int(dopasowanie.group(1)) == rok):
+            return nazwa
+
+    return None
+
+
+def skanuj_lustro(katalog_lustra: str) -> dict[str, dict[str, Any]]:
+    """
+    Funkcja indeksuje lokalne lustro archiwum - pliki zip nazwane identyfikatorem archiwum (np. 322.zip).
+    Czytany jest tylko spis plików zip, bez rozpakowywania.
+
+    :param katalog_lustra: Katalog z archiwami
+    :return: Słownik rok -> {"id", "plik", "lustro"}
+    """
+    lata = {}
+    for path in sorted(glob.glob(os.path.join(katalog_lustra, "*.zip"))):
+        try:
+            with zipfile.ZipFile(path) as z:
+                nazwa = plik_pm25(z.namelist())
+        except zipfile.BadZipFile:
+            continue
+        if nazwa is None:
+            continue
+
+        rok = WZORZEC_PM25.search(nazwa).group(1)
+        gios_id = os.path.splitext(os.path.basename(path))[0]
+        lata[rok] = {"id": gios_id, "plik": nazwa, "lustro": os.path.abspath(path)}
+
+    return lata
+
+
+def odswiez_katalog(lista: str | None = None, lustro: str | None = None, path: str = KATALOG_PLIK) -> dict[str, Any]:
+    """
+    Funkcja uzupełnia katalog z listy archiwum i/lub lokalnego lustra i zapisuje go
+
+    :param lista: Ścieżka zapisanej strony z listą archiwum albo jej adres (http...)
+    :param lustro: Katalog lokalnego lustra archiwum
+    :param path: Ścieżka katalogu
+    :return: Zaktualizowany katalog
+    """
+    zmiany = {}
+
+    if lista:
+        if lista.startswith("http"):
+            html = sesja_http.pobierz(lista).text
+        else:
+            with open(lista, encoding="utf-8") as f:
+                html = f.read()
+        zmiany.update(parsuj_liste(html))
+
+    if lustro:
+        for rok, wpis in skanuj_lustro(lustro).items():
+            zmiany.setdefault(rok, {}).update(wpis)
+
+    return aktualizuj_katalog(zmiany, path)
+
+#----------------------------------------ROZWIAZYWANIE-------------------------------------------
+
+def adres_archiwum(config: dict[str, Any] | None = None) -> str:
+    """
+    Funkcja zwraca adres archiwum GIOŚ - z configu (adres_gios, np. lokalny serwer testowy) albo domyślny
+
+    :param config: słownik reprezentujący config (pm25.yaml)
+    :return: Adres archiwum (zakończony "/")
+    """
+    return (config or {}).get("adres_gios") or sg.GIOS_ARCHIVE_URL
+
+
+def wpis_roku(year: int, config: dict[str, Any] | None = None, path: str = KATALOG_PLIK) -> dict[str, Any]:
+    """
+    Funkcja zwraca wpis katalogu dla roku. Jeśli roku nie ma w katalogu - jednorazowo odświeża katalog
+    ze źródeł z configu (lista_gios, lustro_gios).
+
+    :param year: Rok danych
+    :param config: słownik reprezentujący config (pm25.yaml)
+    :param path: Ścieżka katalogu
+    :return: Wpis z polami "id" i opcjonalnie "plik", "lustro"
+    """
+    config = config or {}
+    katalog = wczytaj_katalog(path)
+
+    if str(year) not in katalog["lata"] and (config.get("lista_gios") or config.get("lustro_gios")):
+        katalog = odswiez_katalog(config.get("lista_gios"), config.get("lustro_gios"), path)
+
+    if str(year) not in katalog["lata"]:
+        raise ValueError(f"Brak roku {year} w katalogu archiwum GIOŚ - podaj lista_gios lub lustro_gios w pm25.yaml")
+
+    return katalog["lata"][str(year)]
+
+
+def rozwiaz_plik(year: int, archiwum: bytes | str, path: str = KATALOG_PLIK) -> str:
+    """
+    Funkcja zwraca nazwę pliku PM2.5 w pobranym archiwum - z katalogu albo ze spisu plików zip (wynik zapisywany w katalogu)
+
+    :param year: Rok danych
+    :param archiwum: Zawartość archiwum albo ścieżka do pliku zip
+    :param path: Ścieżka katalogu
+    :return: Nazwa pliku w archiwum
+    """
+    wpis = wczytaj_katalog(path)["lata"].get(str(year), {})
+    if wpis.get("plik"):
+        return wpis["plik"]
+
+    with zipfile.ZipFile(io.BytesIO(archiwum) if isinstance(archiwum, bytes) else archiwum) as z:
+        nazwa = plik_pm25(z.namelist(), year)
+
+    if nazwa is None:
+        raise ValueError(f"Brak pliku z danymi 1-godzinnymi PM2.5 dla roku {year} w archiwum")
+
+    aktualizuj_katalog({str(year): {"plik": nazwa}}, path)
+    return nazwa
+
+
+def pobierz_archiwum(year: int, config: dict[str, Any] | None = None, path: str = KATALOG_PLIK) -> bytes:
+    """
+    Funkcja zwraca zawartość archiwum roku - z lokalnego lustra, jeśli jest w katalogu, inaczej pobiera je z GIOŚ
+
+    :param year: Rok danych
+    :param config: słownik reprezentujący config (pm25.yaml)
+    :param path: Ścieżka katalogu
+    :return: Zawartość archiwum zip
+    """
+    wpis = wpis_roku(year, config, path)
+
+    if wpis.get("lustro") and os.path.exists(wpis["lustro"]):
+        with open(wpis["lustro"], "rb") as f:
+            return f.read()
+
+    return wicd.pobierz_plik_gios(wpis["id"], adres_archiwum(config))
+
+
+def pobierz_archiwum_do(year: int, output: str, config: dict[str, Any] | None = None, path: str = KATALOG_PLIK) -> None:
+    """
+    Funkcja zapisuje archiwum roku do pliku - kopiuje je z lokalnego lustra albo pobiera z GIOŚ kawałkami prosto
+    na dysk (bez trzymania całego archiwum w pamięci)
+
+    :param year: Rok danych
+    :param output: Ścieżka pliku zip
+    :param config: słownik reprezentujący config (pm25.yaml)
+    :param path: Ścieżka katalogu
+    """
+    wpis = wpis_roku(year, config, path)
+
+    #Lustro jako cache archiwum - trafienia i chybienia trafiają do historii uruchomień
+    if wpis.get("lustro") and os.path.exists(wpis["lustro"]):
+        hist.dolicz("cache_trafienia")
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        tmp = f"{output}.tmp"
+        shutil.copyfile(wpis["lustro"], tmp)
+        os.replace(tmp, output)
+        return
+
+    hist.dolicz("cache_chybienia")
+    wicd.pobierz_plik_gios_do(wpis["id"], adres_archiwum(config), output)
+
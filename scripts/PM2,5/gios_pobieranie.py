@@ -0,0 +1,209 @@
+import json
+import os
+import re
+import time
+import zipfile
+import zlib
+from typing import Any
+
+import requests
+import urllib3
+
+import sesja_http
+
+#Pobieranie dużych plików z archiwum GIOŚ: strumieniowo, kawałkami prosto na dysk (plik .part), z wznawianiem
+#przerwanego pobierania zapytaniem Range (od bajtu, na którym się urwało) i sprawdzeniem archiwum zip (rozmiar
+#i sumy CRC wszystkich plików) przed podmianą pliku docelowego. Niepełny plik .part zostaje na dysku, więc
+#także kolejne uruchomienie (np. ponowiony job Snakemake) zaczyna od miejsca przerwania.
+
+#Z sieci czytamy tyle, ile już przyszło (do KAWALEK bajtów) - przy zerwaniu połączenia nic nie przepada,
+#a na dysk zapisujemy przez większy bufor
+KAWALEK = 64 * 1024
+BUFOR_ZAPISU = 1 << 20
+PROBY = 5
+#(połączenie, odczyt) w sekundach - odczyt liczony między kolejnymi kawałkami, nie dla całego pliku
+TIMEOUT = (10, 60)
+OCZEKIWANIE = 1.0
+
+#Plik pobierany bez kompresji transportowej - Range dotyczy wtedy bajtów samego pliku (zip i tak się nie kompresuje)
+NAGLOWKI = {"Accept-Encoding": "identity"}
+ZAKRES = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+BLEDY_POLACZENIA = (requests.ConnectionError, requests.Timeout, urllib3.exceptions.HTTPError)
+
+
+class NiepelnePobieranie(Exception):
+    """
+    Serwer zakończył odpowiedź przed końcem pliku
+    """
+
+#-------------------------------------WERYFIKACJA------------------------------------
+
+def sprawdz_zip(path: str) -> None:
+    """
+    Funkcja sprawdza archiwum zip (także xlsx): spis plików i sumy CRC oraz rozmiary wszystkich plików w archiwum
+
+    :param path: Ścieżka pliku
+    """
+    try:
+        with zipfile.ZipFile(path) as z:
+            uszkodzony = z.testzip()
+    except (zipfile.BadZipFile, zlib.error, EOFError) as e:
+        raise ValueError(f"Uszkodzone archiwum {path}: {e}")
+
+    if uszkodzony is not None:
+        raise ValueError(f"Uszkodzone archiwum {path}: błędna suma CRC pliku {uszkodzony}")
+
+#-------------------------------------STAN_POBIERANIA------------------------------------
+
+def wczytaj_stan(path: str, url: str) -> dict[str, Any]:
+    #Stan niepełnego pobierania (ETag / Last-Modified) - wznawiamy tylko plik z tego samego adresu
+    try:
+        with open(path, encoding="utf-8") as f:
+            stan = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return stan if stan.get("url") == url else {}
+
+
+def zapisz_stan(path: str, stan: dict[str, Any]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(stan, f)
+
+#-------------------------------------POBIERANIE------------------------------------
+
+def pobierz_kawalkami(url: str, czesc: str, stan: dict[str, Any], plik_stanu: str, licznik: dict[str, int],
+                      kawalek: int, timeout: tuple[float, float]) -> None:
+    """
+    Funkcja dopisuje do pliku .part brakującą część pliku (od jego aktualnego rozmiaru)
+
+    :param url: Adres pliku
+    :param czesc: Ścieżka pliku .part
+    :param stan: Stan pobierania (uzupełniany o etag, last_modified, rozmiar)
+    :param plik_stanu: Ścieżka zapisu stanu
+    :param licznik: Licznik pobranych bajtów (klucz "pobrane") - aktualizowany także gdy połączenie się zerwie
+    :param kawalek: Rozmiar kawałka w bajtach
+    :param timeout: Limity czasu (połączenie, odczyt)
+    """
+    poczatek = os.path.getsize(czesc) if os.path.exists(czesc) else 0
+    naglowki = dict(NAGLOWKI)
+    if poczatek:
+        naglowki["Range"] = f"bytes={poczatek}-"
+        #Jeśli plik na serwerze się zmienił, serwer odeśle cały nowy plik (200) zamiast fragmentu starego
+        walidator = stan.get("etag") or stan.get("last_modified")
+        if walidator:
+            naglowki["If-Range"] = walidator
+
+    #Połączenie z puli wspólnej sesji, w limicie jednoczesnych pobrań z hosta
+    with sesja_http.zapytanie("GET", url, headers=naglowki, stream=True, timeout=timeout) as response:
+        if response.status_code == 416:
+            #Zakres za końcem pliku - plik był już pobrany w całości albo .part jest za długi
+            zakres = response.headers.get("Content-Range", "")
+            if zakres == f"bytes */{poczatek}":
+                stan["rozmiar"] = poczatek
+                return
+            os.remove(czesc)
+            raise NiepelnePobieranie(f"Niezgodny rozmiar pobranej części {czesc} - pobieranie od nowa")
+
+        response.raise_for_status()
+
+        tryb = "wb"
+        if response.status_code == 206:
+            zakres = ZAKRES.match(response.headers.get("Content-Range", ""))
+            if zakres is None or int(zakres.group(1)) != poczatek:
+                raise NiepelnePobieranie(f"Nieoczekiwany zakres odpowiedzi: {response.headers.get('Content-Range')}")
+            if zakres.group(3) != "*":
+                stan["rozmiar"] = int(zakres.group(3))
+            tryb = "ab"
+        else:
+            #200 - serwer odsyła cały plik (brak obsługi Range albo plik się zmienił)
+            poczatek = 0
+            dlugosc = response.headers.get("Content-Length")
+            stan["rozmiar"] = int(dlugosc) if dlugosc is not None and "Content-Encoding" not in response.headers else None
+
+        stan["etag"] = response.headers.get("ETag")
+        stan["last_modified"] = response.headers.get("Last-Modified")
+        #Zapis przed pobieraniem danych - przerwany proces też zostawia stan potrzebny do wznowienia
+        zapisz_stan(plik_stanu, stan)
+
+        with open(czesc, tryb, buffering=BUFOR_ZAPISU) as f:
+            while dane := response.raw.read1(kawalek, decode_content=True):
+                f.write(dane)
+                licznik["pobrane"] += len(dane)
+
+    rozmiar = stan.get("rozmiar")
+    if rozmiar is not None and os.path.getsize(czesc) < rozmiar:
+        raise NiepelnePobieranie(f"Pobrano {os.path.getsize(czesc)} z {rozmiar} bajtów")
+
+
+def pobierz_do_pliku(url: str, output: str, kawalek: int = KAWALEK, proby: int = PROBY,
+                     timeout: tuple[float, float] = TIMEOUT, oczekiwanie: float = OCZEKIWANIE,
+                     weryfikuj_zip: bool = True) -> dict[str, Any]:
+    """
+    Funkcja pobiera plik strumieniowo na dysk, wznawiając przerwane pobieranie od miejsca przerwania (Range).
+    Plik docelowy pojawia się dopiero po pobraniu całości i sprawdzeniu archiwum.
+
+    :param url: Adres pliku
+    :param output: Ścieżka pliku docelowego
+    :param kawalek: Rozmiar kawałka czytanego z sieci w bajtach
+    :param proby: Maksymalna liczba prób (każde wznowienie to kolejna próba)
+    :param timeout: Limity czasu (połączenie, odczyt) w sekundach
+    :param oczekiwanie: Czas oczekiwania przed pierwszym ponowieniem (kolejne - dwa razy dłużej)
+    :param weryfikuj_zip: Jeśli "True", plik sprawdzany jest jako archiwum zip (zip, xlsx)
+    :return: Statystyki: rozmiar, pobrane (bajty w tym wywołaniu), czas, mb_s, wznowienia
+    """
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    czesc = f"{output}.part"
+    plik_stanu = f"{czesc}.json"
+
+    stan = wczytaj_stan(plik_stanu, url)
+    if not stan and os.path.exists(czesc):
+        #Część z innego adresu albo bez stanu - nie da się jej bezpiecznie wznowić
+        os.remove(czesc)
+    stan["url"] = url
+
+    start = time.monotonic()
+    licznik = {"pobrane": 0}
+    wznowienia = 0
+
+    for proba in range(proby):
+        if os.path.exists(czesc):
+            wznowienia += 1
+        try:
+            pobierz_kawalkami(url, czesc, stan, plik_stanu, licznik, kawalek, timeout)
+            if weryfikuj_zip:
+                try:
+                    sprawdz_zip(czesc)
+                except ValueError:
+                    #Uszkodzenia nie da się umiejscowić - pobieramy całość od nowa
+                    os.remove(czesc)
+                    raise
+            break
+        except (NiepelnePobieranie, ValueError, *BLEDY_POLACZENIA) as e:
+            if proba == proby - 1:
+                raise RuntimeError(f"Nie udało się pobrać {url} ({proby} prób): {e}") from e
+            print(f"Przerwane pobieranie {url} ({e}) - ponowienie za {oczekiwanie * 2 ** proba:.1f} s")
+            time.sleep(oczekiwanie * 2 ** proba)
+        except requests.HTTPError as e:
+            #Błędy serwera i limity - ponawiamy, pozostałe błędy HTTP (np. 404) od razu zgłaszamy
+            kod = e.response.status_code
+            if (kod < 500 and kod not in (408, 429)) or proba == proby - 1:
+                raise
+            print(f"Błąd HTTP {kod} przy pobieraniu {url} - ponowienie za {oczekiwanie * 2 ** proba:.1f} s")
+            time.sleep(oczekiwanie * 2 ** proba)
+
+    os.replace(czesc, output)
+    if os.path.exists(plik_stanu):
+        os.remove(plik_stanu)
+
+    czas = time.monotonic() - start
+    statystyki = {
+        "rozmiar": os.path.getsize(output),
+        "pobrane": licznik["pobrane"],
+        "czas": round(czas, 3),
+        "mb_s": round(licznik["pobrane"] / 1e6 / czas, 2) if czas > 0 else None,
+        "wznowienia": wznowienia,
+    }
+    print(f"Pobrano {url}: {statystyki['rozmiar'] / 1e6:.1f} MB w {czas:.1f} s "
+          f"({statystyki['mb_s']} MB/s, wznowienia: {wznowienia})")
+
+    return statystyki
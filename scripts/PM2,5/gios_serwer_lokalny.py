@@ -0,0 +1,171 @@
+import argparse
+import hashlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+#Lokalny zamiennik archiwum GIOŚ (downloadFile/<id>) do testów pobierania bez dostępu do GIOŚ:
+#obsługa Range/If-Range i ETag jak na prawdziwym serwerze oraz wstrzykiwanie awarii - zerwanie połączenia
+#po części pliku, uszkodzenie treści, ignorowanie Range i ograniczenie przepustowości.
+
+SCIEZKA = "/pjp/archives/downloadFile/"
+
+#-------------------------------------SERWER------------------------------------
+
+class SerwerGios(ThreadingHTTPServer):
+    """
+    Serwer plików archiwum. Awarie dotyczą kolejnych odpowiedzi:
+     - przerwij_po: po ilu bajtach odpowiedzi zerwać połączenie (dla pierwszych "przerwania" odpowiedzi)
+     - uszkodz: liczba pierwszych odpowiedzi z jednym zmienionym bajtem w środku pliku
+     - bez_range: ignorowanie nagłówka Range (zawsze cały plik, 200)
+     - predkosc: ograniczenie przepustowości w bajtach na sekundę
+    """
+
+    daemon_threads = True
+
+    def __init__(self, pliki: dict[str, bytes], port: int = 0, przerwij_po: int | None = None, przerwania: int = 0,
+                 uszkodz: int = 0, bez_range: bool = False, predkosc: float | None = None):
+        super().__init__(("127.0.0.1", port), ObslugaGios)
+        self.pliki = pliki
+        self.etagi = {nazwa: f'"{hashlib.sha1(dane).hexdigest()}"' for nazwa, dane in pliki.items()}
+        self.przerwij_po = przerwij_po
+        self.przerwania = przerwania
+        self.uszkodz = uszkodz
+        self.bez_range = bez_range
+        self.predkosc = predkosc
+        self.blokada = threading.Lock()
+        self.statystyki = {"zapytania": 0, "zapytania_range": 0, "wyslane_bajty": 0, "zerwane": 0, "uszkodzone": 0}
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}{SCIEZKA}"
+
+    def awaria(self) -> tuple[bool, bool]:
+        """
+        Funkcja rejestruje odpowiedź i zwraca, czy ma ona zerwać połączenie i czy ma być uszkodzona
+
+        :return: Krotka (zerwać, uszkodzić)
+        """
+        with self.blokada:
+            zerwac = self.przerwij_po is not None and self.statystyki["zerwane"] < self.przerwania
+            uszkodzic = self.statystyki["uszkodzone"] < self.uszkodz
+            self.statystyki["zerwane"] += zerwac
+            self.statystyki["uszkodzone"] += uszkodzic
+            return zerwac, uszkodzic
+
+
+class ObslugaGios(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        serwer = self.server
+        with serwer.blokada:
+            serwer.statystyki["zapytania"] += 1
+
+        nazwa = self.path[len(SCIEZKA):] if self.path.startswith(SCIEZKA) else None
+        if nazwa not in serwer.pliki:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        dane = serwer.pliki[nazwa]
+        etag = serwer.etagi[nazwa]
+        zerwac, uszkodzic = serwer.awaria()
+
+        #Range tylko w postaci "bytes=N-" (tak wznawia pobieranie gios_pobieranie), If-Range - zgodność ETag
+        zakres = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        od = 0
+        if zakres and not serwer.bez_range and (if_range is None or if_range == etag):
+            with serwer.blokada:
+                serwer.statystyki["zapytania_range"] += 1
+            od = int(zakres.removeprefix("bytes=").split("-")[0])
+            if od >= len(dane):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(dane)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {od}-{len(dane) - 1}/{len(dane)}")
+        else:
+            self.send_response(200)
+
+        tresc = dane[od:]
+        if uszkodzic and tresc:
+            srodek = len(tresc) // 2
+            tresc = tresc[:srodek] + bytes([tresc[srodek] ^ 0xFF]) + tresc[srodek + 1:]
+
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Length", str(len(tresc)))
+        self.send_header("ETag", etag)
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+
+        if zerwac:
+            tresc = tresc[:serwer.przerwij_po]
+
+        kawalek = 64 * 1024
+        for i in range(0, len(tresc), kawalek):
+            self.wfile.write(tresc[i:i + kawalek])
+            with serwer.blokada:
+                serwer.statystyki["wyslane_bajty"] += len(tresc[i:i + kawalek])
+            if serwer.predkosc:
+                time.sleep(len(tresc[i:i + kawalek]) / serwer.predkosc)
+
+        if zerwac:
+            #Mniej bajtów niż w Content-Length i zamknięte połączenie - jak zerwany transfer
+            self.close_connection = True
+            self.wfile.flush()
+            self.connection.shutdown(2)
+
+
+def uruchom_serwer(pliki: dict[str, bytes], **ustawienia: Any) -> SerwerGios:
+    """
+    Funkcja uruchamia serwer w osobnym wątku (na wolnym porcie)
+
+    :param pliki: Słownik identyfikator pliku -> zawartość
+    :param ustawienia: Parametry SerwerGios (port, przerwij_po, przerwania, uszkodz, bez_range, predkosc)
+    :return: Działający serwer - należy go zamknąć przez shutdown() i server_close()
+    """
+    serwer = SerwerGios(pliki, **ustawienia)
+    threading.Thread(target=serwer.serve_forever, daemon=True).start()
+    return serwer
+
+
+def pliki_z_katalogu(katalog: str) -> dict[str, bytes]:
+    """
+    Funkcja wczytuje pliki <id>.zip / <id>.xlsx z katalogu (jak lokalne lustro archiwum)
+
+    :param katalog: Katalog z plikami
+    :return: Słownik identyfikator -> zawartość
+    """
+    pliki = {}
+    for nazwa in sorted(os.listdir(katalog)):
+        with open(os.path.join(katalog, nazwa), "rb") as f:
+            pliki[os.path.splitext(nazwa)[0]] = f.read()
+    return pliki
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--katalog", required=True, help="Katalog z plikami <id>.zip (jak lustro_gios)")
+    parser.add_argument("--port", type=int, default=8026)
+    parser.add_argument("--przerwij-po", type=int, default=None, help="Zerwij połączenie po tylu bajtach odpowiedzi")
+    parser.add_argument("--przerwania", type=int, default=0, help="Liczba odpowiedzi z zerwanym połączeniem")
+    parser.add_argument("--uszkodz", type=int, default=0, help="Liczba odpowiedzi z uszkodzoną treścią")
+    parser.add_argument("--bez-range", action="store_true")
+    parser.add_argument("--predkosc", type=float, default=None, help="Przepustowość w bajtach na sekundę")
+    args = parser.parse_args()
+
+    serwer = SerwerGios(pliki_z_katalogu(args.katalog), args.port, args.przerwij_po, args.przerwania,
+                        args.uszkodz, args.bez_range, args.predkosc)
+    print(f"Archiwum GIOŚ pod adresem {serwer.url} (adres_gios w pm25.yaml)")
+    serwer.serve_forever()
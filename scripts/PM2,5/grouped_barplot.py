@@ -3,6 +3,8 @@ import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib.figure import Figure
 
+import stale_gios as sg
+
 
 def policz_dni_z_przekroczeniem(df_wejsciowe: pd.DataFrame, lata: list) -> pd.DataFrame:
     """
@@ -22,7 +24,7 @@ def policz_dni_z_przekroczeniem(df_wejsciowe: pd.DataFrame, lata: list) -> pd.Da
     df_dzienne = df.resample('D').mean()
 
     # Jeśli norma przekroczona, oznaczamy to jako 1. Następnie grupujemy po latach i sumujemy (sprowadza się to do sumy jedynek).
-    oznacz_przekroczenie = df_dzienne > 15
+    oznacz_przekroczenie = df_dzienne > sg.NORMA
 
     # Grupujemy po roku wyciągniętym z indeksu (sumowanie od razu jako sum() zamiast dodatkowej linijki)
     wynik = oznacz_przekroczenie.groupby(oznacz_przekroczenie.index.year).sum()
@@ -119,7 +121,7 @@ def policz_przekroczenia_woj(df_wejsciowe, metadane, lata):
 
     #Obliczenia - zapożyczony kod
     df_dzienne = df.resample('D').mean()
-    przekroczenia = (df_dzienne > 15).astype(int)
+    przekroczenia = (df_dzienne > sg.NORMA).astype(int)
     wynik_stacje = przekroczenia.groupby(przekroczenia.index.year).sum()
 
     #Ograniczenie danych do danych lat
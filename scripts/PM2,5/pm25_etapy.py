@@ -0,0 +1,390 @@
+import pandas as pd
+import numpy as np
+import argparse
+import os
+import yaml
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any
+
+import wczytywanie_i_czyszczenie_danych as wicd
+import stale_gios as sg
+
+import historia_uruchomien as hist
+
+#Pipeline PM2.5 podzielony na etapy z zapisanymi wynikami pośrednimi (każdy etap to osobna reguła Snakemake):
+# archiwum/metadane (surowe pliki GIOŚ) -> czyszczenie (dane godzinowe, parquet) -> kostka (średnie dobowe
+# i miesięczne stacji) -> tabele oraz pojedyncze wykresy.
+#Średnie dobowe/miesięczne z kostki mają ten sam format co dane godzinowe (kolumna z datą + kolumny stacji),
+#więc funkcje z zadań 2-5 przyjmują je bez zmian (resample na już uśrednionych danych ich nie zmienia).
+
+KOLUMNA_DATY = "Miejscowość_Kod stacji"
+#Etapy bez odpowiadającej im reguły Snakefile
+ETAPY_POZA_REGULAMI = ("katalog", "przyrost", "zloz")
+
+#----------------------------------------POBIERANIE-------------------------------------------
+
+def etap_archiwum(year: int, output: str, config: dict[str, Any] | None = None) -> None:
+    """
+    Etap pobrania surowego archiwum z danymi godzinowymi dla roku (identyfikator z katalogu archiwum GIOŚ)
+
+    :param year: Rok danych
+    :param output: Ścieżka pliku zip
+    :param config: słownik reprezentujący config (pm25.yaml)
+    """
+    import gios_katalog as kat
+
+    #Pobieranie przez plik .part (wznawiane po przerwaniu) - niepełny wynik nie pojawia się pod ścieżką output
+    kat.pobierz_archiwum_do(year, output, config)
+
+
+def etap_metadane(output: str, config: dict[str, Any] | None = None) -> None:
+    """
+    Etap pobrania metadanych stacji (wspólne dla wszystkich lat)
+
+    :param output: Ścieżka pliku xlsx
+    :param config: słownik reprezentujący config (pm25.yaml) - opcjonalny adres archiwum
+    """
+    import gios_katalog as kat
+
+    wicd.pobierz_plik_gios_do(sg.GIOS_METADANE_ID, kat.adres_archiwum(config), output)
+
+
+def wczytaj_config(path: str | None) -> dict[str, Any] | None:
+    if not path:
+        return None
+    with open(path) as f:
+        return yaml.safe_load(f)
+
+#----------------------------------------CZYSZCZENIE-------------------------------------------
+
+def etap_czyszczenie(year: int, archiwum: str, metadane: str, output: str, watki: int = 1) -> None:
+    """
+    Etap czyszczenia danych godzinowych jednego roku, zapis kolumnowy (parquet)
+
+    :param year: Rok danych
+    :param archiwum: Ścieżka pobranego archiwum zip
+    :param metadane: Ścieżka pobranych metadanych
+    :param output: Ścieżka pliku parquet
+    :param watki: Liczba procesów - przy co najmniej 2 dane i metadane wczytywane są jednocześnie
+    """
+    import gios_katalog as kat
+
+    #Nazwa pliku z katalogu albo ze spisu plików archiwum
+    plik = kat.rozwiaz_plik(year, archiwum)
+
+    if watki > 1:
+        #Wczytywanie xlsx (openpyxl) trzyma GIL - osobne procesy zamiast wątków
+        with ProcessPoolExecutor(max_workers=2) as pula:
+            f_dane = pula.submit(wicd.wczytaj_archiwum, year, archiwum, plik)
+            f_met = pula.submit(wicd.wczytaj_metadane, metadane, sg.GIOS_METADANE_FILE)
+            dane, met = {year: f_dane.result()}, f_met.result()
+    else:
+        dane = {year: wicd.wczytaj_archiwum(year, archiwum, plik)}
+        met = wicd.wczytaj_metadane(metadane, sg.GIOS_METADANE_FILE)
+
+    dfs_polaczone = wicd.polacz_dfs(wicd.wyczysc_pliki(dane, met))
+    dfs_polaczone.to_parquet(output, index=False)
+    hist.dolicz("wiersze", len(dfs_polaczone))
+
+#----------------------------------------AGREGACJA-------------------------------------------
+
+def srednie_stacji(df: pd.DataFrame, okres: str, watki: int = 1) -> pd.DataFrame:
+    """
+    Funkcja liczy średnie stężenia dla każdej stacji w podanym okresie.
+    Przy watki > 1 stacje dzielone są na grupy liczone w osobnych wątkach (agregacje pandas zwalniają GIL).
+
+    :param df: df z danymi godzinowymi (kolumna z datą + kolumny stacji)
+    :param okres: Okres dla resample ("D" lub "ME")
+    :param watki: Liczba wątków
+    :return: df w tym samym formacie z uśrednionymi wartościami
+    """
+    df = df.set_index(pd.to_datetime(df[KOLUMNA_DATY])).drop(columns=KOLUMNA_DATY)
+
+    if watki > 1 and df.shape[1] > 1:
+        grupy = np.array_split(df.columns, min(watki, df.shape[1]))
+        with ThreadPoolExecutor(max_workers=len(grupy)) as pula:
+            czesci = list(pula.map(lambda kolumny: df[kolumny].resample(okres).mean(), grupy))
+        wynik = pd.concat(czesci, axis=1)
+    else:
+        wynik = df.resample(okres).mean()
+
+    return wynik.reset_index(names=KOLUMNA_DATY)
+
+
+def etap_kostka(czyste: str, dobowe: str, miesieczne: str, watki: int = 1) -> None:
+    """
+    Etap agregacji - średnie dobowe i miesięczne dla każdej stacji
+
+    :param czyste: Ścieżka danych godzinowych (parquet)
+    :param dobowe: Ścieżka wyniku ze średnimi dobowymi
+    :param miesieczne: Ścieżka wyniku ze średnimi miesięcznymi
+    :param watki: Liczba wątków
+    """
+    df = pd.read_parquet(czyste)
+    hist.dolicz("wiersze", len(df))
+
+    srednie_stacji(df, "D", watki).to_parquet(dobowe, index=False)
+    srednie_stacji(df, "ME", watki).to_parquet(miesieczne, index=False)
+
+
+def etap_tabele(year: int, dobowe: str, miesieczne: str, monthly_means: str, exceedance_days: str) -> None:
+    """
+    Etap zapisu tabel wynikowych (średnie miesięczne stacji, dni z przekroczeniem normy)
+
+    :param year: Rok danych
+    :param dobowe: Ścieżka średnich dobowych
+    :param miesieczne: Ścieżka średnich miesięcznych
+    :param monthly_means: Ścieżka wyniku monthly_means.csv
+    :param exceedance_days: Ścieżka wyniku exceedance_days.csv
+    """
+    import srednie_dla_stacji_i_roku as sdsir
+    import grouped_barplot as gbp
+
+    df_miesieczne = pd.read_parquet(miesieczne)
+    sdsir.srednie_miesieczne_dla_lokalizacji(df_miesieczne, [year], False).to_csv(monthly_means, index=True)
+
+    df_dobowe = pd.read_parquet(dobowe)
+    hist.dolicz("wiersze", len(df_dobowe))
+    df_ex = gbp.policz_dni_z_przekroczeniem(df_dobowe, [year])
+    df_ex = df_ex.melt(var_name="Miejscowosc_Stacja", value_name=f"Ilosc dni z przekroczeniem")
+    df_ex.to_csv(exceedance_days, index=False)
+
+def etap_statystyki(czyste: str, monthly_stats: str, hourly_profile: str) -> None:
+    """
+    Etap statystyk miesięcznych stacji (percentyle, maksimum, kompletność) i profili godzinowych
+
+    :param czyste: Ścieżka danych godzinowych (parquet)
+    :param monthly_stats: Ścieżka wyniku monthly_stats.csv
+    :param hourly_profile: Ścieżka wyniku hourly_profile.csv
+    """
+    import statystyki_stacji as ss
+
+    df = pd.read_parquet(czyste)
+    hist.dolicz("wiersze", len(df))
+
+    df_stat, df_profil = ss.statystyki_miesieczne(df)
+    df_stat.to_csv(monthly_stats, index=False)
+    df_profil.to_csv(hourly_profile, index=False)
+
+
+def etap_epizody(czyste: str, output: str, prog: float | None = None, min_godzin: int | None = None) -> None:
+    """
+    Etap wykrywania epizodów smogowych (średnia krocząca 24h powyżej progu) dla każdej stacji
+
+    :param czyste: Ścieżka danych godzinowych (parquet)
+    :param output: Ścieżka wyniku episodes.csv
+    :param prog: Próg średniej 24h (domyślnie PROG z epizody_smogowe.py)
+    :param min_godzin: Minimalna długość epizodu w godzinach (domyślnie MIN_GODZIN)
+    """
+    import epizody_smogowe as eps
+
+    prog = eps.PROG if prog is None else prog
+    min_godzin = eps.MIN_GODZIN if min_godzin is None else min_godzin
+    df = pd.read_parquet(czyste)
+    hist.dolicz("wiersze", len(df))
+    eps.znajdz_epizody(df, prog, min_godzin).to_csv(output, index=False)
+
+
+def etap_indeks_stacji(czyste: list[str], output: str) -> None:
+    """
+    Etap budowy indeksu stacji z oczyszczonych danych podanych lat
+
+    :param czyste: Ścieżki danych godzinowych lat (parquet)
+    :param output: Ścieżka indeksu
+    """
+    import pm25_stacje as st
+
+    st.zapisz_indeks(st.zbuduj_indeks(czyste), output)
+
+#----------------------------------------WYKRESY-------------------------------------------
+
+def etap_wykres(rodzaj: str, year: int, kostka: str, output: str, miasta: list[str] | None = None,
+                metadane: str | None = None) -> None:
+    """
+    Etap rysowania jednego wykresu
+
+    :param rodzaj: srednie, heatmap, grouped_bar lub woj_bar
+    :param year: Rok danych
+    :param kostka: Ścieżka średnich miesięcznych (srednie, heatmap) lub dobowych (grouped_bar, woj_bar)
+    :param output: Ścieżka pliku png
+    :param miasta: Miasta do wykresu średnich
+    :param metadane: Ścieżka metadanych (woj_bar)
+    """
+    import matplotlib.pyplot as plt
+
+    df = pd.read_parquet(kostka)
+
+    if rodzaj == "srednie":
+        import srednie_dla_stacji_i_roku as sdsir
+        fig = sdsir.rysuj_wykres_lin(df, miasta, [year])
+    elif rodzaj == "heatmap":
+        import heatmap as hm
+        fig = hm.stworz_heatmape(hm.przygotuj_dane_do_heatmapy(df), [year])
+    elif rodzaj == "grouped_bar":
+        import grouped_barplot as gbp
+        fig = gbp.stworz_grouped_barplot(df, [year])
+    elif rodzaj == "woj_bar":
+        import grouped_barplot as gbp
+        met = wicd.wczytaj_metadane(metadane, sg.GIOS_METADANE_FILE)
+        fig = gbp.stworz_barplot_przekroczenia_woj(gbp.policz_przekroczenia_woj(df, met, [year]))
+    else:
+        raise ValueError(f"Nieznany rodzaj wykresu: {rodzaj}")
+
+    fig.savefig(output, dpi=300, bbox_inches="tight")
+    plt.close(fig)
+
+def etap_przyrost(year: int, zrzut: str, metadane: str, katalog: str | None = None) -> None:
+    """
+    Etap przyrostowy dla bieżącego roku - dołącza nowe pliki godzinowe z katalogu zrzutu
+    i aktualizuje średnie oraz liczby dni z przekroczeniem (patrz pm25_przyrost.py)
+
+    :param year: Rok danych
+    :param zrzut: Katalog z nowymi plikami xlsx
+    :param metadane: Ścieżka metadanych stacji
+    :param katalog: Katalog wyników roku
+    """
+    import pm25_przyrost as prz
+
+    stan = prz.dolacz_pomiary(year, zrzut, metadane, katalog)
+    print(f"Dane {year} do: {max(stan['ostatnie'].values(), default=None)} ({len(stan['pliki'])} plików, {stan['czesci']} części)")
+
+
+def etap_zloz(year: int, katalog: str | None = None, config: dict[str, Any] | None = None) -> None:
+    """
+    Etap składania wyników roku dołączanego przyrostowo - z części zapisuje dane godzinowe i kostki w układzie
+    pełnego pipeline'u, a z nich statystyki miesięczne, profile godzinowe i epizody (patrz pm25_przyrost.py)
+
+    :param year: Rok danych
+    :param katalog: Katalog wyników roku
+    :param config: Konfiguracja (pm25.yaml) - parametry epizodów
+    """
+    import pm25_przyrost as prz
+
+    katalog = katalog or prz.KATALOG_WYNIKOW.format(year=year)
+    sciezki = prz.zloz_rok(year, katalog)
+    etap_statystyki(sciezki["czyste"], os.path.join(katalog, "monthly_stats.csv"), os.path.join(katalog, "hourly_profile.csv"))
+    epizody = (config or {}).get("epizody", {})
+    etap_epizody(sciezki["czyste"], os.path.join(katalog, "episodes.csv"), epizody.get("prog"), epizody.get("min_godzin"))
+
+#----------------------------------------WYWOLANIE-------------------------------------------
+
+def wykonaj_etap(args: argparse.Namespace) -> None:
+    """
+    Funkcja wykonuje etap wybrany w argumentach wywołania
+
+    :param args: Argumenty wywołania (main)
+    """
+    if args.etap == "archiwum":
+        etap_archiwum(args.year, args.output, wczytaj_config(args.config))
+    elif args.etap == "katalog":
+        import gios_katalog as kat
+        katalog = kat.odswiez_katalog(args.lista, args.lustro)
+        print(f"Lata w katalogu archiwum GIOŚ: {', '.join(sorted(katalog['lata']))}")
+    elif args.etap == "metadane":
+        etap_metadane(args.output, wczytaj_config(args.config))
+    elif args.etap == "czyszczenie":
+        etap_czyszczenie(args.year, args.archiwum, args.metadane, args.output, args.watki)
+    elif args.etap == "kostka":
+        etap_kostka(args.czyste, args.dobowe, args.miesieczne, args.watki)
+    elif args.etap == "tabele":
+        etap_tabele(args.year, args.dobowe, args.miesieczne, args.monthly_means, args.exceedance_days)
+    elif args.etap == "statystyki":
+        etap_statystyki(args.czyste, args.monthly_stats, args.hourly_profile)
+    elif args.etap == "epizody":
+        etap_epizody(args.czyste, args.output, args.prog, args.min_godzin)
+    elif args.etap == "indeks-stacji":
+        etap_indeks_stacji(args.czyste, args.output)
+    elif args.etap == "przyrost":
+        etap_przyrost(args.year, args.zrzut, args.metadane, args.katalog)
+    elif args.etap == "zloz":
+        etap_zloz(args.year, args.katalog, wczytaj_config(args.config))
+    elif args.etap == "wykres":
+        etap_wykres(args.rodzaj, args.year, args.kostka, args.output, args.miasta, args.metadane)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser()
+    etapy = parser.add_subparsers(dest="etap", required=True)
+
+    p = etapy.add_parser("archiwum")
+    p.add_argument("--year", type=int, required=True)
+    p.add_argument("--output", required=True)
+    p.add_argument("--config", default=None)
+
+    p = etapy.add_parser("katalog")
+    p.add_argument("--lista", default=None, help="Zapisana strona z listą archiwum GIOŚ albo jej adres")
+    p.add_argument("--lustro", default=None, help="Katalog lokalnego lustra archiwum (pliki <id>.zip)")
+
+    p = etapy.add_parser("metadane")
+    p.add_argument("--output", required=True)
+    p.add_argument("--config", default=None)
+
+    p = etapy.add_parser("czyszczenie")
+    p.add_argument("--year", type=int, required=True)
+    p.add_argument("--archiwum", required=True)
+    p.add_argument("--metadane", required=True)
+    p.add_argument("--output", required=True)
+    p.add_argument("--watki", type=int, default=1)
+
+    p = etapy.add_parser("kostka")
+    p.add_argument("--czyste", required=True)
+    p.add_argument("--dobowe", required=True)
+    p.add_argument("--miesieczne", required=True)
+    p.add_argument("--watki", type=int, default=1)
+
+    p = etapy.add_parser("tabele")
+    p.add_argument("--year", type=int, required=True)
+    p.add_argument("--dobowe", required=True)
+    p.add_argument("--miesieczne", required=True)
+    p.add_argument("--monthly-means", required=True)
+    p.add_argument("--exceedance-days", required=True)
+
+    p = etapy.add_parser("statystyki")
+    p.add_argument("--czyste", required=True)
+    p.add_argument("--monthly-stats", required=True)
+    p.add_argument("--hourly-profile", required=True)
+
+    p = etapy.add_parser("epizody")
+    p.add_argument("--czyste", required=True)
+    p.add_argument("--output", required=True)
+    p.add_argument("--prog", type=float, default=None)
+    p.add_argument("--min-godzin", type=int, default=None)
+
+    p = etapy.add_parser("indeks-stacji")
+    p.add_argument("--czyste", nargs="+", required=True)
+    p.add_argument("--output", required=True)
+
+    p = etapy.add_parser("przyrost")
+    p.add_argument("--year", type=int, required=True)
+    p.add_argument("--zrzut", required=True, help="Katalog z nowymi plikami godzinowymi (xlsx w formacie GIOŚ)")
+    p.add_argument("--metadane", required=True)
+    p.add_argument("--katalog", default=None, help="Katalog wyników roku (domyślnie results/pm25/{rok})")
+
+    p = etapy.add_parser("zloz")
+    p.add_argument("--year", type=int, required=True)
+    p.add_argument("--katalog", default=None, help="Katalog wyników roku (domyślnie results/pm25/{rok})")
+    p.add_argument("--config", default=None)
+
+    p = etapy.add_parser("wykres")
+    p.add_argument("--rodzaj", choices=["srednie", "heatmap", "grouped_bar", "woj_bar"], required=True)
+    p.add_argument("--year", type=int, required=True)
+    p.add_argument("--kostka", required=True)
+    p.add_argument("--output", required=True)
+    p.add_argument("--miasta", nargs="+", default=None)
+    p.add_argument("--metadane", default=None)
+
+    args = parser.parse_args(argv)
+
+    #Katalog archiwum oraz pobieranie i składanie przyrostowe uruchamiane są ręcznie, poza regułami Snakefile - bez wpisu w historii
+    if args.etap in ETAPY_POZA_REGULAMI:
+        wykonaj_etap(args)
+        return
+
+    #Czas, pamięć, wiersze i ruch HTTP etapu dopisywane do historii uruchomień (nazwa jak reguła w Snakefile)
+    regula = f"pm25_{args.etap.replace('-', '_')}" + (f"_{args.rodzaj}" if args.etap == "wykres" else "")
+    with hist.pomiar(regula, hist.klucz_z_argumentow(vars(args))):
+        wykonaj_etap(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+import pandas as pd
+import numpy as np
+import glob
+import hashlib
+import json
+import os
+from typing import Any
+
+import wczytywanie_i_czyszczenie_danych as wicd
+import stale_gios as sg
+
+#Przyrostowe dołączanie nowych pomiarów godzinowych dla bieżącego (niepełnego) roku. Pliki xlsx w formacie GIOŚ
+#(wiersz "Kod stacji" + wiersze z datą i godziną) trafiają do katalogu zrzutu, a każde uruchomienie:
+# - wczytuje tylko pliki nowe lub zmienione i bierze z nich dla każdej stacji tylko godziny późniejsze niż ostatnia
+#   zapisana dla tej stacji (pliki mogą się nakładać, a stacje mogą się spóźniać względem siebie),
+# - dopisuje je jako kolejną część danych godzinowych (godzinowe_czesci/NNNNN.parquet) - bez przepisywania roku,
+# - dopisuje średnie dobowe i miesięczne okresów z nowych danych jako części kostek (srednie_dobowe_czesci/,
+#   srednie_miesieczne_czesci/) i aktualizuje liczniki dni z przekroczeniem normy.
+#Z poprzednich uruchomień niedomknięte mogą być tylko ostatni dzień i ostatni miesiąc - ich sumy i liczby pomiarów
+#trzymane są w pliku stanu, a ich średnie z nowej części zastępują przy odczycie średnie z poprzedniej.
+#Czas aktualizacji zależy od ilości nowych danych, a nie od długości roku. Pliki całego roku w układzie pełnego
+#pipeline'u (pm25_godzinowe.parquet, kostki, monthly_stats, episodes) składa z części zloz_rok - na żądanie. Pliki, które dokładają pomiary do dni już zamkniętych
+#albo zmieniają już dołączone godziny, są odrzucane (ValueError) - takich zmian nie da się nanieść przyrostowo.
+
+KOLUMNA_DATY = "Miejscowość_Kod stacji"
+KATALOG_WYNIKOW = "results/pm25/{year}"
+#Katalogi części w katalogu wyników roku
+CZESCI_GODZINOWE = "godzinowe_czesci"
+CZESCI_KOSTEK = {"D": "srednie_dobowe_czesci", "ME": "srednie_miesieczne_czesci"}
+
+#----------------------------------------STAN-------------------------------------------
+
+def pusty_stan() -> dict[str, Any]:
+    return {
+        "pliki": {},
+        "ostatnie": {},
+        "czesci": 0,
+        "dzien": {"okres": None, "suma": {}, "n": {}},
+        "miesiac": {"okres": None, "suma": {}, "n": {}},
+        "przekroczenia": {},
+    }
+
+
+def wczytaj_stan(path: str) -> dict[str, Any]:
+    if not os.path.exists(path):
+        return pusty_stan()
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def zapisz_stan(stan: dict[str, Any], path: str) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(stan, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def nowe_pliki(katalog_zrzutu: str, stan: dict[str, Any]) -> list[str]:
+    """
+    Funkcja wybiera pliki z katalogu zrzutu, których jeszcze nie przetworzono (lub które się zmieniły)
+
+    :param katalog_zrzutu: Katalog z nowymi plikami xlsx
+    :param stan: Stan przyrostu
+    :return: Ścieżki plików w kolejności nazw
+    """
+    pliki = []
+    for path in sorted(glob.glob(os.path.join(katalog_zrzutu, "*.xlsx"))):
+        info = os.stat(path)
+        zapis = stan["pliki"].get(os.path.basename(path))
+        if zapis is None or [zapis["rozmiar"], zapis["mtime_ns"]] != [info.st_size, info.st_mtime_ns]:
+            pliki.append(path)
+
+    return pliki
+
+#----------------------------------------CZYSZCZENIE-------------------------------------------
+
+def wczytaj_plik(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Funkcja czyści surowy plik tymi samymi krokami co pełny rok (bez sprawdzania liczby dni)
+
+    :param df: Surowy df z pliku xlsx
+    :return: df indeksowany godziną pomiaru (przed przesunięciem północy), kolumny - kody stacji z pliku
+    """
+    df = wicd.ujed_format(wicd.usun_wiersze(df))
+    df = df[df.index.notna()]
+    return df[~df.index.duplicated()].sort_index()
+
+
+def skrot_danych(df: pd.DataFrame) -> str:
+    #Skrót kodów stacji, godzin i wartości - stacje bez żadnego pomiaru nie zmieniają skrótu
+    df = df.dropna(axis=1, how="all")
+    skrot = hashlib.sha256("|".join(map(str, df.columns)).encode("utf-8"))
+    skrot.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return skrot.hexdigest()
+
+
+def opis_pliku(path: str, df: pd.DataFrame) -> dict[str, Any]:
+    #Wpis pliku w stanie - rozmiar i czas modyfikacji (wykrycie zmiany) oraz zakres i skrót wczytanych godzin
+    info = os.stat(path)
+    return {
+        "rozmiar": info.st_size,
+        "mtime_ns": info.st_mtime_ns,
+        "do": str(df.index.max()) if len(df) else None,
+        "skrot": skrot_danych(df),
+    }
+
+
+def sprawdz_zmieniony(df: pd.DataFrame, zapis: dict[str, Any] | None, nazwa: str) -> None:
+    """
+    Funkcja sprawdza, czy zmieniony plik (inny rozmiar lub czas modyfikacji) jedynie dopisał nowe godziny.
+    Godziny z jego poprzedniej wersji zostały już dołączone, więc ich wartości nie mogą się zmienić.
+
+    :param df: Oczyszczony df z nowej wersji pliku
+    :param zapis: Wpis pliku w stanie albo "None" dla nowego pliku
+    :param nazwa: Nazwa pliku (do komunikatu)
+    """
+    if zapis is None or zapis["do"] is None:
+        return
+    if skrot_danych(df[df.index <= pd.Timestamp(zapis["do"])]) != zapis["skrot"]:
+        raise ValueError(f"Plik {nazwa} zmienia już dołączone pomiary (do {zapis['do']}) - wyniki roku trzeba przeliczyć od nowa")
+
+
+def wyczysc_przyrost(df: pd.DataFrame, met: pd.DataFrame, year: int, ostatnie: dict[str, str]) -> tuple[pd.DataFrame, dict[str, str]]:
+    """
+    Funkcja zostawia z oczyszczonego pliku dla każdej stacji tylko godziny późniejsze od ostatniej zapisanej
+    dla tej stacji i układa dane jak w pełnym roku
+
+    :param df: Oczyszczony df z pliku (wczytaj_plik)
+    :param met: df z metadanymi
+    :param year: Rok danych
+    :param ostatnie: Ostatnia zapisana godzina z pomiarem (przed przesunięciem północy) dla każdej stacji
+    :return: df z kolumną daty i kolumnami Miejscowosc_Stacja oraz zaktualizowane ostatnie godziny stacji
+    """
+    #Godzina 00:00 należy do poprzedniej doby - 1 stycznia 00:00 to jeszcze poprzedni rok
+    przesuniete = wicd.poprzedni_dzien(df)
+    df = df[przesuniete.index.year == year]
+
+    df = wicd.aktualizuj_kod(df, met)
+    stacja_miejscowosc = dict(zip(met.loc[:, 'Kod stacji'], met.loc[:, 'Miejscowość']))
+    kody = [kod for kod in df.columns if kod in stacja_miejscowosc]
+    df = wicd.polacz_nagl(df[kody], [(stacja_miejscowosc[kod], kod) for kod in kody])
+    df = wicd.polacz_dfs({year: df}).set_index(KOLUMNA_DATY)
+
+    #Godziny nie późniejsze od ostatniej zapisanej dla danej stacji już są w danych (NaT - nowa stacja)
+    granice = pd.to_datetime(pd.Series(ostatnie, dtype="object").reindex(df.columns)).to_numpy()
+    df = df.mask(df.index.to_numpy()[:, None] <= granice[None, :]).dropna(how="all")
+    if df.empty:
+        return pd.DataFrame(columns=[KOLUMNA_DATY]), ostatnie
+
+    ostatnie = {**ostatnie, **{stacja: str(s.last_valid_index()) for stacja, s in df.items() if s.notna().any()}}
+    df = wicd.poprzedni_dzien(df.dropna(axis=1, how="all"))
+
+    return df.reset_index(names=KOLUMNA_DATY), ostatnie
+
+#----------------------------------------AGREGACJA-------------------------------------------
+
+def sumy_okresow(df: pd.DataFrame, okres: str) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Funkcja liczy sumy i liczby pomiarów stacji w okresach - z nich średnie da się uzupełniać kolejnymi danymi
+
+    :param df: df z danymi godzinowymi (kolumna z datą + kolumny stacji)
+    :param okres: Okres dla resample ("D" lub "ME")
+    :return: df z sumami oraz df z liczbami pomiarów (indeks - okresy)
+    """
+    df = df.set_index(pd.to_datetime(df[KOLUMNA_DATY])).drop(columns=KOLUMNA_DATY)
+    grupy = df.resample(okres)
+    return grupy.sum(min_count=1).fillna(0), grupy.count()
+
+
+def dolacz_otwarty(sumy: pd.DataFrame, n: pd.DataFrame, otwarty: dict[str, Any], okres: str) -> None:
+    """
+    Funkcja dodaje do pierwszego okresu nowych danych sumy niedomkniętego okresu z poprzedniego uruchomienia
+
+    :param sumy: Sumy nowych danych
+    :param n: Liczby pomiarów nowych danych
+    :param otwarty: Stan niedomkniętego okresu (okres, suma, n)
+    :param okres: "D" lub "M"
+    """
+    if otwarty["okres"] is None:
+        return
+
+    poczatek = pd.Period(otwarty["okres"], okres).to_timestamp(how="end").normalize()
+    if poczatek not in sumy.index:
+        sumy.loc[poczatek] = 0
+        n.loc[poczatek] = 0
+        sumy.sort_index(inplace=True)
+        n.sort_index(inplace=True)
+
+    for stacja, suma in otwarty["suma"].items():
+        if stacja not in sumy.columns:
+            sumy[stacja] = 0.0
+            n[stacja] = 0
+        sumy.loc[poczatek, stacja] += suma
+        n.loc[poczatek, stacja] += otwarty["n"][stacja]
+
+
+def zapamietaj_otwarty(sumy: pd.DataFrame, n: pd.DataFrame, okres: str) -> dict[str, Any]:
+    #Ostatni okres może jeszcze dostać pomiary w kolejnym uruchomieniu
+    return {
+        "okres": str(sumy.index[-1].to_period(okres)),
+        "suma": {k: float(v) for k, v in sumy.iloc[-1].items()},
+        "n": {k: int(v) for k, v in n.iloc[-1].items()},
+    }
+
+
+def dopisz_czesc_kostki(path: str, sumy: pd.DataFrame, n: pd.DataFrame) -> pd.DataFrame:
+    """
+    Funkcja zapisuje średnie okresów z nowych danych jako kolejną część kostki (pierwszy z okresów mógł już być
+    w poprzedniej części jako niedomknięty - przy odczycie wygrywa nowsza część)
+
+    :param path: Ścieżka części (srednie_dobowe_czesci/NNNNN.parquet lub srednie_miesieczne_czesci/NNNNN.parquet)
+    :param sumy: Sumy okresów z nowych danych
+    :param n: Liczby pomiarów okresów z nowych danych
+    :return: Średnie z nowych danych
+    """
+    with np.errstate(all="ignore"):
+        srednie = (sumy / n.where(n > 0)).rename_axis(KOLUMNA_DATY).reset_index()
+    srednie.to_parquet(path, index=False)
+
+    return srednie
+
+#----------------------------------------WYWOLANIE-------------------------------------------
+
+def dolacz_pomiary(year: int, katalog_zrzutu: str, metadane: str, katalog: str | None = None) -> dict[str, Any]:
+    """
+    Funkcja dołącza do wyników roku nowe pomiary z katalogu zrzutu i aktualizuje średnie dobowe, miesięczne
+    oraz liczby dni z przekroczeniem normy (exceedance_days.csv)
+
+    :param year: Rok danych
+    :param katalog_zrzutu: Katalog z nowymi plikami xlsx (format GIOŚ)
+    :param metadane: Ścieżka metadanych stacji
+    :param katalog: Katalog wyników roku (domyślnie results/pm25/{rok})
+    :return: Stan przyrostu po aktualizacji
+    """
+    katalog = katalog or KATALOG_WYNIKOW.format(year=year)
+    for podkatalog in [CZESCI_GODZINOWE, *CZESCI_KOSTEK.values()]:
+        os.makedirs(os.path.join(katalog, podkatalog), exist_ok=True)
+    sciezka_stanu = os.path.join(katalog, "stan_przyrostu.json")
+    stan = wczytaj_stan(sciezka_stanu)
+
+    pliki = nowe_pliki(katalog_zrzutu, stan)
+    if not pliki:
+        return stan
+
+    met = wicd.wczytaj_metadane(metadane, sg.GIOS_METADANE_FILE)
+    ostatnie = stan["ostatnie"]
+    otwarty_dzien = stan["dzien"]["okres"]
+
+    #Wszystkie pliki są sprawdzane przed zapisem czegokolwiek - odrzucony plik nie zmienia wyników
+    czesci, opisy = [], {}
+    for path in pliki:
+        nazwa = os.path.basename(path)
+        surowe = wczytaj_plik(pd.read_excel(path, header=None))
+        sprawdz_zmieniony(surowe, stan["pliki"].get(nazwa), nazwa)
+
+        df, ostatnie = wyczysc_przyrost(surowe, met, year, ostatnie)
+        if len(df):
+            poczatek = pd.to_datetime(df[KOLUMNA_DATY]).min()
+            if otwarty_dzien is not None and poczatek < pd.Period(otwarty_dzien, "D").start_time:
+                raise ValueError(f"Plik {nazwa} dokłada pomiary z dni już zamkniętych ({poczatek.date()}, "
+                                 f"ostatni otwarty dzień {otwarty_dzien}) - wyniki roku trzeba przeliczyć od nowa")
+            czesci.append(df)
+        opisy[nazwa] = opis_pliku(path, surowe)
+
+    if czesci:
+        #Różne pliki mogą nieść różne stacje z tej samej godziny - łączymy je w jeden wiersz
+        nowe = pd.concat(czesci, ignore_index=True).groupby(KOLUMNA_DATY, sort=True).first().reset_index()
+        stan["czesci"] += 1
+        czesc = f"{stan['czesci']:05d}.parquet"
+        nowe.to_parquet(os.path.join(katalog, CZESCI_GODZINOWE, czesc), index=False)
+
+        #Średnie dobowe i liczniki przekroczeń
+        sumy, n = sumy_okresow(nowe, "D")
+        otwarty = stan["dzien"]
+        dolacz_otwarty(sumy, n, otwarty, "D")
+
+        #Niedomknięty dzień był już policzony w licznikach - odejmujemy jego poprzedni wkład
+        if otwarty["okres"] is not None:
+            for stacja, suma in otwarty["suma"].items():
+                if otwarty["n"][stacja] and suma / otwarty["n"][stacja] > sg.NORMA:
+                    stan["przekroczenia"][stacja] -= 1
+
+        srednie = dopisz_czesc_kostki(os.path.join(katalog, CZESCI_KOSTEK["D"], czesc), sumy, n)
+        for stacja, liczba in (srednie.drop(columns=KOLUMNA_DATY) > sg.NORMA).sum().items():
+            stan["przekroczenia"][stacja] = stan["przekroczenia"].get(stacja, 0) + int(liczba)
+        stan["dzien"] = zapamietaj_otwarty(sumy, n, "D")
+
+        #Średnie miesięczne
+        sumy, n = sumy_okresow(nowe, "ME")
+        dolacz_otwarty(sumy, n, stan["miesiac"], "M")
+        dopisz_czesc_kostki(os.path.join(katalog, CZESCI_KOSTEK["ME"], czesc), sumy, n)
+        stan["miesiac"] = zapamietaj_otwarty(sumy, n, "M")
+
+        df_ex = pd.DataFrame({
+            "Miejscowosc_Stacja": list(stan["przekroczenia"]),
+            "Ilosc dni z przekroczeniem": list(stan["przekroczenia"].values()),
+        })
+        df_ex.to_csv(os.path.join(katalog, "exceedance_days.csv"), index=False)
+
+    stan["ostatnie"] = ostatnie
+    stan["pliki"].update(opisy)
+    zapisz_stan(stan, sciezka_stanu)
+
+    return stan
+
+
+#----------------------------------------ODCZYT-------------------------------------------
+
+def wczytaj_czesci(katalog: str, podkatalog: str) -> pd.DataFrame:
+    #Części w kolejności zapisu (stacje - suma zbiorów kolumn)
+    sciezki = sorted(glob.glob(os.path.join(katalog, podkatalog, "*.parquet")))
+    if not sciezki:
+        return pd.DataFrame(columns=[KOLUMNA_DATY])
+    return pd.concat([pd.read_parquet(p) for p in sciezki], ignore_index=True)
+
+
+def wczytaj_godzinowe(year: int, katalog: str | None = None) -> pd.DataFrame:
+    """
+    Funkcja łączy wszystkie dołączone części danych godzinowych roku (pomiary różnych stacji z tej samej godziny
+    mogą leżeć w różnych częściach)
+
+    :param year: Rok danych
+    :param katalog: Katalog wyników roku (domyślnie results/pm25/{rok})
+    :return: df w formacie danych godzinowych (kolumna z datą + kolumny stacji)
+    """
+    katalog = katalog or KATALOG_WYNIKOW.format(year=year)
+    df = wczytaj_czesci(katalog, CZESCI_GODZINOWE)
+    return df.groupby(KOLUMNA_DATY, sort=True).first().reset_index()
+
+
+def wczytaj_kostke(year: int, okres: str, katalog: str | None = None) -> pd.DataFrame:
+    """
+    Funkcja łączy części kostki średnich roku - niedomknięty okres z części zastępowany jest przez jego średnie
+    z kolejnej części
+
+    :param year: Rok danych
+    :param okres: "D" (średnie dobowe) lub "ME" (średnie miesięczne)
+    :param katalog: Katalog wyników roku (domyślnie results/pm25/{rok})
+    :return: df w formacie kostki z pełnego pipeline'u (kolumna z datą + kolumny stacji)
+    """
+    katalog = katalog or KATALOG_WYNIKOW.format(year=year)
+    df = wczytaj_czesci(katalog, CZESCI_KOSTEK[okres])
+    return df.drop_duplicates(KOLUMNA_DATY, keep="last").sort_values(KOLUMNA_DATY).reset_index(drop=True)
+
+
+def zloz_rok(year: int, katalog: str | None = None) -> dict[str, str]:
+    """
+    Funkcja zapisuje z części pliki roku w układzie pełnego pipeline'u (dane godzinowe i kostki), z których
+    korzystają etapy statystyk, epizodów, tabel i wykresów oraz serwis pm25_serwer.py
+
+    :param year: Rok danych
+    :param katalog: Katalog wyników roku (domyślnie results/pm25/{rok})
+    :return: Słownik rodzaj -> ścieżka zapisanego pliku (czyste, dobowe, miesieczne)
+    """
+    katalog = katalog or KATALOG_WYNIKOW.format(year=year)
+    sciezki = {
+        "czyste": os.path.join(katalog, "pm25_godzinowe.parquet"),
+        "dobowe": os.path.join(katalog, "srednie_dobowe.parquet"),
+        "miesieczne": os.path.join(katalog, "srednie_miesieczne.parquet"),
+    }
+    wczytaj_godzinowe(year, katalog).to_parquet(sciezki["czyste"], index=False)
+    wczytaj_kostke(year, "D", katalog).to_parquet(sciezki["dobowe"], index=False)
+    wczytaj_kostke(year, "ME", katalog).to_parquet(sciezki["miesieczne"], index=False)
+
+    return sciezki
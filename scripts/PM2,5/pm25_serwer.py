@@ -0,0 +1,282 @@
+import pandas as pd
+import numpy as np
+import argparse
+import glob
+import json
+import os
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qsl, urlsplit
+
+import wczytywanie_i_czyszczenie_danych as wicd
+import stale_gios as sg
+
+#Lokalny serwis HTTP/JSON z zapytaniami o średnie miesięczne i dni z przekroczeniem normy dla stacji, miast
+#i województw w dowolnym zakresie czasu. Dane z kostek (srednie_miesieczne/srednie_dobowe.parquet) wszystkich
+#lat wczytywane są raz, indeksy (stacja/miasto/województwo -> kolumny, sumy skumulowane przekroczeń) liczone
+#przy starcie, a gotowe odpowiedzi trzymane w pamięci podręcznej LRU.
+
+KOLUMNA_DATY = "Miejscowość_Kod stacji"
+
+#----------------------------------------MAGAZYN-------------------------------------------
+
+class MagazynPM25:
+    """
+    Dane z kostek wszystkich lat z katalogu wyników wraz z indeksami do szybkich zapytań
+    """
+
+    def __init__(self, katalog: str = "results/pm25", metadane: str | None = None, rozmiar_cache: int = 1024):
+        miesieczne = self.wczytaj_kostki(katalog, "srednie_miesieczne.parquet")
+        dobowe = self.wczytaj_kostki(katalog, "srednie_dobowe.parquet")
+
+        stacje = sorted(set(miesieczne.columns) | set(dobowe.columns))
+        miesieczne = miesieczne.reindex(columns=stacje)
+        dobowe = dobowe.reindex(columns=stacje)
+
+        self.stacje = stacje
+        self.kody = [s.split('_')[-1] for s in stacje]
+        self.miejscowosci = [s.split('_')[0] for s in stacje]
+
+        #Oś czasu jako liczby (nr miesiąca / dnia) - zakres czasu to dwa wyszukiwania binarne
+        self.miesiace = miesieczne.index.to_period("M")
+        self.nr_miesiecy = self.miesiace.asi8
+        self.wartosci_mies = miesieczne.to_numpy(dtype="float64")
+
+        self.dni = dobowe.index.to_period("D")
+        self.nr_dni = self.dni.asi8
+        wartosci_dob = dobowe.to_numpy(dtype="float64")
+        zero = np.zeros((1, len(stacje)), dtype="int64")
+        #Sumy skumulowane - liczba dni z przekroczeniem/pomiarem w zakresie to różnica dwóch wierszy
+        self.przekroczenia_cum = np.vstack([zero, np.cumsum(wartosci_dob > sg.NORMA, axis=0)])
+        self.pomiary_cum = np.vstack([zero, np.cumsum(~np.isnan(wartosci_dob), axis=0)])
+
+        #Indeksy: kod stacji / miasto / województwo -> numery kolumn
+        self.po_kodzie = {kod: i for i, kod in enumerate(self.kody)}
+        self.po_miescie = self.grupuj(self.miejscowosci)
+
+        self.wojewodztwa = [None] * len(stacje)
+        if metadane and os.path.exists(metadane):
+            met = wicd.wczytaj_metadane(metadane, sg.GIOS_METADANE_FILE)
+            kod_woj = dict(zip(met["Kod stacji"], met["Województwo"]))
+            self.wojewodztwa = [kod_woj.get(kod) for kod in self.kody]
+        self.po_wojewodztwie = self.grupuj(self.wojewodztwa)
+
+        self.zapytanie = lru_cache(maxsize=rozmiar_cache)(self._zapytanie)
+
+    @staticmethod
+    def wczytaj_kostki(katalog: str, nazwa: str) -> pd.DataFrame:
+        """
+        Funkcja łączy kostki wszystkich lat (stacje z różnych lat - suma zbiorów kolumn)
+
+        :param katalog: Katalog wyników PM2.5
+        :param nazwa: Nazwa pliku kostki
+        :return: df indeksowany datą, kolumny - stacje
+        """
+        sciezki = sorted(glob.glob(os.path.join(katalog, "[0-9]" * 4, nazwa)))
+        if not sciezki:
+            return pd.DataFrame(index=pd.DatetimeIndex([]))
+
+        dfs = [pd.read_parquet(p).set_index(KOLUMNA_DATY) for p in sciezki]
+        df = pd.concat(dfs, axis=0).sort_index()
+        df.index = pd.to_datetime(df.index)
+
+        return df
+
+    @staticmethod
+    def grupuj(etykiety: list[str | None]) -> dict[str, np.ndarray]:
+        grupy = {}
+        for i, etykieta in enumerate(etykiety):
+            if etykieta is not None:
+                grupy.setdefault(etykieta, []).append(i)
+        return {k: np.array(v) for k, v in grupy.items()}
+
+    #----------------------------------------ZAPYTANIA-------------------------------------------
+
+    def kolumny(self, parametry: dict[str, str]) -> np.ndarray:
+        """
+        Funkcja wybiera stacje z zapytania (stacja, miasto lub wojewodztwo)
+
+        :param parametry: Parametry zapytania
+        :return: Numery kolumn stacji
+        """
+        if "stacja" in parametry:
+            if parametry["stacja"] not in self.po_kodzie:
+                raise KeyError(f"Nieznana stacja: {parametry['stacja']}")
+            return np.array([self.po_kodzie[parametry["stacja"]]])
+        if "miasto" in parametry:
+            if parametry["miasto"] not in self.po_miescie:
+                raise KeyError(f"Nieznane miasto: {parametry['miasto']}")
+            return self.po_miescie[parametry["miasto"]]
+        if "wojewodztwo" in parametry:
+            if parametry["wojewodztwo"] not in self.po_wojewodztwie:
+                raise KeyError(f"Nieznane województwo: {parametry['wojewodztwo']}")
+            return self.po_wojewodztwie[parametry["wojewodztwo"]]
+
+        raise ValueError("Podaj stacja, miasto lub wojewodztwo")
+
+    @staticmethod
+    def zakres(nr: np.ndarray, parametry: dict[str, str], freq: str) -> slice:
+        """
+        Funkcja zamienia parametry od/do (RRRR, RRRR-MM lub RRRR-MM-DD, oba końce włącznie) na wycinek osi czasu
+
+        :param nr: Posortowana oś czasu (numery okresów)
+        :param parametry: Parametry zapytania
+        :param freq: "M" - oś miesięcy, "D" - oś dni
+        :return: Wycinek osi czasu
+        """
+        start, koniec = 0, len(nr)
+        try:
+            if "od" in parametry:
+                start = np.searchsorted(nr, pd.Period(parametry["od"]).start_time.to_period(freq).ordinal, side="left")
+            if "do" in parametry:
+                koniec = np.searchsorted(nr, pd.Period(parametry["do"]).end_time.to_period(freq).ordinal, side="right")
+        except ValueError:
+            raise ValueError(f"Niepoprawna data w zakresie (od={parametry.get('od')}, do={parametry.get('do')})")
+
+        return slice(start, koniec)
+
+    def srednie(self, parametry: dict[str, str]) -> dict[str, Any]:
+        kol = self.kolumny(parametry)
+        wycinek = self.zakres(self.nr_miesiecy, parametry, "M")
+        wartosci = self.wartosci_mies[wycinek][:, kol]
+
+        #Średnia grupy jak w srednie_miesieczne_dla_lokalizacji - średnia ze średnich miesięcznych stacji
+        with np.errstate(all="ignore"):
+            licznik = np.sum(~np.isnan(wartosci), axis=1)
+            srednia = np.where(licznik > 0, np.nansum(wartosci, axis=1) / np.maximum(licznik, 1), np.nan)
+
+        return {
+            "miesiace": [str(m) for m in self.miesiace[wycinek]],
+            "srednia": lista(srednia),
+            "stacje": {self.kody[k]: lista(wartosci[:, i]) for i, k in enumerate(kol)},
+        }
+
+    def przekroczenia(self, parametry: dict[str, str]) -> dict[str, Any]:
+        kol = self.kolumny(parametry)
+        wycinek = self.zakres(self.nr_dni, parametry, "D")
+
+        dni_przekroczen = self.przekroczenia_cum[wycinek.stop, kol] - self.przekroczenia_cum[wycinek.start, kol]
+        dni_pomiarow = self.pomiary_cum[wycinek.stop, kol] - self.pomiary_cum[wycinek.start, kol]
+
+        return {
+            "od": str(self.dni[wycinek.start]) if wycinek.start < wycinek.stop else None,
+            "do": str(self.dni[wycinek.stop - 1]) if wycinek.start < wycinek.stop else None,
+            "suma": int(dni_przekroczen.sum()),
+            "srednia": float(dni_przekroczen.mean()),
+            "stacje": {
+                self.kody[k]: {"dni_z_przekroczeniem": int(p), "dni_z_pomiarem": int(n)}
+                for k, p, n in zip(kol, dni_przekroczen, dni_pomiarow)
+            },
+        }
+
+    def lista_stacji(self) -> list[dict[str, Any]]:
+        return [
+            {"stacja": s, "kod": k, "miejscowosc": m, "wojewodztwo": w}
+            for s, k, m, w in zip(self.stacje, self.kody, self.miejscowosci, self.wojewodztwa)
+        ]
+
+    def _zapytanie(self, sciezka: str, parametry: tuple[tuple[str, str], ...]) -> tuple[int, bytes]:
+        """
+        Funkcja obsługuje zapytanie i zwraca gotową odpowiedź (zapamiętywaną w LRU)
+
+        :param sciezka: Ścieżka zapytania (/stacje, /srednie, /przekroczenia)
+        :param parametry: Posortowane pary parametrów
+        :return: Kod HTTP oraz treść JSON
+        """
+        slownik = dict(parametry)
+        try:
+            if sciezka == "/stacje":
+                wynik = self.lista_stacji()
+            elif sciezka == "/srednie":
+                wynik = self.srednie(slownik)
+            elif sciezka == "/przekroczenia":
+                wynik = self.przekroczenia(slownik)
+            else:
+                return 404, json.dumps({"error": f"Nieznana ścieżka: {sciezka}"}).encode("utf-8")
+        except KeyError as e:
+            return 404, json.dumps({"error": e.args[0]}, ensure_ascii=False).encode("utf-8")
+        except ValueError as e:
+            return 400, json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8")
+
+        return 200, json.dumps(wynik, ensure_ascii=False).encode("utf-8")
+
+
+def lista(wartosci: np.ndarray) -> list[float | None]:
+    #NaN nie jest poprawnym JSON - braki jako null
+    return [None if np.isnan(v) else round(float(v), 3) for v in wartosci]
+
+#----------------------------------------SERWER-------------------------------------------
+
+class SerwerPM25(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, magazyn: MagazynPM25, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), ObslugaPM25)
+        self.magazyn = magazyn
+        self.blokada = threading.Lock()
+        self.statystyki = {"zapytania": 0}
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+
+class ObslugaPM25(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def odpowiedz(self, kod: int, dane: bytes) -> None:
+        self.send_response(kod)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(dane)))
+        self.end_headers()
+        self.wfile.write(dane)
+
+    def do_GET(self):
+        serwer = self.server
+        adres = urlsplit(self.path)
+
+        with serwer.blokada:
+            serwer.statystyki["zapytania"] += 1
+
+        if adres.path == "/statystyki":
+            cache = serwer.magazyn.zapytanie.cache_info()
+            wynik = {**serwer.statystyki, "cache_trafienia": cache.hits, "cache_chybienia": cache.misses,
+                     "cache_rozmiar": cache.currsize}
+            self.odpowiedz(200, json.dumps(wynik).encode("utf-8"))
+            return
+
+        #Kolejność parametrów nie ma znaczenia dla pamięci podręcznej
+        parametry = tuple(sorted(parse_qsl(adres.query)))
+        self.odpowiedz(*serwer.magazyn.zapytanie(adres.path, parametry))
+
+
+def uruchom_serwer(magazyn: MagazynPM25, **ustawienia: Any) -> SerwerPM25:
+    """
+    Funkcja uruchamia serwer w osobnym wątku
+
+    :param magazyn: Dane z indeksami
+    :param ustawienia: Parametry SerwerPM25 (host, port)
+    :return: Działający serwer - należy go zamknąć przez shutdown() i server_close()
+    """
+    serwer = SerwerPM25(magazyn, **ustawienia)
+    threading.Thread(target=serwer.serve_forever, daemon=True).start()
+    return serwer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--katalog", default="results/pm25", help="Katalog z wynikami PM2.5 (kostki lat)")
+    parser.add_argument("--metadane", default="results/pm25/surowe/metadane.xlsx")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--cache", type=int, default=1024, help="Liczba odpowiedzi w pamięci podręcznej LRU")
+    args = parser.parse_args()
+
+    magazyn = MagazynPM25(args.katalog, args.metadane, args.cache)
+    serwer = SerwerPM25(magazyn, args.host, args.port)
+    print(f"Serwis PM2.5: {serwer.url} ({len(magazyn.stacje)} stacji, {len(magazyn.miesiace)} miesięcy)")
+    serwer.serve_forever()
@@ -0,0 +1,145 @@
+import pandas as pd
+import pyarrow.parquet as pq
+import os
+import re
+
+#Indeks stacji dla przetworzonych lat - dla każdej stacji ("Miejscowosc_Stacja", jak w exceedance_days.csv)
+#mapa bitowa lat, w których stacja ma dane (bit numer rok - ROK_BAZOWY). Wybór stacji wspólnych albo częściowo
+#pokrytych dla dowolnego zestawu lat to jedna operacja na kolumnie bitmap, bez czytania danych z poszczególnych lat.
+
+ROK_BAZOWY = 1990
+INDEKS_PLIK = "results/pm25/stacje_indeks.parquet"
+WZORZEC_DANYCH = "results/pm25/{year}/pm25_godzinowe.parquet"
+KOLUMNA_DATY = "Miejscowość_Kod stacji"
+
+#----------------------------------------BUDOWANIE-------------------------------------------
+
+def bit_roku(year: int) -> int:
+    """
+    Funkcja zwraca maskę bitową dla roku
+
+    :param year: Rok
+    :return: Maska z jednym ustawionym bitem
+    """
+    if not ROK_BAZOWY <= year < ROK_BAZOWY + 63:
+        raise ValueError(f"Rok {year} poza zakresem indeksu stacji")
+    return 1 << (year - ROK_BAZOWY)
+
+
+def maska_lat(years: list[int]) -> int:
+    """
+    Funkcja zwraca maskę bitową dla zestawu lat
+
+    :param years: Lata
+    :return: Maska z ustawionymi bitami lat
+    """
+    maska = 0
+    for year in years:
+        maska |= bit_roku(int(year))
+    return maska
+
+
+def stacje_roku(path: str) -> list[str]:
+    """
+    Funkcja odczytuje stacje z oczyszczonych danych roku - tylko ze schematu pliku parquet, bez wczytywania danych
+
+    :param path: Ścieżka pm25_godzinowe.parquet
+    :return: Lista stacji (Miejscowosc_Stacja)
+    """
+    return [kol for kol in pq.read_schema(path).names if kol != KOLUMNA_DATY and not kol.startswith("__")]
+
+
+def dodaj_rok(indeks: pd.DataFrame, year: int, stacje: list[str]) -> pd.DataFrame:
+    """
+    Funkcja ustawia w indeksie rok dla podanych stacji (i zdejmuje go z pozostałych) - ponowne dodanie roku niczego nie psuje
+
+    :param indeks: Indeks stacji (kolumny Miejscowosc_Stacja, lata)
+    :param year: Rok
+    :param stacje: Stacje z danymi w tym roku
+    :return: Zaktualizowany indeks
+    """
+    bit = bit_roku(year)
+
+    lata = indeks.set_index("Miejscowosc_Stacja")["lata"] & ~bit
+    nowe = pd.Series(0, index=pd.Index(stacje).difference(lata.index), dtype="int64")
+    lata = pd.concat([lata, nowe])
+    lata[stacje] |= bit
+
+    lata = lata[lata != 0].sort_index()
+
+    return pd.DataFrame({"Miejscowosc_Stacja": lata.index.astype(str), "lata": lata.to_numpy(dtype="int64")})
+
+
+def pusty_indeks() -> pd.DataFrame:
+    return pd.DataFrame({"Miejscowosc_Stacja": pd.Series(dtype="str"), "lata": pd.Series(dtype="int64")})
+
+
+def zbuduj_indeks(sciezki: list[str], wzorzec: str = WZORZEC_DANYCH) -> pd.DataFrame:
+    """
+    Funkcja buduje indeks z oczyszczonych danych podanych lat (wejścia reguły pm25_indeks_stacji)
+
+    :param sciezki: Ścieżki danych lat (pm25_godzinowe.parquet)
+    :param wzorzec: Wzorzec ścieżki danych roku (z polem {year}) - rok odczytywany z końca ścieżki
+    :return: Indeks stacji
+    """
+    indeks = pusty_indeks()
+    wzorzec_re = re.compile(re.escape(wzorzec).replace(re.escape("{year}"), r"(\d{4})") + "$")
+
+    for path in sorted(sciezki):
+        rok = wzorzec_re.search(path.replace(os.sep, "/"))
+        if rok is None:
+            raise ValueError(f"Ścieżka {path} nie pasuje do wzorca {wzorzec}")
+        indeks = dodaj_rok(indeks, int(rok.group(1)), stacje_roku(path))
+
+    return indeks
+
+
+def zapisz_indeks(indeks: pd.DataFrame, path: str = INDEKS_PLIK) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    indeks.to_parquet(path, index=False)
+
+
+def wczytaj_indeks(path: str = INDEKS_PLIK) -> pd.DataFrame:
+    return pd.read_parquet(path) if os.path.exists(path) else pusty_indeks()
+
+#----------------------------------------ZAPYTANIA-------------------------------------------
+
+def wspolne_stacje(indeks: pd.DataFrame, years: list[int]) -> list[str]:
+    """
+    Funkcja wybiera stacje z danymi we wszystkich podanych latach
+
+    :param indeks: Indeks stacji
+    :param years: Lata
+    :return: Lista stacji (posortowana)
+    """
+    maska = maska_lat(years)
+    return indeks.loc[(indeks["lata"] & maska) == maska, "Miejscowosc_Stacja"].tolist()
+
+
+def pokrycie(indeks: pd.DataFrame, years: list[int]) -> pd.DataFrame:
+    """
+    Funkcja zwraca dla każdej stacji, w ilu i w których z podanych lat ma dane
+
+    :param indeks: Indeks stacji
+    :param years: Lata
+    :return: df z kolumnami Miejscowosc_Stacja, n_lat oraz kolumną bool dla każdego roku
+    """
+    df = pd.DataFrame({"Miejscowosc_Stacja": indeks["Miejscowosc_Stacja"]})
+    for year in years:
+        df[year] = (indeks["lata"] & bit_roku(int(year))) != 0
+    df["n_lat"] = df[list(years)].sum(axis=1)
+
+    return df
+
+
+def stacje_czesciowe(indeks: pd.DataFrame, years: list[int], min_lat: int) -> list[str]:
+    """
+    Funkcja wybiera stacje z danymi w co najmniej min_lat z podanych lat
+
+    :param indeks: Indeks stacji
+    :param years: Lata
+    :param min_lat: Minimalna liczba lat z danymi
+    :return: Lista stacji (posortowana)
+    """
+    df = pokrycie(indeks, years)
+    return df.loc[df["n_lat"] >= min_lat, "Miejscowosc_Stacja"].tolist()
@@ -58,10 +58,13 @@ def rysuj_wykres_lin(df: pd.DataFrame, miasta: list[str], lata: list[int]) -> Fi
     fig, ax = plt.subplots(figsize=(12, 6))
     miesiac = [i for i in range(1, 13)]
 
+    #Wiersze każdego roku wybierane raz (zamiast maski po całym indeksie dla każdej pary miasto-rok)
+    df_lat = {rok: grupa for rok, grupa in df.groupby(df.index.year)}
+
     ktory_kolor = 0
     for mi in miasta:
         for rok in lata:
-            ax.plot(miesiac, df[mi][df.index.year == rok], 'o-', linewidth=2, markersize=5, color=kolory[ktory_kolor], label=f'{mi} w {rok} roku')
+            ax.plot(miesiac, df_lat[rok][mi], 'o-', linewidth=2, markersize=5, color=kolory[ktory_kolor], label=f'{mi} w {rok} roku')
             ktory_kolor += 1
 
     ax.set_xlabel(f'Miesiąc', size=12)
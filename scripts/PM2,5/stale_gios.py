@@ -0,0 +1,20 @@
+#Stałe archiwum GIOŚ i normy PM2.5 - bez zależności, więc moduły wykresów i epizodów nie importują modułów pobierania
+
+#Archiwum GIOŚ - identyfikatory plików do pobrania i nazwy plików PM2.5 w archiwach
+GIOS_ARCHIVE_URL = "https://powietrze.gios.gov.pl/pjp/archives/downloadFile/"
+
+GIOS_URL_IDS = {2014: '302', 2015: '236', 2018: '603', 2019: '322', 2021: '486', 2024: '582'}
+GIOS_PM25_FILE = {
+    2014: '2014_PM2.5_1g.xlsx',
+    2015: '2015_PM25_1g.xlsx',
+    2018: '2018_PM25_1g.xlsx',
+    2019: '2019_PM25_1g.xlsx',
+    2021: '2021_PM25_1g.xlsx',
+    2024: '2024_PM25_1g.xlsx'
+}
+
+GIOS_METADANE_ID = '622'
+GIOS_METADANE_FILE = 'Metadane oraz kody stacji i stanowisk pomiarowych.xlsx'
+
+#Norma średniego dobowego stężenia PM2.5 (µg/m³) - wspólna dla wszystkich modułów liczących przekroczenia
+NORMA = 15
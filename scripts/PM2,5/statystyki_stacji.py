@@ -0,0 +1,114 @@
+import pandas as pd
+import numpy as np
+import warnings
+
+#Statystyki miesięczne stacji (percentyle, maksimum, kompletność danych) oraz profile godzinowe liczone jednym
+#przebiegiem po macierzy godzinowej: dane roku układane są w blok (miesiąc, 31 dni * 24 godziny, stacja),
+#krótsze miesiące dopełniane NaN - wtedy wszystkie statystyki to jedna operacja numpy wzdłuż osi godzin.
+
+KOLUMNA_DATY = "Miejscowość_Kod stacji"
+PERCENTYLE = [50, 90, 98]
+
+#--------------------------------------------------------------------------------------------
+
+def blok_miesieczny(df: pd.DataFrame) -> tuple[np.ndarray, pd.PeriodIndex, np.ndarray]:
+    """
+    Funkcja układa dane godzinowe w blok (miesiąc, dzień, godzina, stacja) dopełniony NaN
+
+    :param df: df z danymi godzinowymi (kolumna z datą + kolumny stacji)
+    :return: Blok wartości, miesiące (okresy) oraz liczba dni w każdym miesiącu
+    """
+    czas = pd.to_datetime(df[KOLUMNA_DATY])
+    wartosci = df.drop(columns=KOLUMNA_DATY).to_numpy(dtype="float64")
+
+    miesiace = pd.period_range(czas.min().to_period("M"), czas.max().to_period("M"), freq="M")
+    n_dni = miesiace.days_in_month.to_numpy()
+
+    #Pozycja każdego pomiaru w bloku - nr miesiąca, dzień miesiąca, godzina
+    nr_miesiaca = (czas.dt.year.to_numpy() - miesiace[0].year) * 12 + czas.dt.month.to_numpy() - miesiace[0].month
+    dzien = czas.dt.day.to_numpy() - 1
+    godzina = czas.dt.hour.to_numpy()
+
+    blok = np.full((len(miesiace), 31, 24, wartosci.shape[1]), np.nan)
+    blok[nr_miesiaca, dzien, godzina] = wartosci
+
+    return blok, miesiace, n_dni
+
+
+def percentyle_posortowane(posortowane: np.ndarray, n: np.ndarray, percentyle: list[float]) -> np.ndarray:
+    """
+    Funkcja liczy percentyle (interpolacja liniowa, jak np.nanpercentile) z bloku posortowanego wzdłuż osi 1,
+    w którym NaN są na końcu - dla każdego wycinka bierzemy tylko jego n pierwszych wartości.
+
+    :param posortowane: Blok (miesiąc, godziny, stacja) posortowany wzdłuż osi 1
+    :param n: Liczba wartości (nie NaN) w każdym wycinku, kształt (miesiąc, stacja)
+    :param percentyle: Percentyle do policzenia (0-100)
+    :return: Tablica (percentyl, miesiąc, stacja)
+    """
+    wyniki = []
+    for p in percentyle:
+        pozycja = (np.maximum(n, 1) - 1) * p / 100
+        dol = np.floor(pozycja).astype(int)
+        gora = np.ceil(pozycja).astype(int)
+
+        v_dol = np.take_along_axis(posortowane, dol[:, None, :], axis=1)[:, 0, :]
+        v_gora = np.take_along_axis(posortowane, gora[:, None, :], axis=1)[:, 0, :]
+
+        wynik = v_dol + (v_gora - v_dol) * (pozycja - dol)
+        wyniki.append(np.where(n > 0, wynik, np.nan))
+
+    return np.stack(wyniki)
+
+
+def statystyki_miesieczne(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Funkcja liczy dla każdej stacji i miesiąca percentyle (P50, P90, P98), maksimum, liczbę godzin z pomiarem
+    i kompletność danych oraz profil godzinowy (średnia dla każdej godziny doby)
+
+    :param df: df z danymi godzinowymi (kolumna z datą + kolumny stacji)
+    :return: df ze statystykami (wiersz na stację i miesiąc) oraz df z profilem godzinowym (kolumny 1-24)
+    """
+    stacje = df.columns.drop(KOLUMNA_DATY)
+    blok, miesiace, n_dni = blok_miesieczny(df)
+    n_mies, _, _, n_stacji = blok.shape
+
+    godziny = blok.reshape(n_mies, 31 * 24, n_stacji)
+
+    #Jedno sortowanie bloku (NaN trafiają na koniec) wystarcza na wszystkie percentyle i maksimum
+    n_godzin = np.count_nonzero(~np.isnan(godziny), axis=1)
+    posortowane = np.sort(godziny, axis=1)
+
+    percentyle = percentyle_posortowane(posortowane, n_godzin, PERCENTYLE)
+    maksimum = percentyle_posortowane(posortowane, n_godzin, [100])[0]
+    kompletnosc = n_godzin / (n_dni[:, None] * 24)
+
+    #Miesiące/stacje bez żadnego pomiaru dają NaN - ostrzeżenie numpy o pustych wycinkach jest tu oczekiwane
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        profil = np.nanmean(blok, axis=1)
+
+    #Wiersze: miesiąc x stacja
+    miejscowosc = [kol.split('_')[0] for kol in stacje]
+    kod = [kol.split('_')[-1] for kol in stacje]
+
+    df_stat = pd.DataFrame({
+        "Miesiac": np.repeat(miesiace.astype(str), n_stacji),
+        "Miejscowosc": np.tile(miejscowosc, n_mies),
+        "Kod stacji": np.tile(kod, n_mies),
+        **{f"P{p}": percentyle[i].ravel() for i, p in enumerate(PERCENTYLE)},
+        "max": maksimum.ravel(),
+        "n_godzin": n_godzin.ravel(),
+        "kompletnosc": kompletnosc.ravel(),
+    })
+
+    #Pomiar o północy opisuje ostatnią godzinę poprzedniej doby (patrz poprzedni_dzien) - godziny 1-24
+    profil = np.roll(profil, -1, axis=1)
+    df_profil = pd.DataFrame(
+        profil.transpose(0, 2, 1).reshape(n_mies * n_stacji, 24),
+        columns=list(range(1, 25))
+    )
+    df_profil.insert(0, "Kod stacji", np.tile(kod, n_mies))
+    df_profil.insert(0, "Miejscowosc", np.tile(miejscowosc, n_mies))
+    df_profil.insert(0, "Miesiac", np.repeat(miesiace.astype(str), n_stacji))
+
+    return df_stat, df_profil
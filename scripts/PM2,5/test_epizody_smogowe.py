@@ -0,0 +1,70 @@
+import os
+import subprocess
+import sys
+import numpy as np
+import pandas as pd
+
+import epizody_smogowe as eps
+
+
+def epizody_pandas(df: pd.DataFrame, prog: float, min_godzin: int) -> pd.DataFrame:
+    #To samo liczone wprost - rolling na ciągłej osi godzin i pętla po seriach każdej stacji
+    czas = pd.to_datetime(df[eps.KOLUMNA_DATY])
+    czas = czas + pd.to_timedelta((czas.dt.hour == 0).astype(int), unit="D")
+    godzinowe = df.drop(columns=eps.KOLUMNA_DATY).set_index(czas).asfreq("h")
+
+    wiersze = []
+    for stacja, kolumna in godzinowe.items():
+        s24 = kolumna.rolling(24, min_periods=18).mean().round(eps.DOKLADNOSC)
+        s8 = kolumna.rolling(8, min_periods=6).mean().round(eps.DOKLADNOSC)
+        maska = s24 > prog
+        for _, seria in s24[maska].groupby((~maska).cumsum()[maska]):
+            if len(seria) >= min_godzin:
+                wiersze.append({
+                    "Kod stacji": stacja.split('_')[-1],
+                    "Poczatek": seria.index[0],
+                    "Koniec": seria.index[-1],
+                    "Godziny": len(seria),
+                    "Szczyt_24h": round(seria.max(), 2),
+                    "Czas_szczytu_24h": seria.idxmax(),
+                    "Szczyt_8h": round(s8[seria.index].max(), 2),
+                })
+
+    return pd.DataFrame(wiersze)
+
+
+def test_znajdz_epizody_zgodne_z_rolling():
+    #Kilka tygodni danych z falami zanieczyszczeń, brakami pojedynczych godzin i dłuższą przerwą
+    rng = np.random.default_rng(1)
+    czasy = pd.date_range("2024-01-01 01:00", periods=24 * 60, freq="h")
+    fala = 12 + 10 * np.sin(np.arange(len(czasy)) / 40)[:, None]
+    wartosci = fala + rng.gamma(2.0, 3.0, (len(czasy), 3))
+    wartosci[rng.random(wartosci.shape) < 0.1] = np.nan
+    wartosci[500:530, 1] = np.nan
+
+    df = pd.DataFrame(wartosci, columns=["Kraków_A", "Kraków_B", "Gdańsk_C"])
+    #Północ zapisana jako poprzedni dzień, jak po poprzedni_dzien
+    df.insert(0, eps.KOLUMNA_DATY, czasy - pd.to_timedelta((czasy.hour == 0).astype(int), unit="D"))
+
+    wynik = eps.znajdz_epizody(df, eps.PROG, eps.MIN_GODZIN)
+    oczekiwane = epizody_pandas(df, eps.PROG, eps.MIN_GODZIN)
+
+    assert len(oczekiwane) > 5
+    kolumny = list(oczekiwane.columns)
+    wynik = wynik[kolumny].sort_values(["Kod stacji", "Poczatek"]).reset_index(drop=True)
+    oczekiwane = oczekiwane.sort_values(["Kod stacji", "Poczatek"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(wynik, oczekiwane, check_dtype=False)
+
+
+def test_bez_modulow_pobierania():
+    #Osobny interpreter - w procesie testów moduły pobierania mogły już zostać zaimportowane przez inne testy
+    katalog = os.path.dirname(os.path.abspath(__file__))
+    kod = (
+        "import sys, epizody_smogowe, grouped_barplot\n"
+        "zaladowane = {'wczytywanie_i_czyszczenie_danych', 'gios_pobieranie', 'sesja_http'} & set(sys.modules)\n"
+        "assert not zaladowane, zaladowane\n"
+    )
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([katalog, os.path.dirname(katalog)]), "MPLBACKEND": "Agg"}
+    wynik = subprocess.run([sys.executable, "-c", kod], env=env, capture_output=True, text=True)
+
+    assert wynik.returncode == 0, wynik.stderr
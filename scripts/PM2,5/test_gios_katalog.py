@@ -0,0 +1,21 @@
+import gios_katalog as kat
+
+
+def test_parsuj_liste_pomija_pliki_pomocnicze():
+    html = """
+    <a href="/pjp/archives/downloadFile/500">Raport o stanie powietrza 2019</a>
+    <a href="/pjp/archives/downloadFile/501">Statystyki_2000-2019</a>
+    <a href="/pjp/archives/downloadFile/502">Metadane oraz kody stacji 2019</a>
+    <a href="/pjp/archives/downloadFile/322">2019.zip</a>
+    <a href="/pjp/archives/downloadFile/600">Dane pomiarowe <b>2020</b></a>
+    <a href="/pjp/archives/downloadFile/601">Mapa 2021</a>
+    """
+
+    assert kat.parsuj_liste(html) == {"2019": {"id": "322"}, "2020": {"id": "600"}}
+
+
+def test_plik_pm25():
+    nazwy = ["2019_PM10_1g.xlsx", "2019_PM25_24g.xlsx", "2019_PM25_1g.xlsx"]
+
+    assert kat.plik_pm25(nazwy) == "2019_PM25_1g.xlsx"
+    assert kat.plik_pm25(nazwy, 2018) is None
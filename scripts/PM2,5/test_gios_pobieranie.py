@@ -0,0 +1,73 @@
+import io
+import os
+import zipfile
+import pytest
+import requests
+
+import gios_pobieranie as gp
+import gios_serwer_lokalny as gsl
+
+
+@pytest.fixture(scope="module")
+def archiwum() -> bytes:
+    #Zip bez kompresji - bajt zmieniony przez serwer trafia w dane pliku i psuje jego sumę CRC
+    bufor = io.BytesIO()
+    with zipfile.ZipFile(bufor, "w", zipfile.ZIP_STORED) as z:
+        z.writestr("2024_PM25_1g.xlsx", os.urandom(600_000))
+    return bufor.getvalue()
+
+
+def pobierz(tmp_path, archiwum: bytes, **awarie) -> tuple[dict, dict, str]:
+    serwer = gsl.uruchom_serwer({"582": archiwum}, **awarie)
+    output = str(tmp_path / "2024.zip")
+    try:
+        statystyki = gp.pobierz_do_pliku(serwer.url + "582", output, kawalek=16 * 1024, oczekiwanie=0)
+    finally:
+        serwer.shutdown()
+        serwer.server_close()
+
+    with open(output, "rb") as f:
+        assert f.read() == archiwum
+    assert not os.path.exists(f"{output}.part") and not os.path.exists(f"{output}.part.json")
+    return statystyki, serwer.statystyki, output
+
+
+def test_zerwane_polaczenie_wznawiane_od_miejsca_przerwania(tmp_path, archiwum):
+    statystyki, serwer, _ = pobierz(tmp_path, archiwum, przerwij_po=200_000, przerwania=2)
+
+    assert statystyki["wznowienia"] == 2
+    assert serwer["zapytania_range"] == 2
+    #Każdy bajt pobrany dokładnie raz
+    assert statystyki["pobrane"] == len(archiwum)
+
+
+def test_uszkodzone_archiwum_pobierane_od_nowa(tmp_path, archiwum):
+    statystyki, serwer, _ = pobierz(tmp_path, archiwum, uszkodz=1)
+
+    assert serwer["zapytania"] == 2
+    assert serwer["zapytania_range"] == 0
+    assert statystyki["pobrane"] == 2 * len(archiwum)
+
+
+def test_serwer_bez_range_pobieranie_od_poczatku(tmp_path, archiwum):
+    statystyki, serwer, _ = pobierz(tmp_path, archiwum, przerwij_po=200_000, przerwania=1, bez_range=True)
+
+    assert serwer["zapytania"] == 2
+    assert serwer["zapytania_range"] == 0
+    #Po odpowiedzi 200 na zapytanie z Range plik .part zapisywany jest od nowa, nie doklejany
+    assert statystyki["pobrane"] == 200_000 + len(archiwum)
+
+
+def test_brak_pliku_bez_ponawiania(tmp_path, archiwum):
+    serwer = gsl.uruchom_serwer({"582": archiwum})
+    output = str(tmp_path / "2024.zip")
+    try:
+        with pytest.raises(requests.HTTPError) as e:
+            gp.pobierz_do_pliku(serwer.url + "999", output, oczekiwanie=0)
+    finally:
+        serwer.shutdown()
+        serwer.server_close()
+
+    assert e.value.response.status_code == 404
+    assert serwer.statystyki["zapytania"] == 1
+    assert not os.path.exists(output)
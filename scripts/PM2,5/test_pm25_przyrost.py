@@ -0,0 +1,134 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+import pm25_przyrost as prz
+import wczytywanie_i_czyszczenie_danych as wicd
+import stale_gios as sg
+
+POCZATEK = pd.Timestamp("2025-01-01 01:00")
+STACJE = {"A": "Kraków", "B": "Kraków", "C": "Gdańsk"}
+
+
+def zapisz_metadane(path) -> str:
+    pd.DataFrame({
+        "Kod stacji": list(STACJE) + ["D"],
+        "Miejscowość": list(STACJE.values()) + ["Gdańsk"],
+        "Stary Kod stacji \n(o ile inny od aktualnego)": ["A_STARY", None, None, None],
+    }).to_excel(path, index=False)
+    return str(path)
+
+
+def zapisz_zrzut(path, pomiary: pd.DataFrame) -> None:
+    #Format GIOŚ: wiersze nagłówka, wiersz "Kod stacji" i wiersze z godziną pomiaru
+    wiersze = [["Nr", *range(1, pomiary.shape[1] + 1)], ["Kod stacji", *pomiary.columns], ["Wskaźnik", *["PM2.5"] * pomiary.shape[1]]]
+    wiersze += [[czas, *[None if np.isnan(v) else v for v in wartosci]] for czas, wartosci in zip(pomiary.index, pomiary.to_numpy())]
+    pd.DataFrame(wiersze).to_excel(path, header=False, index=False)
+
+
+@pytest.fixture
+def pomiary() -> pd.DataFrame:
+    #Nieco ponad miesiąc pomiarów godzinowych wokół normy, z brakami
+    rng = np.random.default_rng(0)
+    czasy = pd.date_range(POCZATEK, periods=816, freq="h")
+    df = pd.DataFrame(rng.gamma(4.0, sg.NORMA / 4, (len(czasy), len(STACJE))), index=czasy, columns=list(STACJE))
+    return df.mask(rng.random(df.shape) < 0.05)
+
+
+def test_przyrost_zgodny_z_pelnym_przeliczeniem(tmp_path, pomiary):
+    zrzut, katalog = tmp_path / "zrzut", tmp_path / "2025"
+    zrzut.mkdir()
+    metadane = zapisz_metadane(tmp_path / "metadane.xlsx")
+
+    #1: wszystkie stacje; 2: A i B nakładają się na 1, a C (inny plik) spóźnia się względem nich
+    zapisz_zrzut(zrzut / "01.xlsx", pomiary.iloc[:200])
+    prz.dolacz_pomiary(2025, str(zrzut), metadane, str(katalog))
+    zapisz_zrzut(zrzut / "02.xlsx", pomiary.iloc[150:420][["A", "B"]])
+    zapisz_zrzut(zrzut / "03.xlsx", pomiary.iloc[100:410][["C"]])
+    prz.dolacz_pomiary(2025, str(zrzut), metadane, str(katalog))
+
+    #3: plik 02 dopisuje kolejne godziny (zmieniony plik wybrany ponownie), C dochodzi w nowym pliku
+    zapisz_zrzut(zrzut / "02.xlsx", pomiary.iloc[150:600][["A", "B"]])
+    zapisz_zrzut(zrzut / "04.xlsx", pomiary.iloc[405:][["C"]])
+    stan = prz.dolacz_pomiary(2025, str(zrzut), metadane, str(katalog))
+    assert stan["ostatnie"] == {"Kraków_A": str(pomiary["A"].iloc[:600].last_valid_index()),
+                                "Kraków_B": str(pomiary["B"].iloc[:600].last_valid_index()),
+                                "Gdańsk_C": str(pomiary["C"].last_valid_index())}
+
+    #Pełne przeliczenie tych samych danych
+    wszystkie = pomiary.copy()
+    wszystkie.iloc[600:, :2] = np.nan
+    wszystkie = wicd.poprzedni_dzien(wszystkie).sort_index().rename(columns=lambda k: f"{STACJE[k]}_{k}")
+    dobowe = wszystkie.resample("D").mean()
+    miesieczne = wszystkie.resample("ME").mean()
+
+    godzinowe = prz.wczytaj_godzinowe(2025, str(katalog)).set_index(prz.KOLUMNA_DATY)
+    pd.testing.assert_frame_equal(godzinowe[wszystkie.columns], wszystkie.dropna(how="all"),
+                                  check_names=False, check_freq=False)
+
+    for okres, oczekiwane in [("D", dobowe), ("ME", miesieczne)]:
+        kostka = prz.wczytaj_kostke(2025, okres, str(katalog)).set_index(prz.KOLUMNA_DATY)
+        pd.testing.assert_frame_equal(kostka[oczekiwane.columns], oczekiwane, check_names=False, check_freq=False)
+
+        #Każda część kostki zaczyna się od okresu niedomkniętego w poprzedniej - bez przepisywania zamkniętych okresów
+        czesci = [pd.read_parquet(p)[prz.KOLUMNA_DATY] for p in sorted((katalog / prz.CZESCI_KOSTEK[okres]).glob("*.parquet"))]
+        assert len(czesci) == 3
+        for poprzednia, nastepna in zip(czesci, czesci[1:]):
+            assert nastepna.iloc[0] == poprzednia.iloc[-1]
+
+    przekroczenia = pd.read_csv(katalog / "exceedance_days.csv").set_index("Miejscowosc_Stacja")["Ilosc dni z przekroczeniem"]
+    assert przekroczenia.to_dict() == (dobowe > sg.NORMA).sum().to_dict()
+
+
+def test_przyrost_odrzuca_zmiany_wczytanych_godzin(tmp_path, pomiary):
+    zrzut, katalog = tmp_path / "zrzut", tmp_path / "2025"
+    zrzut.mkdir()
+    metadane = zapisz_metadane(tmp_path / "metadane.xlsx")
+
+    zapisz_zrzut(zrzut / "01.xlsx", pomiary.iloc[:200])
+    prz.dolacz_pomiary(2025, str(zrzut), metadane, str(katalog))
+    zapisany = (katalog / "stan_przyrostu.json").read_text(encoding="utf-8")
+
+    #Zmieniony plik poprawia już dołączoną godzinę
+    poprawione = pomiary.iloc[:200].copy()
+    poprawione.iloc[10, 0] = 500.0
+    zapisz_zrzut(zrzut / "01.xlsx", poprawione)
+    with pytest.raises(ValueError, match="01.xlsx"):
+        prz.dolacz_pomiary(2025, str(zrzut), metadane, str(katalog))
+    zapisz_zrzut(zrzut / "01.xlsx", pomiary.iloc[:200])
+
+    #Nowa stacja z pomiarami z dni już zamkniętych
+    zapisz_zrzut(zrzut / "02.xlsx", pd.DataFrame({"D": pomiary["A"].iloc[50:100].to_numpy()}, index=pomiary.index[50:100]))
+    with pytest.raises(ValueError, match="02.xlsx"):
+        prz.dolacz_pomiary(2025, str(zrzut), metadane, str(katalog))
+
+    assert (katalog / "stan_przyrostu.json").read_text(encoding="utf-8") == zapisany
+    assert json.loads(zapisany)["czesci"] == 1
+
+
+def test_zloz_rok(tmp_path, pomiary):
+    import pm25_etapy as et
+    import statystyki_stacji as ss
+    import epizody_smogowe as eps
+
+    zrzut, katalog = tmp_path / "zrzut", tmp_path / "2025"
+    zrzut.mkdir()
+    metadane = zapisz_metadane(tmp_path / "metadane.xlsx")
+    zapisz_zrzut(zrzut / "01.xlsx", pomiary.iloc[:300])
+    prz.dolacz_pomiary(2025, str(zrzut), metadane, str(katalog))
+    zapisz_zrzut(zrzut / "02.xlsx", pomiary.iloc[250:])
+    prz.dolacz_pomiary(2025, str(zrzut), metadane, str(katalog))
+
+    et.etap_zloz(2025, str(katalog), {"epizody": {"prog": 15, "min_godzin": 6}})
+
+    #Pliki w układzie pełnego pipeline'u - złożone z części i policzone z nich tak jak dla pełnego roku
+    czyste = pd.read_parquet(katalog / "pm25_godzinowe.parquet")
+    pd.testing.assert_frame_equal(czyste, prz.wczytaj_godzinowe(2025, str(katalog)))
+    for nazwa, okres in [("srednie_dobowe.parquet", "D"), ("srednie_miesieczne.parquet", "ME")]:
+        pd.testing.assert_frame_equal(pd.read_parquet(katalog / nazwa), prz.wczytaj_kostke(2025, okres, str(katalog)))
+
+    df_stat, _ = ss.statystyki_miesieczne(czyste)
+    pd.testing.assert_frame_equal(pd.read_csv(katalog / "monthly_stats.csv"), df_stat, check_dtype=False)
+    epizody = pd.read_csv(katalog / "episodes.csv")
+    assert len(epizody) == len(eps.znajdz_epizody(czyste, 15, 6)) > 0
@@ -0,0 +1,92 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+import pm25_serwer as srw
+import stale_gios as sg
+
+
+def zapisz_kostki(katalog, year: int, miesieczne: dict, dobowe: dict) -> None:
+    os.makedirs(katalog / str(year), exist_ok=True)
+    for nazwa, kolumny, freq in [("srednie_miesieczne.parquet", miesieczne, "MS"),
+                                 ("srednie_dobowe.parquet", dobowe, "D")]:
+        n = len(next(iter(kolumny.values())))
+        df = pd.DataFrame({srw.KOLUMNA_DATY: pd.date_range(f"{year}-01-01", periods=n, freq=freq), **kolumny})
+        df.to_parquet(katalog / str(year) / nazwa, index=False)
+
+
+def magazyn(tmp_path) -> srw.MagazynPM25:
+    #2019: dwie stacje w Krakowie, 2020: dodatkowo stacja w Gdańsku (brak w 2019)
+    zapisz_kostki(tmp_path, 2019,
+                  {"Kraków_A": [10.0, 20.0, 30.0], "Kraków_B": [np.nan, 40.0, 50.0]},
+                  {"Kraków_A": [10.0, 16.0, 15.0, 30.0], "Kraków_B": [20.0, np.nan, 14.0, 15.5]})
+    zapisz_kostki(tmp_path, 2020,
+                  {"Kraków_A": [5.0, 6.0], "Kraków_B": [7.0, 8.0], "Gdańsk_C": [1.0, np.nan]},
+                  {"Kraków_A": [sg.NORMA + 1, 1.0], "Kraków_B": [2.0, 3.0], "Gdańsk_C": [np.nan, 99.0]})
+    return srw.MagazynPM25(str(tmp_path))
+
+
+def zapytaj(m: srw.MagazynPM25, sciezka: str, **parametry) -> tuple[int, dict]:
+    kod, tresc = m.zapytanie(sciezka, tuple(sorted(parametry.items())))
+    return kod, json.loads(tresc)
+
+
+def test_srednie_miasta_i_zakres(tmp_path):
+    m = magazyn(tmp_path)
+
+    kod, wynik = zapytaj(m, "/srednie", miasto="Kraków", od="2019-02", do="2020-01")
+    assert kod == 200
+    assert wynik["miesiace"] == ["2019-02", "2019-03", "2020-01"]
+    assert wynik["stacje"] == {"A": [20.0, 30.0, 5.0], "B": [40.0, 50.0, 7.0]}
+    assert wynik["srednia"] == [30.0, 40.0, 6.0]
+
+    #Brakujące wartości jako null, średnia tylko z dostępnych stacji
+    kod, wynik = zapytaj(m, "/srednie", miasto="Kraków", do="2019-01")
+    assert wynik["stacje"] == {"A": [10.0], "B": [None]}
+    assert wynik["srednia"] == [10.0]
+
+    #Stacja bez danych w 2019 - same braki
+    kod, wynik = zapytaj(m, "/srednie", stacja="C")
+    assert wynik["miesiace"] == ["2019-01", "2019-02", "2019-03", "2020-01", "2020-02"]
+    assert wynik["stacje"]["C"] == [None, None, None, 1.0, None]
+    assert wynik["srednia"] == [None, None, None, 1.0, None]
+
+
+def test_przekroczenia_krance_zakresu(tmp_path):
+    m = magazyn(tmp_path)
+
+    kod, wynik = zapytaj(m, "/przekroczenia", miasto="Kraków")
+    assert kod == 200
+    assert (wynik["od"], wynik["do"]) == ("2019-01-01", "2020-01-02")
+    #Próg ostry: 15 nie jest przekroczeniem, 15.5 i 16 są
+    assert wynik["stacje"] == {"A": {"dni_z_przekroczeniem": 3, "dni_z_pomiarem": 6},
+                               "B": {"dni_z_przekroczeniem": 2, "dni_z_pomiarem": 5}}
+    assert wynik["suma"] == 5
+    assert wynik["srednia"] == 2.5
+
+    #Oba końce zakresu włącznie
+    kod, wynik = zapytaj(m, "/przekroczenia", stacja="A", od="2019-01-02", do="2019-01-04")
+    assert wynik["stacje"]["A"] == {"dni_z_przekroczeniem": 2, "dni_z_pomiarem": 3}
+
+    kod, wynik = zapytaj(m, "/przekroczenia", stacja="A", od="2020")
+    assert (wynik["od"], wynik["do"]) == ("2020-01-01", "2020-01-02")
+    assert wynik["stacje"]["A"]["dni_z_przekroczeniem"] == 1
+
+    #Zakres poza danymi - pusty wycinek
+    kod, wynik = zapytaj(m, "/przekroczenia", stacja="C", od="2021-01-01")
+    assert kod == 200
+    assert (wynik["od"], wynik["do"], wynik["suma"]) == (None, None, 0)
+
+
+def test_bledne_zapytania(tmp_path):
+    m = magazyn(tmp_path)
+
+    kod, wynik = zapytaj(m, "/srednie", stacja="X")
+    assert kod == 404 and "X" in wynik["error"]
+    kod, wynik = zapytaj(m, "/przekroczenia", miasto="Poznań")
+    assert kod == 404
+    kod, _ = zapytaj(m, "/srednie")
+    assert kod == 400
+    kod, _ = zapytaj(m, "/przekroczenia", stacja="A", od="nie-data")
+    assert kod == 400
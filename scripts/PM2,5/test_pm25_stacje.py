@@ -0,0 +1,49 @@
+import itertools
+import pandas as pd
+import pytest
+
+import pm25_stacje as st
+
+STACJE_LAT = {
+    2019: ["Kraków_A", "Kraków_B", "Gdańsk_C"],
+    2020: ["Kraków_A", "Gdańsk_C", "Wrocław_D"],
+    2024: ["Kraków_A", "Kraków_B", "Wrocław_D", "Łódź_E"],
+}
+
+
+@pytest.fixture
+def sciezki(tmp_path) -> list[str]:
+    #Oczyszczone dane lat w układzie results/pm25/{rok}/pm25_godzinowe.parquet - indeks czyta tylko schemat
+    wynik = []
+    for rok, stacje in STACJE_LAT.items():
+        path = tmp_path / "results" / "pm25" / str(rok) / "pm25_godzinowe.parquet"
+        path.parent.mkdir(parents=True)
+        df = pd.DataFrame({st.KOLUMNA_DATY: pd.date_range(f"{rok}-01-01 01:00", periods=3, freq="h")})
+        df[stacje] = 1.0
+        df.to_parquet(path, index=False)
+        wynik.append(str(path))
+    return wynik
+
+
+def test_wspolne_stacje_jak_przeciecie_zbiorow(sciezki):
+    indeks = st.zbuduj_indeks(sciezki)
+
+    assert sorted(indeks["Miejscowosc_Stacja"]) == sorted(set().union(*STACJE_LAT.values()))
+    for n in range(1, len(STACJE_LAT) + 1):
+        for lata in itertools.combinations(STACJE_LAT, n):
+            oczekiwane = set.intersection(*(set(STACJE_LAT[rok]) for rok in lata))
+            assert st.wspolne_stacje(indeks, list(lata)) == sorted(oczekiwane)
+
+
+def test_indeks_tylko_z_podanych_plikow(sciezki):
+    #Pliki innych lat w tym samym katalogu nie trafiają do indeksu
+    indeks = st.zbuduj_indeks(sciezki[:2])
+
+    assert st.wspolne_stacje(indeks, [2024]) == []
+    assert "Łódź_E" not in set(indeks["Miejscowosc_Stacja"])
+    assert st.stacje_czesciowe(indeks, [2019, 2020], 1) == ["Gdańsk_C", "Kraków_A", "Kraków_B", "Wrocław_D"]
+
+
+def test_sciezka_spoza_wzorca(tmp_path):
+    with pytest.raises(ValueError):
+        st.zbuduj_indeks([str(tmp_path / "dane.parquet")])
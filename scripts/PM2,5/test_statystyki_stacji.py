@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+import statystyki_stacji as ss
+
+
+def pomiary() -> pd.DataFrame:
+    #Godziny od połowy stycznia do początku marca roku przestępnego (29 dni lutego), z brakami
+    #i stacją, która w lutym mierzy tylko o północy
+    rng = np.random.default_rng(2)
+    czasy = pd.date_range("2024-01-15 01:00", "2024-03-10 00:00", freq="h")
+    wartosci = rng.gamma(2.0, 8.0, (len(czasy), 3)).round(1)
+    wartosci[rng.random(wartosci.shape) < 0.15] = np.nan
+    luty = (czasy.month == 2) & (czasy.day > 1)
+    wartosci[luty & (czasy.hour == 0), 2] = 20.0
+    wartosci[(czasy.month == 2) & (czasy.hour != 0), 2] = np.nan
+    wartosci[(czasy.month == 3) & (czasy.day == 1) & (czasy.hour == 0), 2] = np.nan
+
+    df = pd.DataFrame(wartosci, columns=["Kraków_A", "Kraków_B", "Gdańsk_C"])
+    #Północ zapisana jako poprzedni dzień, jak po poprzedni_dzien
+    df.insert(0, ss.KOLUMNA_DATY, czasy - pd.to_timedelta((czasy.hour == 0).astype(int), unit="D"))
+    return df
+
+
+def dlugi_format(df: pd.DataFrame) -> pd.DataFrame:
+    czas = pd.to_datetime(df[ss.KOLUMNA_DATY])
+    dlugi = df.drop(columns=ss.KOLUMNA_DATY).assign(Miesiac=czas.dt.to_period("M").astype(str), godzina=czas.dt.hour)
+    dlugi = dlugi.melt(id_vars=["Miesiac", "godzina"], var_name="stacja", value_name="wartosc")
+    dlugi["Kod stacji"] = dlugi["stacja"].str.split('_').str[-1]
+    return dlugi
+
+
+def test_statystyki_zgodne_z_groupby():
+    df = pomiary()
+    wynik, _ = ss.statystyki_miesieczne(df)
+
+    grupy = dlugi_format(df).groupby(["Miesiac", "Kod stacji"])["wartosc"]
+    oczekiwane = pd.DataFrame({
+        **{f"P{p}": grupy.quantile(p / 100) for p in ss.PERCENTYLE},
+        "max": grupy.max(),
+        "n_godzin": grupy.count(),
+    })
+    dni = pd.PeriodIndex(oczekiwane.index.get_level_values("Miesiac"), freq="M").days_in_month
+    oczekiwane["kompletnosc"] = oczekiwane["n_godzin"] / (dni.to_numpy() * 24)
+
+    wynik = wynik.set_index(["Miesiac", "Kod stacji"]).loc[oczekiwane.index, oczekiwane.columns]
+    pd.testing.assert_frame_equal(wynik, oczekiwane, check_dtype=False)
+
+    #Luty 2024 ma 29 dni, stacja C w lutym tylko pomiary o północy (zapisane jako godzina 0)
+    assert wynik.loc[("2024-02", "A"), "n_godzin"] <= 29 * 24
+    assert wynik.loc[("2024-02", "C"), "n_godzin"] == 28
+    assert np.isclose(wynik.loc[("2024-02", "C"), "kompletnosc"], 28 / (29 * 24))
+
+
+def test_profil_godzinowy_zgodny_z_groupby():
+    df = pomiary()
+    _, wynik = ss.statystyki_miesieczne(df)
+
+    dlugi = dlugi_format(df)
+    #Godzina 0 (pomiar o północy) to ostatnia godzina doby - kolumna 24
+    dlugi["godzina"] = dlugi["godzina"].replace(0, 24)
+    oczekiwane = dlugi.pivot_table(index=["Miesiac", "Kod stacji"], columns="godzina", values="wartosc",
+                                   aggfunc="mean", dropna=False)
+
+    wynik = wynik.set_index(["Miesiac", "Kod stacji"]).drop(columns="Miejscowosc")
+    wynik = wynik.loc[oczekiwane.index, list(oczekiwane.columns)]
+    np.testing.assert_allclose(wynik.to_numpy(), oczekiwane.to_numpy(), equal_nan=True)
+
+    #Stacja C w lutym ma pomiary tylko o północy
+    profil_c = wynik.loc[("2024-02", "C")]
+    assert profil_c.drop(24).isna().all() and not np.isnan(profil_c[24])
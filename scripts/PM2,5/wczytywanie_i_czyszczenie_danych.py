@@ -1,22 +1,60 @@
 import pandas as pd
-import requests
 import zipfile
 import io, os
 import sys
 import datetime
 import re
+import tempfile
+
+import gios_pobieranie as gp
 
 #----------------------------------------------------------------------------------
 
-#Funkcja do ściągania podanego archiwum
-def download_gios_archive(year: int, gios_id: str, gios_archive_url: str, filename: str) -> pd.DataFrame:
-    #Pobranie archiwum ZIP do pamięci
-    url = f"{gios_archive_url}{gios_id}"
-    response = requests.get(url)
-    response.raise_for_status()  #Jeśli błąd HTTP, zatrzymaj
+#Pobranie surowego pliku z archiwum GIOŚ prosto na dysk (bez rozpakowywania)
+def pobierz_plik_gios_do(gios_id: str, gios_archive_url: str, output: str) -> dict:
+    """
+    Funkcja pobiera surowy plik (zip z danymi lub xlsx z metadanymi) z archiwum GIOŚ do pliku - kawałkami,
+    z wznawianiem przerwanego pobierania i sprawdzeniem archiwum (gios_pobieranie)
+
+    :param gios_id: Identyfikator pliku w archiwum
+    :param gios_archive_url: Adres archiwum
+    :param output: Ścieżka pliku docelowego
+    :return: Statystyki pobierania (rozmiar, pobrane, czas, mb_s, wznowienia)
+    """
+    return gp.pobierz_do_pliku(f"{gios_archive_url}{gios_id}", output)
+
 
-    #Otwórz zip w pamięci
-    with zipfile.ZipFile(io.BytesIO(response.content)) as z:
+#Pobranie surowego pliku z archiwum GIOŚ (bez rozpakowywania)
+def pobierz_plik_gios(gios_id: str, gios_archive_url: str) -> bytes:
+    """
+    Funkcja pobiera surowy plik (zip z danymi lub xlsx z metadanymi) z archiwum GIOŚ
+
+    :param gios_id: Identyfikator pliku w archiwum
+    :param gios_archive_url: Adres archiwum
+    :return: Zawartość pliku
+    """
+    #Przez plik tymczasowy - to samo pobieranie kawałkami co w pipeline
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, str(gios_id))
+        pobierz_plik_gios_do(gios_id, gios_archive_url, path)
+        with open(path, "rb") as f:
+            return f.read()
+
+
+#Wczytanie danych PM2.5 z pobranego archiwum
+def wczytaj_archiwum(year: int, archiwum: bytes | str, filename: str) -> pd.DataFrame:
+    """
+    Funkcja wczytuje plik z danymi godzinowymi z archiwum zip (w pamięci lub na dysku)
+
+    :param year: Rok danych
+    :param archiwum: Zawartość archiwum albo ścieżka do pliku zip
+    :param filename: Nazwa pliku z PM2.5 w archiwum
+    :return: df z surowymi danymi
+    """
+    if isinstance(archiwum, bytes):
+        archiwum = io.BytesIO(archiwum)
+
+    with zipfile.ZipFile(archiwum) as z:
         #Znajdź właściwy plik z PM2.5
         if not filename:
             print(f"Błąd: nie znaleziono {filename}.")
@@ -30,17 +68,28 @@ def download_gios_archive(year: int, gios_id: str, gios_archive_url: str, filena
 
     return df
 
+
+#Funkcja do ściągania podanego archiwum
+def download_gios_archive(year: int, gios_id: str, gios_archive_url: str, filename: str) -> pd.DataFrame:
+    #Pobranie archiwum ZIP do pamięci
+    return wczytaj_archiwum(year, pobierz_plik_gios(gios_id, gios_archive_url), filename)
+
 #----------------------------------------------------------------------------------
 
-#Pobranie metadanych
-def download_metadane(gios_id: str, gios_archive_url: str, filename: str) -> pd.DataFrame:
-    url = f"{gios_archive_url}{gios_id}"
-    response = requests.get(url)
-    response.raise_for_status()
+#Wczytanie metadanych z pobranego pliku
+def wczytaj_metadane(plik: bytes | str, filename: str) -> pd.DataFrame:
+    """
+    Funkcja wczytuje metadane stacji (w pamięci lub z dysku) i czyści kody stacji
+
+    :param plik: Zawartość pliku xlsx albo ścieżka do niego
+    :param filename: Nazwa pliku (do komunikatów)
+    :return: df z metadanymi
+    """
+    if isinstance(plik, bytes):
+        plik = io.BytesIO(plik)
 
     try:
-        z = io.BytesIO(response.content)
-        df = pd.read_excel(z, header=0)
+        df = pd.read_excel(plik, header=0)
     except Exception as e:
         print(f"Błąd przy wczytywaniu {filename}, {e}")
 
@@ -48,6 +97,11 @@ def download_metadane(gios_id: str, gios_archive_url: str, filename: str) -> pd.
     df["Kod stacji"] = df["Kod stacji"].astype(str).str.strip().str.replace(r'[\n\r\t]', '', regex=True)
     return df
 
+
+#Pobranie metadanych
+def download_metadane(gios_id: str, gios_archive_url: str, filename: str) -> pd.DataFrame:
+    return wczytaj_metadane(pobierz_plik_gios(gios_id, gios_archive_url), filename)
+
 #----------------------------------------------------------------------------------
 
 ##Definicje funkcji czyszczących pliki
@@ -0,0 +1,96 @@
+from Bio import Entrez
+from pubmed_limit import czekaj_na_zapytanie
+import gzip
+import json
+import os
+import xml.etree.ElementTree as ET
+from typing import Any, IO, Iterator
+
+#-------------------------------------PARSOWANIE_XML------------------------------------
+
+def rekord_z_artykulu(artykul: ET.Element) -> dict[str, Any]:
+    """
+    Funkcja wyciąga z elementu PubmedArticle potrzebne pola: tytuł, czasopismo, abstrakt oraz deskryptory MeSH.
+
+    :param artykul: Element XML PubmedArticle z odpowiedzi efetch
+    :return: Słownik z danymi artykułu
+    """
+    cytowanie = artykul.find("MedlineCitation")
+    art = cytowanie.find("Article")
+
+    #Abstrakty strukturalne składają się z kilku części z etykietami (BACKGROUND, METHODS, ...)
+    czesci = []
+    for tekst in art.findall("Abstract/AbstractText"):
+        etykieta = tekst.get("Label")
+        tresc = "".join(tekst.itertext()).strip()
+        czesci.append(f"{etykieta}: {tresc}" if etykieta else tresc)
+
+    tytul = art.find("ArticleTitle")
+
+    return {
+        "PMID": cytowanie.findtext("PMID", default=""),
+        "title": "".join(tytul.itertext()).strip() if tytul is not None else "",
+        "journal": art.findtext("Journal/Title", default=""),
+        "abstract": " ".join(czesci),
+        "mesh": [
+            d.text for d in cytowanie.findall("MeshHeadingList/MeshHeading/DescriptorName")
+        ],
+    }
+
+
+def parsuj_artykuly(stream: IO) -> Iterator[dict[str, Any]]:
+    """
+    Funkcja parsuje odpowiedź efetch przyrostowo - zwraca kolejne artykuły, gdy tylko zostaną wczytane,
+    a przetworzone elementy są od razu usuwane z drzewa, więc pamięć nie rośnie wraz z liczbą artykułów.
+
+    :param stream: Strumień z odpowiedzią XML (np. z Entrez.efetch)
+    :return: Generator słowników z danymi kolejnych artykułów
+    """
+    kontekst = ET.iterparse(stream, events=("start", "end"))
+    _, korzen = next(kontekst)
+
+    for zdarzenie, elem in kontekst:
+        if zdarzenie == "end" and elem.tag == "PubmedArticle":
+            yield rekord_z_artykulu(elem)
+            #Czyścimy korzeń - inaczej trzymałby (puste) elementy wszystkich artykułów
+            korzen.clear()
+
+#-------------------------------------ZAPIS_DO_PLIKU------------------------------------
+
+def pobierz_abstrakty(pmids: list[str], config: dict[str, Any], out_path: str, batch: int = 200) -> int:
+    """
+    Funkcja pobiera pełne rekordy (efetch) dla podanych pmids i zapisuje je na bieżąco do skompresowanego pliku JSONL.
+
+    :param pmids: Lista id artykułów
+    :param config: słownik reprezentujący config (pubmed.yaml)
+    :param out_path: Ścieżka pliku wynikowego (.jsonl.gz)
+    :param batch: Liczba artykułów pobieranych w jednym zapytaniu
+    :return: Liczba zapisanych artykułów
+    """
+    Entrez.email = config["email"]
+    n = 0
+
+    with gzip.open(out_path, "wt", encoding="utf-8") as f:
+        for partia in [pmids[i:i + batch] for i in range(0, len(pmids), batch)]:
+            czekaj_na_zapytanie(config)
+            stream = Entrez.efetch(db="pubmed", id=",".join(partia), retmode="xml")
+            try:
+                for rekord in parsuj_artykuly(stream):
+                    f.write(json.dumps(rekord, ensure_ascii=False) + "\n")
+                    n += 1
+            finally:
+                stream.close()
+
+    return n
+
+
+def wczytaj_abstrakty(path: str) -> Iterator[dict[str, Any]]:
+    """
+    Funkcja wczytuje kolejno rekordy z pliku zapisanego przez pobierz_abstrakty
+
+    :param path: Ścieżka pliku .jsonl.gz
+    :return: Generator słowników z danymi artykułów
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for linia in f:
+            yield json.loads(linia)
@@ -0,0 +1,142 @@
+import heapq
+import pandas as pd
+from collections import Counter, defaultdict
+from typing import Any, Hashable
+
+#-------------------------------------SPACE_SAVING------------------------------------
+
+class SpaceSaving:
+    """
+    Przybliżone zliczanie najczęstszych elementów (algorytm Space-Saving) w stałej pamięci.
+    Trzymamy co najwyżej "pojemnosc" liczników - nowy element zastępuje ten z najmniejszym licznikiem
+    i dziedziczy jego wartość (jako górne oszacowanie błędu). Elementy o częstości większej niż
+    suma/pojemnosc zawsze zostają w liczniku.
+    """
+
+    def __init__(self, pojemnosc: int):
+        self.pojemnosc = pojemnosc
+        self.liczniki = {}
+        self.bledy = {}
+        #Kopiec z (licznik, element) - nieaktualne wpisy pomijamy przy zdejmowaniu
+        self.kopiec = []
+
+    def dodaj(self, element: Hashable, waga: int = 1) -> None:
+        """
+        Funkcja zwiększa licznik elementu o podaną wagę
+
+        :param element: Zliczany element
+        :param waga: Wartość o którą zwiększamy licznik
+        """
+        if element in self.liczniki:
+            self.liczniki[element] += waga
+        elif len(self.liczniki) < self.pojemnosc:
+            self.liczniki[element] = waga
+            self.bledy[element] = 0
+        else:
+            minimum, usuwany = self.zdejmij_minimum()
+            del self.liczniki[usuwany]
+            del self.bledy[usuwany]
+            self.liczniki[element] = minimum + waga
+            self.bledy[element] = minimum
+
+        heapq.heappush(self.kopiec, (self.liczniki[element], element))
+
+        #Kopiec rośnie o nieaktualne wpisy - co jakiś czas budujemy go od nowa
+        if len(self.kopiec) > 4 * self.pojemnosc:
+            self.kopiec = [(n, e) for e, n in self.liczniki.items()]
+            heapq.heapify(self.kopiec)
+
+    def zdejmij_minimum(self) -> tuple[int, Hashable]:
+        """
+        Funkcja znajduje element z najmniejszym licznikiem
+
+        :return: Krotka (licznik, element)
+        """
+        while True:
+            n, element = heapq.heappop(self.kopiec)
+            if self.liczniki.get(element) == n:
+                return n, element
+
+    def items(self) -> list[tuple[Hashable, int]]:
+        return list(self.liczniki.items())
+
+#-------------------------------------AGREGATOR------------------------------------
+
+class AgregatorPubMed:
+    """
+    Agregator liczący na bieżąco (w trakcie pobierania) dane do summary_by_year.csv i top_journals.csv,
+    bez trzymania w pamięci całej tabeli publikacji.
+
+    Liczniki odpowiadają make_summary_by_year (unikalne PMID dla pary rok-zapytanie) oraz top_n_journals
+    (każde dopasowanie publikacji do zapytania liczy się osobno). W trybie dokładnym pamięć rośnie z liczbą
+    dopasowań (zbiory PMID), w przybliżonym jest stała: liczba dla pary rok-zapytanie i "pojemnosc" liczników czasopism.
+    """
+
+    def __init__(self, top_n: int, przyblizony: bool = False, pojemnosc: int = 1000):
+        self.top_n = top_n
+        self.przyblizony = przyblizony
+        #Dla każdej pary (rok, zapytanie) - zbiór PMID (tryb dokładny) albo sama liczba
+        self.pmidy = defaultdict(set)
+        self.liczby = Counter()
+        self.czasopisma = SpaceSaving(pojemnosc) if przyblizony else Counter()
+
+    def dodaj_linki(self, df_pmids: pd.DataFrame) -> None:
+        """
+        Funkcja dodaje powiązania publikacja-zapytanie (wynik papers_per_query)
+
+        :param df_pmids: Df z kolumnami year, query, PMID
+        """
+        if self.przyblizony:
+            #Wyniki jednego esearch nie zawierają powtórzeń - wystarczy licznik
+            self.liczby.update(df_pmids.groupby(["year", "query"]).size().to_dict())
+            return
+
+        for year, query, pmid in df_pmids[["year", "query", "PMID"]].itertuples(index=False):
+            self.pmidy[(year, query)].add(int(pmid))
+
+    def dodaj_metadane(self, df_batch: pd.DataFrame) -> None:
+        """
+        Funkcja dodaje paczkę metadanych do liczników czasopism. Paczka ma jeden wiersz na każde dopasowanie
+        publikacji do zapytania (jak pubmed_papers.csv), więc publikacja liczy się tyle razy, ile zapytań ją znalazło.
+
+        :param df_batch: Df z kolumną journal
+        """
+        for journal, n in df_batch["journal"].value_counts(sort=False).items():
+            if self.przyblizony:
+                self.czasopisma.dodaj(journal, int(n))
+            else:
+                self.czasopisma[journal] += int(n)
+
+    def summary_by_year(self) -> pd.DataFrame:
+        """
+        Funkcja zwraca podsumowanie liczby publikacji dla zapytań (jak make_summary_by_year)
+
+        :return: Podsumowanie liczby dopasowań dla zapytania
+        """
+        if self.przyblizony:
+            liczby = self.liczby.items()
+        else:
+            liczby = ((klucz, len(pmidy)) for klucz, pmidy in self.pmidy.items())
+
+        rows = [{"year": year, "query": query, "n_publications": n} for (year, query), n in liczby]
+
+        return (
+            pd.DataFrame(rows, columns=["year", "query", "n_publications"])
+            .sort_values(["query", "year"])
+        )
+
+    def top_journals(self) -> pd.DataFrame:
+        """
+        Funkcja zwraca top n czasopism (jak top_n_journals). W trybie przybliżonym liczby są górnym oszacowaniem.
+
+        :return: nazwy czasopism wraz z ilością publikacji w danym roku
+        """
+        df = pd.DataFrame(list(self.czasopisma.items()), columns=["journal", "num_publications"])
+
+        #Ta sama kolejność operacji co w top_n_journals (groupby sortuje po nazwie), żeby remisy wypadały tak samo
+        return (
+            df
+            .sort_values("journal")
+            .sort_values("num_publications", ascending=False)
+            .head(self.top_n)
+        )
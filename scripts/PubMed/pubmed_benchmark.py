@@ -0,0 +1,76 @@
+import pubmed_funkcje as fun
+import pubmed_serwer_lokalny as srv
+
+from Bio import Entrez
+import argparse
+import os
+import tempfile
+import time
+import pandas as pd
+
+#Pomiar przepustowości pobierania z PubMed na lokalnym serwerze zastępczym (bez dostępu do NCBI)
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--rozmiary", nargs="+", type=int, default=[100, 1000, 5000],
+                    help="Liczby publikacji w korpusie do zmierzenia")
+parser.add_argument("--zapytania", type=int, default=3, help="Liczba zapytań w configu")
+parser.add_argument("--opoznienie", type=float, default=0.05, help="Opóźnienie odpowiedzi serwera [s]")
+parser.add_argument("--limit-serwera", type=float, default=None, help="Limit zapytań/s po stronie serwera (429 powyżej)")
+parser.add_argument("--p429", type=float, default=0.0, help="Prawdopodobieństwo wstrzyknięcia odpowiedzi 429")
+parser.add_argument("--limit-klienta", type=float, default=3, help="limit_zapytan w configu klienta")
+parser.add_argument("--watki", type=int, default=1, help="Liczba wątków pobierających (watki w configu klienta)")
+parser.add_argument("--korpus", default=None, help="Opcjonalny pubmed_papers.csv z prawdziwymi danymi zamiast korpusu syntetycznego")
+parser.add_argument("--output", default=None, help="Opcjonalny plik CSV z wynikami")
+
+args = parser.parse_args()
+
+#Przy wstrzykiwaniu błędów nie chcemy czekać 15 s między próbami
+Entrez.max_tries = 10
+Entrez.sleep_between_tries = 1
+
+wyniki = []
+with tempfile.TemporaryDirectory() as tmp:
+    for n in args.rozmiary:
+        korpus = srv.korpus_z_csv(args.korpus).head(n) if args.korpus else srv.korpus_syntetyczny(n)
+
+        #Serwer zawęża wyniki do roku z zapytania - szukamy w roku, z którego pochodzi większość korpusu
+        rok = int(korpus["ppublish_year"].str[:4].mode()[0])
+
+        serwer = srv.uruchom_serwer(korpus, opoznienie=args.opoznienie, limit=args.limit_serwera, p429=args.p429)
+
+        cfg = {
+            "email": "benchmark@localhost",
+            "zapytania": [f"benchmark {i}" for i in range(args.zapytania)],
+            "lim_wynikow": n,
+            "limit_zapytan": args.limit_klienta,
+            "plik_limitu": os.path.join(tmp, f"limit_{n}.lock"),
+            "watki": args.watki,
+        }
+
+        try:
+            with srv.przekieruj_entrez(serwer.url):
+                start = time.perf_counter()
+                pubmed_data = fun.dl_papers(rok, cfg)
+                fun.make_summary_by_year(pubmed_data)
+                fun.top_n_journals(pubmed_data, {"top_n": 10})
+                czas = time.perf_counter() - start
+        finally:
+            serwer.shutdown()
+            serwer.server_close()
+
+        stat = serwer.statystyki
+        wyniki.append({
+            "n_publikacji": n,
+            "n_wierszy": len(pubmed_data),
+            "zapytania_http": stat["zapytania"],
+            "odpowiedzi_429": stat["odpowiedzi_429"],
+            "czas_s": round(czas, 3),
+            "zapytania_na_s": round(stat["zapytania"] / czas, 2),
+            "publikacje_na_s": round(len(korpus) / czas, 1),
+        })
+
+df_wyniki = pd.DataFrame(wyniki)
+print(df_wyniki.to_markdown(index=False))
+
+if args.output:
+    df_wyniki.to_csv(args.output, index=False)
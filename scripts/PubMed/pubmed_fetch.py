@@ -1,51 +1,186 @@
-import pubmed_funkcje as fun
-
-import yaml
 import argparse
 import os
-import matplotlib.pyplot as plt
+from typing import Any
+
+import historia_uruchomien as hist
+
+#Moduły z pandas/Bio/matplotlib importowane w funkcjach - sam import skryptu (np. przez wykonawcę zadań) jest tani
+
+
+def zapisz_podsumowania(year, out_dir, summary_by_year, top_journals, linki, cfg):
+    import matplotlib.pyplot as plt
+    import pubmed_funkcje as fun
+    import pubmed_abstrakty as abstr
+    import pubmed_nakladanie as nkl
+
+    #------------------------------------------SUMMARY------------------------------------------
+
+    summary_file = os.path.join(out_dir, "summary_by_year.csv")
+    summary_by_year.to_csv(summary_file, index=False)
+
+    #-------------------------------------TOP_10_JOURNALS---------------------------------------
+
+    top_journals_file = os.path.join(out_dir, "top_journals.csv")
+    top_journals.to_csv(top_journals_file, index=False)
+
+    #-------------------------------------NAKLADANIE_ZAPYTAN--------------------------------------
+
+    nkl.zapisz_nakladanie(linki, out_dir)
+
+    #-------------------------------------ABSTRAKTY_I_MESH---------------------------------------
 
-parser = argparse.ArgumentParser()
-parser.add_argument ("--year", type=int, required=True)
-parser.add_argument("--config",  required=True)
+    if cfg.get("abstrakty", False):
+        abstr.pobierz_abstrakty(linki["PMID"].astype(str).unique().tolist(), cfg, os.path.join(out_dir, "abstracts.jsonl.gz"))
 
-args = parser.parse_args()
-year = args.year
-config_path = args.config
+    #-------------------------------------BARPLOT---------------------------------------
 
-with open(config_path) as f:
-    config = yaml.safe_load(f)
+    papers_barplot = fun.summary_barplot(summary_by_year, year)
+    papers_barplot.savefig(os.path.join(out_dir, f"papers_per_year.png"), dpi=300, bbox_inches="tight")
+    plt.close(papers_barplot)
 
-cfg = config["PubMed_search_params"]
 
-out_dir = f'results/literature/{year}'
+def zapisz_kompaktowe(tabele, out_dir, kompaktowo, graf_autorow):
+    import pubmed_kompakt as kmp
 
-pubmed_data = fun.dl_papers(year, cfg)
+    if kompaktowo:
+        kmp.zapisz_parquet(tabele, out_dir)
+    if graf_autorow:
+        import pubmed_graf as graf
+        graf.zapisz_statystyki(tabele, out_dir)
 
-#-------------------------------------PUBLIKACJE_DO_PLIKU------------------------------------
 
-pubmed_papers = pubmed_data.iloc[:, :-2]
-papers_file = os.path.join(out_dir, "pubmed_papers.csv")
-pubmed_papers.to_csv(papers_file, index=False)
+def pobierz(years: list[int], cfg: dict[str, Any]) -> None:
+    """
+    Funkcja pobiera publikacje dla podanych lat i zapisuje wyniki w results/literature/{rok}
 
-#------------------------------------------SUMMARY------------------------------------------
+    :param years: Lata publikacji
+    :param cfg: słownik PubMed_search_params z configu
+    """
+    import pubmed_funkcje as fun
+    import pubmed_agregacja as agr
+    import pubmed_kompakt as kmp
+    import pubmed_indeks as ind
 
-summary_by_year = fun.make_summary_by_year(pubmed_data)
+    #Tryb przyrostowy - pobieramy tylko publikacje dodane/zmienione od ostatniego uruchomienia
+    przyrostowo = cfg.get("przyrostowo", False)
 
-summary_file = os.path.join(out_dir, "summary_by_year.csv")
-summary_by_year.to_csv(summary_file, index=False)
+    #Agregacja "strumieniowa"/"przyblizona" - podsumowania liczone w trakcie pobierania, bez całej tabeli w pamięci
+    agregacja = cfg.get("agregacja", "pandas")
 
-#-------------------------------------TOP_10_JOURNALS---------------------------------------
+    #Dodatkowy zapis w zwartym formacie (Parquet, typowane kolumny, osobna tabela PMID-zapytanie)
+    kompaktowo = cfg.get("format_kompaktowy", False)
 
-top_journals = fun.top_n_journals(pubmed_data, cfg)
+    #Statystyki autorów z macierzy rzadkich (pubmed_graf.py) - budowane z tych samych tabel kompaktowych
+    graf_autorow = cfg.get("graf_autorow", False)
 
-top_journals_file = os.path.join(out_dir, "top_journals.csv")
-top_journals.to_csv(top_journals_file, index=False)
+    if przyrostowo:
+        #Pobieranie przyrostowe jest już tanie - każdy rok ma swój stan i znaczniki dat
+        for year in years:
+            out_dir = f'results/literature/{year}'
+            os.makedirs(out_dir, exist_ok=True)
 
-#-------------------------------------BARPLOT---------------------------------------
+            pubmed_data, stan = fun.dl_papers_przyrostowo(year, cfg, out_dir)
+            hist.dolicz("wiersze", len(pubmed_data))
+            pubmed_data.iloc[:, :-2].to_csv(os.path.join(out_dir, "pubmed_papers.csv"), index=False)
+            fun.zapisz_stan(out_dir, pubmed_data, stan)
+            ind.zapisz_z_danych(pubmed_data, out_dir)
+            if kompaktowo or graf_autorow:
+                zapisz_kompaktowe(kmp.z_danych(pubmed_data), out_dir, kompaktowo, graf_autorow)
 
-papers_barplot = fun.summary_barplot(summary_by_year, year)
-papers_barplot.savefig(os.path.join(out_dir, f"papers_per_year.png"), dpi=300, bbox_inches="tight")
-plt.close(papers_barplot)
+            zapisz_podsumowania(
+                year, out_dir,
+                fun.summary_ze_stanu(stan, year),
+                fun.top_journals_ze_stanu(stan, cfg),
+                pubmed_data[["query", "PMID"]],
+                cfg
+            )
 
+    elif agregacja != "pandas":
+        #Przy kilku latach każdy rok pobierany jest strumieniowo osobno - bez wspólnych paczek esummary,
+        #ale też bez trzymania metadanych wszystkich lat naraz
+        for year in years:
+            out_dir = f'results/literature/{year}'
+            os.makedirs(out_dir, exist_ok=True)
 
+            agregator = agr.AgregatorPubMed(
+                cfg["top_n"],
+                przyblizony=(agregacja == "przyblizona"),
+                pojemnosc=int(cfg.get("pojemnosc_top", 1000))
+            )
+            #Tabele kompaktowe tylko na potrzeby zapisu Parquet lub grafu autorów - indeks tytułów powstaje
+            #po pobraniu z kolumn PMID i title zapisanego pliku
+            kompakt = kmp.TabeleKompaktowe() if kompaktowo or graf_autorow else None
+            papers_file = os.path.join(out_dir, "pubmed_papers.csv")
+            linki = fun.dl_papers_strumieniowo(year, cfg, agregator, papers_file, kompakt)
+            hist.dolicz("wiersze", len(linki))
+            ind.zapisz_z_pliku(papers_file, out_dir)
+            if kompakt is not None:
+                zapisz_kompaktowe(kompakt.tabele(), out_dir, kompaktowo, graf_autorow)
+
+            zapisz_podsumowania(year, out_dir, agregator.summary_by_year(), agregator.top_journals(), linki[["query", "PMID"]], cfg)
+
+    else:
+        if len(years) > 1:
+            #Jedno pobieranie dla wszystkich lat, podział na lata lokalnie
+            dane_lat = fun.dl_papers_lata(years, cfg)
+        else:
+            dane_lat = {years[0]: fun.dl_papers(years[0], cfg)}
+
+        for year, pubmed_data in dane_lat.items():
+            out_dir = f'results/literature/{year}'
+            os.makedirs(out_dir, exist_ok=True)
+            hist.dolicz("wiersze", len(pubmed_data))
+
+            #-------------------------------------PUBLIKACJE_DO_PLIKU------------------------------------
+
+            pubmed_papers = pubmed_data.iloc[:, :-2]
+            papers_file = os.path.join(out_dir, "pubmed_papers.csv")
+            pubmed_papers.to_csv(papers_file, index=False)
+
+            #Indeks odwrócony tytułów (title_index.npz) - wyszukiwanie w pubmed_indeks.py
+            ind.zapisz_z_danych(pubmed_data, out_dir)
+
+            if kompaktowo or graf_autorow:
+                zapisz_kompaktowe(kmp.z_danych(pubmed_data), out_dir, kompaktowo, graf_autorow)
+
+            zapisz_podsumowania(
+                year, out_dir,
+                fun.make_summary_by_year(pubmed_data),
+                fun.top_n_journals(pubmed_data, cfg),
+                pubmed_data[["query", "PMID"]],
+                cfg
+            )
+
+
+def main(argv: list[str] | None = None) -> None:
+    import yaml
+    import sesja_http
+
+    parser = argparse.ArgumentParser()
+    lata_arg = parser.add_mutually_exclusive_group(required=True)
+    lata_arg.add_argument("--year", type=int)
+    lata_arg.add_argument("--years", nargs="+", type=int)
+    parser.add_argument("--config",  required=True)
+    parser.add_argument("--watki", type=int, default=None,
+                        help="Liczba wątków pobierających jednocześnie (domyślnie watki z configu albo 1)")
+
+    args = parser.parse_args(argv)
+    years = args.years if args.years else [args.year]
+
+    with open(args.config) as f:
+        config = yaml.safe_load(f)
+
+    cfg = config["PubMed_search_params"]
+    if args.watki is not None:
+        cfg["watki"] = args.watki
+
+    #Zapytania Bio.Entrez przez wspólną pulę połączeń keep-alive zamiast nowego połączenia na każde zapytanie
+    sesja_http.podlacz_entrez()
+
+    #Reguła pubmed_year albo pubmed_years (jedno pobieranie dla wszystkich lat) - wpis w historii uruchomień
+    with hist.pomiar("pubmed_year" if args.year else "pubmed_years", "_".join(map(str, years))):
+        pobierz(years, cfg)
+
+
+if __name__ == "__main__":
+    main()
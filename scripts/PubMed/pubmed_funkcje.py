@@ -1,18 +1,57 @@
 from Bio import Entrez
 import pandas as pd
-from typing import Any
-import matplotlib.pyplot as plt
-from matplotlib.figure import Figure
-import seaborn as sns
+from pubmed_limit import czekaj_na_zapytanie
+import datetime
+import json
+import os
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator
+
+import historia_uruchomien as hist
+
+#matplotlib i seaborn importowane dopiero przy rysowaniu - pobieranie ich nie potrzebuje
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+
+#-------------------------------------ROWNOLEGLOSC------------------------------------
+
+def mapuj_rownolegle(funkcja: Callable, elementy: Iterable, watki: int) -> Iterator:
+    """
+    Funkcja wykonuje funkcje dla kolejnych elementów w kilku wątkach (zapytania HTTP czekają głównie na sieć)
+    i zwraca wyniki w kolejności elementów. W toku jest co najwyżej 2*watki zadań, więc wyniki nie gromadzą się w pamięci.
+    Wspólny limit zapytań (czekaj_na_zapytanie) obowiązuje także między wątkami.
+
+    :param funkcja: Funkcja jednego argumentu
+    :param elementy: Elementy do przetworzenia
+    :param watki: Liczba wątków (1 - wykonanie sekwencyjne)
+    :return: Generator wyników
+    """
+    if watki <= 1:
+        yield from map(funkcja, elementy)
+        return
+
+    with ThreadPoolExecutor(max_workers=watki) as pula:
+        w_toku = deque()
+        for element in elementy:
+            w_toku.append(pula.submit(funkcja, element))
+            if len(w_toku) >= 2 * watki:
+                yield w_toku.popleft().result()
+
+        while w_toku:
+            yield w_toku.popleft().result()
 
 #-------------------------------------WCZYTYWANIE_DO_PLIKU------------------------------------
 
-def papers_per_query(year: int, config: dict[str, Any]) -> pd.DataFrame:
+def papers_per_query(year: int, config: dict[str, Any], od_daty: str | None = None,
+                     typ_daty: str = "edat") -> pd.DataFrame:
     """
     Funkcja dla każdego zapytania z configu wyszukuje publikacje z dopasowaniem do zapytania, z danego okresu.
 
     :param year: Rok określający zakres przeszukiwania
     :param config: słownik reprezentujący config (task4.yaml)
+    :param od_daty: Opcjonalna data (RRRR/MM/DD), od której szukamy tylko nowych/zmienionych wpisów
+    :param typ_daty: Typ daty dla od_daty - "edat" (dodanie do PubMed) lub "mdat" (modyfikacja)
     :return: Df z poszczegolnymi pmid znalezionych publikacji, rok i zapytanie do którego nastąpiło dopasowanie
     """
     Entrez.email = config["email"]
@@ -20,15 +59,29 @@ def papers_per_query(year: int, config: dict[str, Any]) -> pd.DataFrame:
     date_range = f"{year}/01/01:{year}/12/31[PDAT]"
     rows = []
 
-    for q in config["zapytania"]:
+    #Zawężenie po dacie dodania/modyfikacji - NCBI wymaga podania obu granic
+    zawezenie = {}
+    if od_daty is not None:
+        zawezenie = {
+            "datetype": typ_daty,
+            "mindate": od_daty,
+            "maxdate": dzisiaj(),
+        }
+
+    def szukaj(q: str) -> dict[str, Any]:
         term = f"({q}) AND ({date_range})"
+        czekaj_na_zapytanie(config)
         stream = Entrez.esearch(
             db="pubmed",
             term=term,
-            retmax=int(config["lim_wynikow"])
+            retmax=int(config["lim_wynikow"]),
+            **zawezenie
         )
-        record = Entrez.read(stream)
+        return Entrez.read(stream)
 
+    wyniki = mapuj_rownolegle(szukaj, config["zapytania"], int(config.get("watki", 1)))
+
+    for q, record in zip(config["zapytania"], wyniki):
         for pmid in record["IdList"]:
             rows.append({
                 "year": year,
@@ -36,34 +89,56 @@ def papers_per_query(year: int, config: dict[str, Any]) -> pd.DataFrame:
                 "PMID": pmid
             })
 
-    return pd.DataFrame(rows)
+    return pd.DataFrame(rows, columns=["year", "query", "PMID"])
 
 
-def metadata_table(pmids: list[str], config: dict[str, Any]) -> pd.DataFrame:
+def metadata_batches(pmids: list[str], config: dict[str, Any]) -> Iterator[list[dict[str, Any]]]:
     """
-    Funkcja pobiera dane parametry z metadanych dla kolejno wszytkihc pmids z wcześniej dopasowanych artykułów.
+    Funkcja pobiera metadane dla kolejnych paczek (po 200) pmids i zwraca je paczka po paczce, bez czekania na całość.
+    Przy watki > 1 w configu kilka paczek pobieranych jest jednocześnie.
 
     :param pmids: Lista id artykułów z dopasowania
     :param config: słownik reprezentujący config (task4.yaml)
-    :return: Tabela zawierjąca wszystkie dane parametry dla każdego artykułu
+    :return: Generator list wierszy (słowników) z metadanymi
     """
     Entrez.email = config["email"]
-    rows = []
 
-    for batch in [pmids[i:i + 200] for i in range(0, len(pmids), 200)]:
+    def pobierz(batch: list[str]) -> list[dict[str, Any]]:
+        czekaj_na_zapytanie(config)
         stream = Entrez.esummary(db="pubmed", id=",".join(batch))
-        records = Entrez.read(stream)
+        return Entrez.read(stream)
+
+    batches = [pmids[i:i + 200] for i in range(0, len(pmids), 200)]
 
+    #Paczki pobierane równolegle (watki z configu), zwracane w kolejności
+    for records in mapuj_rownolegle(pobierz, batches, int(config.get("watki", 1))):
+        rows = []
         for record in records:
-            rows.append({
+            row = {
                 "PMID": record["Id"],
                 "title": record["Title"],
                 "journal": record["FullJournalName"],
                 "ppublish_year": record["PubDate"].split(" ")[0],
-                "authors": ", ".join(record.get("AuthorList", []))
-            })
+                "authors": ", ".join(record.get("AuthorList", [])),
+                #Oryginalna lista autorów - nie trafia do tabel, używana przy zwartej reprezentacji
+                "author_list": list(record.get("AuthorList", []))
+            }
+            rows.append(row)
+
+        yield rows
+
+
+def metadata_table(pmids: list[str], config: dict[str, Any]) -> pd.DataFrame:
+    """
+    Funkcja pobiera dane parametry z metadanych dla kolejno wszytkihc pmids z wcześniej dopasowanych artykułów.
 
-    return pd.DataFrame(rows)
+    :param pmids: Lista id artykułów z dopasowania
+    :param config: słownik reprezentujący config (task4.yaml)
+    :return: Tabela zawierjąca wszystkie dane parametry dla każdego artykułu
+    """
+    rows = [row for batch in metadata_batches(pmids, config) for row in batch]
+
+    return pd.DataFrame(rows, columns=["PMID", "title", "journal", "ppublish_year", "authors"])
 
 
 def dl_papers(year: int, config: dict[str, Any]) -> pd.DataFrame:
@@ -81,6 +156,98 @@ def dl_papers(year: int, config: dict[str, Any]) -> pd.DataFrame:
 
     return df_meta.merge(df_pmids, on="PMID", how="left")
 
+#-----------------------------------WIELE_LAT_NARAZ------------------------------------
+
+def papers_per_query_lata(years: list[int], config: dict[str, Any]) -> pd.DataFrame:
+    """
+    Funkcja dla każdego zapytania wyszukuje publikacje jednym zapytaniem esearch dla całego zakresu lat
+    (od najwcześniejszego do najpóźniejszego roku). Limit wyników to lim_wynikow na każdy rok zakresu.
+
+    :param years: Lata określające zakres przeszukiwania
+    :param config: słownik reprezentujący config (task4.yaml)
+    :return: Df z pmid znalezionych publikacji i zapytaniem do którego nastąpiło dopasowanie (bez roku - rok
+    publikacji znany jest dopiero z metadanych)
+    """
+    Entrez.email = config["email"]
+
+    od, do = min(years), max(years)
+    date_range = f"{od}/01/01:{do}/12/31[PDAT]"
+    retmax = int(config["lim_wynikow"]) * (do - od + 1)
+
+    def szukaj(q: str) -> dict[str, Any]:
+        czekaj_na_zapytanie(config)
+        stream = Entrez.esearch(db="pubmed", term=f"({q}) AND ({date_range})", retmax=retmax)
+        return Entrez.read(stream)
+
+    wyniki = mapuj_rownolegle(szukaj, config["zapytania"], int(config.get("watki", 1)))
+    rows = [{"query": q, "PMID": pmid} for q, record in zip(config["zapytania"], wyniki) for pmid in record["IdList"]]
+
+    return pd.DataFrame(rows, columns=["query", "PMID"])
+
+
+def dl_papers_lata(years: list[int], config: dict[str, Any]) -> dict[int, pd.DataFrame]:
+    """
+    Funkcja pobiera publikacje z wielu lat jednym przebiegiem - jedno wyszukiwanie dla każdego zapytania
+    na cały zakres lat i wspólne paczki esummary, po czym dzieli publikacje na lata według roku z PubDate.
+    Publikacje z lat zakresu, których nie ma na liście (np. 2020 dla lat 2019 i 2021), są pomijane.
+
+    :param years: Lata zakresu przeszukiwania
+    :param config: słownik reprezentujący config (task4.yaml)
+    :return: Słownik rok -> tabela w takim samym formacie jak z dl_papers
+    """
+    df_linki = papers_per_query_lata(years, config)
+    df_meta = metadata_table(df_linki["PMID"].unique().tolist(), config)
+    rok_publikacji = pd.to_numeric(df_meta["ppublish_year"].str[:4], errors="coerce")
+
+    wynik = {}
+    for year in years:
+        df_meta_roku = df_meta[rok_publikacji == year]
+        df_linki_roku = df_linki[df_linki["PMID"].isin(df_meta_roku["PMID"])]
+        df_linki_roku = df_linki_roku.assign(year=year)[["year", "query", "PMID"]]
+        wynik[year] = df_meta_roku.merge(df_linki_roku, on="PMID", how="left").reset_index(drop=True)
+
+    return wynik
+
+
+def dl_papers_strumieniowo(year: int, config: dict[str, Any], agregator: Any, papers_file: str,
+                           kompakt: Any | None = None) -> pd.DataFrame:
+    """
+    Funkcja pobiera publikacje tak jak dl_papers, ale każdą paczkę metadanych od razu dopisuje do pubmed_papers.csv
+    i przekazuje do agregatora, więc cała tabela nigdy nie jest trzymana w pamięci - zostają tylko powiązania
+    PMID-zapytanie (indeks tytułów budowany jest później z zapisanego pliku, pubmed_indeks.zapisz_z_pliku).
+
+    :param year: Dany rok zakresu przeszukiwania
+    :param config: słownik reprezentujący config (task4.yaml)
+    :param agregator: AgregatorPubMed liczący podsumowania w trakcie pobierania
+    :param papers_file: Ścieżka pliku pubmed_papers.csv
+    :param kompakt: Opcjonalne TabeleKompaktowe, budowane z tych samych paczek
+    :return: df z powiązaniami PMID-zapytanie (jak z papers_per_query)
+    """
+    df_pmids = papers_per_query(year, config)
+    agregator.dodaj_linki(df_pmids)
+    if kompakt is not None:
+        kompakt.dodaj_linki(df_pmids)
+    unique_pmids = df_pmids["PMID"].unique().tolist()
+    #Liczba dopasowań każdej publikacji - liczona raz, nie łączeniem każdej paczki z całą tabelą powiązań
+    krotnosc = df_pmids["PMID"].value_counts()
+
+    #Nagłówek zapisujemy zawsze - także gdy nic nie znaleziono
+    kolumny = ["PMID", "title", "journal", "ppublish_year", "authors"]
+    pd.DataFrame(columns=kolumny).to_csv(papers_file, index=False)
+
+    for rows in metadata_batches(unique_pmids, config):
+        if kompakt is not None:
+            kompakt.dodaj_metadane(rows)
+
+        df_batch = pd.DataFrame(rows, columns=kolumny)
+
+        #Ten sam układ wierszy co w dl_papers (jeden wiersz na każde dopasowanie do zapytania)
+        df_batch = df_batch.loc[df_batch.index.repeat(df_batch["PMID"].map(krotnosc))].reset_index(drop=True)
+        agregator.dodaj_metadane(df_batch)
+        df_batch.to_csv(papers_file, mode="a", header=False, index=False)
+
+    return df_pmids
+
 #-----------------------------------SUMMARY_BY_YEAR------------------------------------
 
 def make_summary_by_year(df_data: pd.DataFrame) -> pd.DataFrame:
@@ -122,9 +289,192 @@ def top_n_journals(df_data: pd.DataFrame, config: dict[str, Any]) -> pd.DataFram
         .head(top_n)
     )
 
+#-----------------------------------TRYB_PRZYROSTOWY------------------------------------
+
+STAN_PLIK = "stan_pobierania.json"
+LINKI_PLIK = "pmid_query.csv"
+
+def dzisiaj() -> str:
+    """
+    Funkcja zwraca dzisiejszą datę w formacie przyjmowanym przez E-utilities
+
+    :return: Data w formacie RRRR/MM/DD
+    """
+    return datetime.date.today().strftime("%Y/%m/%d")
+
+
+def stan_z_danych(df_data: pd.DataFrame, config: dict[str, Any]) -> dict[str, Any]:
+    """
+    Funkcja tworzy stan pobierania (znaczniki dat oraz liczniki) na podstawie pełnej tabeli danych
+
+    :param df_data: tabela wszystkich danych z dopasowania
+    :param config: słownik reprezentujący config (task4.yaml)
+    :return: Słownik ze znacznikami dat dla zapytań, liczbą publikacji dla zapytań i liczbą publikacji w czasopismach
+    """
+    return {
+        "znaczniki": {q: dzisiaj() for q in config["zapytania"]},
+        "n_publikacji": df_data.groupby("query")["PMID"].nunique().to_dict(),
+        "czasopisma": df_data.groupby("journal").size().to_dict(),
+    }
+
+
+def wczytaj_stan(out_dir: str) -> dict[str, Any] | None:
+    """
+    Funkcja wczytuje stan poprzedniego pobierania dla danego roku
+
+    :param out_dir: Katalog z wynikami dla danego roku
+    :return: Słownik ze stanem lub None, jeśli stan nie był wcześniej zapisany
+    """
+    path = os.path.join(out_dir, STAN_PLIK)
+    if not os.path.exists(path):
+        return None
+
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def zapisz_stan(out_dir: str, df_data: pd.DataFrame, stan: dict[str, Any]) -> None:
+    """
+    Funkcja zapisuje stan pobierania oraz tabele powiązań PMID-zapytanie, potrzebne przy kolejnym pobieraniu przyrostowym
+
+    :param out_dir: Katalog z wynikami dla danego roku
+    :param df_data: tabela wszystkich danych z dopasowania
+    :param stan: słownik ze stanem pobierania
+    """
+    df_data[["year", "query", "PMID"]].to_csv(os.path.join(out_dir, LINKI_PLIK), index=False)
+
+    #Liczniki z pandas są typu numpy - json ich nie obsługuje
+    stan_do_zapisu = {
+        "znaczniki": stan["znaczniki"],
+        "n_publikacji": {q: int(n) for q, n in stan["n_publikacji"].items() if n > 0},
+        "czasopisma": {j: int(n) for j, n in stan["czasopisma"].items() if n > 0},
+    }
+    with open(os.path.join(out_dir, STAN_PLIK), "w", encoding="utf-8") as f:
+        json.dump(stan_do_zapisu, f, ensure_ascii=False, indent=2)
+
+
+def dl_papers_przyrostowo(year: int, config: dict[str, Any], out_dir: str) -> tuple[pd.DataFrame, dict[str, Any]]:
+    """
+    Funkcja pobiera tylko publikacje dodane (EDAT) lub zmienione (MDAT) od ostatniego pobierania i dołącza je
+    do istniejących wyników. Jeśli brak zapisanego stanu albo z configu usunięto zapytanie, wykonywane jest pełne pobieranie.
+
+    :param year: Dany rok zakresu przeszukiwania
+    :param config: słownik reprezentujący config (task4.yaml)
+    :param out_dir: Katalog z wynikami dla danego roku
+    :return: Zintegrowana tabela (jak w dl_papers) oraz zaktualizowany stan pobierania
+    """
+    stan = wczytaj_stan(out_dir)
+    papers_path = os.path.join(out_dir, "pubmed_papers.csv")
+    links_path = os.path.join(out_dir, LINKI_PLIK)
+
+    if (stan is None
+            or set(stan["znaczniki"]) - set(config["zapytania"])
+            or not os.path.exists(papers_path)
+            or not os.path.exists(links_path)):
+        df_data = dl_papers(year, config)
+        return df_data, stan_z_danych(df_data, config)
+
+    #Znacznik ustalamy przed zapytaniami, żeby nic nie "wpadło" pomiędzy pobieraniami
+    nowy_znacznik = dzisiaj()
+
+    df_linki_stare = pd.read_csv(links_path, dtype={"PMID": str})
+    df_papers_stare = pd.read_csv(papers_path, dtype=str).drop_duplicates("PMID")
+
+    nowe = []
+    for q in config["zapytania"]:
+        cfg_q = {**config, "zapytania": [q]}
+        od_daty = stan["znaczniki"].get(q)
+        if od_daty is None:
+            #Nowe zapytanie w configu - pobieramy je w całości
+            nowe.append(papers_per_query(year, cfg_q))
+        else:
+            nowe.append(papers_per_query(year, cfg_q, od_daty, "edat"))
+            nowe.append(papers_per_query(year, cfg_q, od_daty, "mdat"))
+
+    klucz = ["query", "PMID"]
+    df_linki_nowe = pd.concat(nowe, ignore_index=True).drop_duplicates(klucz)
+
+    #Powiązania, których jeszcze nie było - tylko one zwiększają liczniki
+    df_linki_dodane = df_linki_nowe.merge(df_linki_stare[klucz], on=klucz, how="left", indicator=True)
+    df_linki_dodane = df_linki_dodane[df_linki_dodane["_merge"] == "left_only"].drop(columns="_merge")
+
+    df_meta = metadata_table(df_linki_nowe["PMID"].unique().tolist(), config)
+    #Zgodność typów z tabelą wczytaną z pliku
+    df_meta = df_meta.astype(str)
+
+    czasopisma = Counter(stan["czasopisma"])
+    n_publikacji = Counter(stan["n_publikacji"])
+
+    #Dla zmodyfikowanych publikacji przenosimy ich wkład do nowego czasopisma (jeśli się zmieniło)
+    df_zmienione = df_papers_stare[["PMID", "journal"]].merge(
+        df_meta[["PMID", "journal"]], on="PMID", suffixes=("_stary", "_nowy")
+    )
+    df_zmienione = df_zmienione[df_zmienione["journal_stary"] != df_zmienione["journal_nowy"]]
+    l_linkow = df_linki_stare["PMID"].value_counts()
+    for pmid, stary, nowy in df_zmienione.itertuples(index=False):
+        n = int(l_linkow.get(pmid, 0))
+        czasopisma[stary] -= n
+        czasopisma[nowy] += n
+
+    czasopisma.update(
+        df_linki_dodane.merge(df_meta[["PMID", "journal"]], on="PMID")["journal"].value_counts().to_dict()
+    )
+    n_publikacji.update(df_linki_dodane["query"].value_counts().to_dict())
+
+    df_papers_zachowane = df_papers_stare[~df_papers_stare["PMID"].isin(df_meta["PMID"])]
+    df_papers = pd.concat([df_papers_zachowane, df_meta], ignore_index=True)
+    #Publikacje z poprzedniego pobierania to trafienia, pobrane metadane - chybienia (historia uruchomień)
+    hist.dolicz("cache_trafienia", len(df_papers_zachowane))
+    hist.dolicz("cache_chybienia", len(df_meta))
+    df_linki = pd.concat([df_linki_stare, df_linki_dodane], ignore_index=True)
+
+    stan = {
+        "znaczniki": {q: nowy_znacznik for q in config["zapytania"]},
+        "n_publikacji": dict(n_publikacji),
+        "czasopisma": dict(czasopisma),
+    }
+
+    return df_papers.merge(df_linki, on="PMID", how="left"), stan
+
+
+def summary_ze_stanu(stan: dict[str, Any], year: int) -> pd.DataFrame:
+    """
+    Funkcja zwraca podsumowanie liczby dopasowań dla zapytań (jak make_summary_by_year) na podstawie liczników ze stanu
+
+    :param stan: słownik ze stanem pobierania
+    :param year: rok dopasowania
+    :return: Podsumowanie liczby dopasowań dla zapytania
+    """
+    rows = [
+        {"year": year, "query": q, "n_publications": int(n)}
+        for q, n in stan["n_publikacji"].items() if n > 0
+    ]
+
+    return (
+        pd.DataFrame(rows, columns=["year", "query", "n_publications"])
+        .sort_values(["query", "year"])
+    )
+
+
+def top_journals_ze_stanu(stan: dict[str, Any], config: dict[str, Any]) -> pd.DataFrame:
+    """
+    Funkcja zwraca top n czasopism (jak top_n_journals) na podstawie liczników ze stanu
+
+    :param stan: słownik ze stanem pobierania
+    :param config: słownik reprezentujący config (task4.yaml)
+    :return: nazwy czasopism wraz z ilością publikacji w danym roku
+    """
+    rows = [{"journal": j, "num_publications": int(n)} for j, n in stan["czasopisma"].items() if n > 0]
+
+    return (
+        pd.DataFrame(rows, columns=["journal", "num_publications"])
+        .sort_values("num_publications", ascending=False)
+        .head(config["top_n"])
+    )
+
 #-------------------------------------BARPLOT---------------------------------------
 
-def summary_barplot(df_summ: pd.DataFrame, year: int) -> Figure:
+def summary_barplot(df_summ: pd.DataFrame, year: int) -> "Figure":
     """
     Funkcja tworzy barplot wizualizujący dane z summary_by_year
 
@@ -132,6 +482,9 @@ def summary_barplot(df_summ: pd.DataFrame, year: int) -> Figure:
     :param year: rok dopasowania
     :return: obraz z wykresem typu varplot
     """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     fig, ax = plt.subplots(figsize=(9, 5))
 
     sns.barplot(
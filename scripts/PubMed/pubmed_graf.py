@@ -0,0 +1,158 @@
+import numpy as np
+import os
+import pandas as pd
+import scipy.sparse as sp
+from typing import Any
+
+#Graf współautorstwa i macierze incydencji z tabel kompaktowych (pubmed_kompakt.py).
+#Autorzy publikacji są tam zapisani w układzie offsets+values z internowanymi kodami autorów - to dokładnie
+#macierz CSR publikacja x autor (indptr = offsets, indices = kody), więc nie trzeba ponownie dzielić napisów.
+#Pozostałe miary to iloczyny macierzy rzadkich:
+# - współautorstwo: A^T A (autor x autor, na przekątnej liczba publikacji autora)
+# - autor x czasopismo: A^T J, autor x rok: A^T Y (J, Y - macierze przynależności publikacji)
+
+STATYSTYKI_PLIK = "author_stats.csv"
+LATA_PLIK = "author_years.csv"
+
+#-------------------------------------MACIERZE------------------------------------
+
+def macierz_autorow(tabele: dict[str, Any]) -> sp.csr_matrix:
+    """
+    Funkcja buduje macierz incydencji publikacja x autor (1 - autor jest współautorem publikacji)
+
+    :param tabele: Słownik z tabelami (jak TabeleKompaktowe.tabele)
+    :return: Macierz CSR (publikacje, autorzy)
+    """
+    autorzy = tabele["autorzy_values"]
+    offsets = np.asarray(tabele["autorzy_offsets"], dtype="int64")
+
+    A = sp.csr_matrix(
+        (np.ones(len(autorzy.codes), dtype="int32"), np.asarray(autorzy.codes, dtype="int32"), offsets),
+        shape=(len(offsets) - 1, len(autorzy.categories))
+    )
+    #Ten sam autor dwa razy na liście jednej publikacji liczy się raz
+    A.sum_duplicates()
+    A.data[:] = 1
+
+    return A
+
+
+def macierz_przynaleznosci(kody: np.ndarray, n_kategorii: int) -> sp.csr_matrix:
+    """
+    Funkcja buduje macierz publikacja x kategoria (czasopismo, rok) z kodów kategorii; kod -1 - brak kategorii
+
+    :param kody: Kod kategorii dla każdej publikacji
+    :param n_kategorii: Liczba kategorii
+    :return: Macierz CSR (publikacje, kategorie)
+    """
+    kody = np.asarray(kody)
+    wiersze = np.flatnonzero(kody >= 0)
+
+    return sp.csr_matrix(
+        (np.ones(len(wiersze), dtype="int32"), (wiersze, kody[wiersze])),
+        shape=(len(kody), n_kategorii)
+    )
+
+
+class GrafAutorow:
+    """
+    Macierze autorów zbudowane raz z tabel kompaktowych
+    """
+
+    def __init__(self, tabele: dict[str, Any]):
+        papers = tabele["papers"]
+        self.autorzy = np.asarray(tabele["autorzy_values"].categories, dtype=object)
+
+        self.A = macierz_autorow(tabele)
+        self.AT = self.A.T.tocsr()
+
+        journal = papers["journal"]
+        self.czasopisma = np.asarray(journal.cat.categories, dtype=object)
+        self.AJ = self.AT @ macierz_przynaleznosci(journal.cat.codes.to_numpy(), len(self.czasopisma))
+
+        rok = pd.Categorical(papers["ppublish_year"].dropna().astype(int))
+        kody_lat = np.full(len(papers), -1)
+        kody_lat[papers["ppublish_year"].notna().to_numpy()] = rok.codes
+        self.lata = np.asarray(rok.categories)
+        self.AY = self.AT @ macierz_przynaleznosci(kody_lat, len(self.lata))
+
+        #Współautorstwo bez przekątnej (przekątna to liczba publikacji autora)
+        C = (self.AT @ self.A).tocsr()
+        self.publikacje = C.diagonal()
+        C.setdiag(0)
+        C.eliminate_zeros()
+        self.C = C
+
+    def stopnie(self) -> np.ndarray:
+        #Liczba różnych współautorów - niezerowe elementy wiersza
+        return np.diff(self.C.indptr)
+
+    def top_wspolautorzy(self, autor: str, n: int = 10) -> pd.DataFrame:
+        """
+        Funkcja zwraca najczęstszych współautorów autora
+
+        :param autor: Autor (jak na liście autorów PubMed)
+        :param n: Liczba współautorów
+        :return: df z kolumnami coauthor, n_papers
+        """
+        i = np.flatnonzero(self.autorzy == autor)
+        if len(i) == 0:
+            raise KeyError(f"Nieznany autor: {autor}")
+
+        wiersz = self.C.getrow(i[0])
+        kolejnosc = np.lexsort((self.autorzy[wiersz.indices], -wiersz.data))[:n]
+
+        return pd.DataFrame({
+            "coauthor": self.autorzy[wiersz.indices[kolejnosc]],
+            "n_papers": wiersz.data[kolejnosc],
+        })
+
+    def statystyki(self) -> pd.DataFrame:
+        """
+        Funkcja zwraca statystyki wszystkich autorów: liczba publikacji, współautorów i czasopism
+        oraz najczęstszy współautor
+
+        :return: df z wierszem na autora, posortowany malejąco po liczbie publikacji
+        """
+        stopnie = self.stopnie()
+        najczestszy = np.asarray(self.C.argmax(axis=1)).ravel()
+        wspolne = np.asarray(self.C.max(axis=1).todense()).ravel()
+
+        df = pd.DataFrame({
+            "author": self.autorzy,
+            "n_papers": self.publikacje,
+            "n_coauthors": stopnie,
+            "n_journals": np.diff(self.AJ.indptr),
+            "top_coauthor": np.where(stopnie > 0, self.autorzy[najczestszy], None),
+            "top_coauthor_papers": wspolne,
+        })
+
+        return df.sort_values(["n_papers", "author"], ascending=[False, True], ignore_index=True)
+
+    def produktywnosc(self) -> pd.DataFrame:
+        """
+        Funkcja zwraca liczbę publikacji autorów w poszczególnych latach (format długi)
+
+        :return: df z kolumnami author, year, n_papers
+        """
+        AY = self.AY.tocoo()
+        return pd.DataFrame({
+            "author": self.autorzy[AY.row],
+            "year": self.lata[AY.col],
+            "n_papers": AY.data,
+        }).sort_values(["author", "year"], ignore_index=True)
+
+
+def zapisz_statystyki(tabele: dict[str, Any], out_dir: str) -> GrafAutorow:
+    """
+    Funkcja zapisuje statystyki autorów (author_stats.csv) i ich publikacje w latach (author_years.csv)
+
+    :param tabele: Słownik z tabelami
+    :param out_dir: Katalog wynikowy
+    :return: Zbudowany graf
+    """
+    graf = GrafAutorow(tabele)
+    graf.statystyki().to_csv(os.path.join(out_dir, STATYSTYKI_PLIK), index=False)
+    graf.produktywnosc().to_csv(os.path.join(out_dir, LATA_PLIK), index=False)
+
+    return graf
@@ -0,0 +1,428 @@
+import numpy as np
+import os
+import re
+import pandas as pd
+
+#Indeks odwrócony tytułów publikacji: słowo -> lista publikacji (postings), zapisywany obok wyników roku.
+#Listy publikacji to posortowane numery dokumentów zapisane jako różnice kolejnych numerów kodowane
+#zmienną liczbą bajtów (varint, 7 bitów na bajt) - kodowanie i dekodowanie wektorowo w numpy.
+#Zapytania w składni zbliżonej do PubMed: AND, OR, NOT, nawiasy, frazy w cudzysłowie, prefiksy (pollut*);
+#sąsiednie słowa bez operatora łączone są przez AND, a znaczniki pól ([Title/Abstract]) pomijane.
+
+INDEKS_PLIK = "title_index.npz"
+
+SLOWO = re.compile(r"[^\W_]+(?:\.[^\W_]+)*")
+ELEMENTY_ZAPYTANIA = re.compile(r'\(|\)|"[^"]*"|[^\s()"]+')
+ZNACZNIK_POLA = re.compile(r"\[[^\]]*\]")
+
+#Parametry BM25 do szeregowania wyników (tytuły są krótkie - każde słowo liczy się raz)
+K1 = 1.2
+B = 0.75
+
+#-------------------------------------KODOWANIE------------------------------------
+
+def tokeny(tekst: str) -> list[str]:
+    """
+    Funkcja dzieli tekst na słowa (małe litery, liczby z kropką jak "pm2.5" to jedno słowo)
+
+    :param tekst: Tekst
+    :return: Lista słów
+    """
+    return SLOWO.findall(str(tekst).lower())
+
+
+def koduj_varint(wartosci: np.ndarray) -> np.ndarray:
+    """
+    Funkcja koduje nieujemne liczby całkowite zmienną liczbą bajtów (najstarszy bit - "to nie ostatni bajt liczby")
+
+    :param wartosci: Liczby do zakodowania
+    :return: Bajty
+    """
+    wartosci = np.asarray(wartosci, dtype=np.uint64)
+    n_bajtow = np.ones(len(wartosci), dtype=np.int64)
+    reszta = wartosci >> np.uint64(7)
+    while reszta.any():
+        n_bajtow += reszta > 0
+        reszta >>= np.uint64(7)
+
+    #Dla każdego bajtu: numer liczby i numer bajtu w liczbie
+    nr = np.repeat(np.arange(len(wartosci)), n_bajtow)
+    pozycja = np.arange(len(nr)) - np.repeat(np.cumsum(n_bajtow) - n_bajtow, n_bajtow)
+
+    bajty = ((wartosci[nr] >> (np.uint64(7) * pozycja.astype(np.uint64))) & np.uint64(0x7F)).astype(np.uint8)
+    bajty[pozycja < n_bajtow[nr] - 1] |= 0x80
+
+    return bajty
+
+
+def dekoduj_varint(bajty: np.ndarray) -> np.ndarray:
+    """
+    Funkcja dekoduje liczby zakodowane przez koduj_varint
+
+    :param bajty: Bajty
+    :return: Liczby (int64)
+    """
+    if len(bajty) == 0:
+        return np.array([], dtype=np.int64)
+
+    koniec = bajty < 0x80
+    poczatki = np.flatnonzero(np.concatenate(([True], koniec[:-1])))
+    pozycja = np.arange(len(bajty)) - np.repeat(poczatki, np.diff(np.append(poczatki, len(bajty))))
+
+    czesci = (bajty & 0x7F).astype(np.int64) << (7 * pozycja)
+    return np.add.reduceat(czesci, poczatki)
+
+#-------------------------------------BUDOWANIE------------------------------------
+
+def zbuduj_indeks(pmid: np.ndarray, tytuly: list[str]) -> dict[str, np.ndarray]:
+    """
+    Funkcja buduje indeks odwrócony tytułów
+
+    :param pmid: PMID publikacji (bez powtórzeń)
+    :param tytuly: Tytuły publikacji
+    :return: Słownik tablic (jak w pliku title_index.npz)
+    """
+    kolejnosc = np.argsort(np.asarray(pmid, dtype=np.int64), kind="stable")
+    pmid = np.asarray(pmid, dtype=np.int64)[kolejnosc]
+    tytuly = [str(tytuly[i]) for i in kolejnosc]
+
+    #Pary (słowo, dokument) - każde słowo raz na dokument
+    slowa_dok = [sorted(set(tokeny(t))) for t in tytuly]
+    dlugosc = np.array([len(tokeny(t)) for t in tytuly], dtype=np.int32)
+    dok = np.repeat(np.arange(len(tytuly)), [len(s) for s in slowa_dok])
+    slowa = np.array([s for lista in slowa_dok for s in lista], dtype=str)
+
+    slownik, nr_slowa = np.unique(slowa, return_inverse=True)
+    kolejnosc = np.lexsort((dok, nr_slowa))
+    nr_slowa, dok = nr_slowa[kolejnosc], dok[kolejnosc]
+
+    #Różnice numerów dokumentów w obrębie słowa (pierwsza - sam numer)
+    liczby = np.bincount(nr_slowa, minlength=len(slownik))
+    starty = np.cumsum(liczby) - liczby
+    roznice = np.diff(dok, prepend=0)
+    roznice[starty[liczby > 0]] = dok[starty[liczby > 0]]
+
+    bajty = koduj_varint(roznice)
+    #Pozycje list w buforze bajtów: bajty kończące liczby wyznaczają granice
+    konce_liczb = np.flatnonzero(bajty < 0x80) + 1
+    granice = np.concatenate(([0], konce_liczb[np.cumsum(liczby) - 1])) if len(slownik) else np.array([0])
+
+    blob = "".join(tytuly).encode("utf-8")
+    dl_bajtow = [len(t.encode("utf-8")) for t in tytuly]
+
+    return {
+        "slownik": slownik,
+        "liczby": liczby.astype(np.int32),
+        "granice": granice.astype(np.int64),
+        "postings": bajty,
+        "pmid": pmid,
+        "dlugosc": dlugosc,
+        "tytuly": np.frombuffer(blob, dtype=np.uint8),
+        "tytuly_offsets": np.concatenate(([0], np.cumsum(dl_bajtow))).astype(np.int64),
+    }
+
+
+def zapisz_indeks(pmid: np.ndarray, tytuly: list[str], out_dir: str) -> str:
+    """
+    Funkcja buduje indeks tytułów i zapisuje go do out_dir/title_index.npz
+
+    :param pmid: PMID publikacji (bez powtórzeń)
+    :param tytuly: Tytuły publikacji
+    :param out_dir: Katalog wynikowy
+    :return: Ścieżka zapisanego pliku
+    """
+    path = os.path.join(out_dir, INDEKS_PLIK)
+    np.savez(path, **zbuduj_indeks(pmid, tytuly))
+    return path
+
+
+def zapisz_z_danych(df_data: pd.DataFrame, out_dir: str) -> str:
+    """
+    Funkcja zapisuje indeks tytułów z tabeli z dl_papers (wiersz na każde dopasowanie)
+
+    :param df_data: tabela wszystkich danych z dopasowania
+    :param out_dir: Katalog wynikowy
+    :return: Ścieżka zapisanego pliku
+    """
+    df = df_data.drop_duplicates("PMID")
+    return zapisz_indeks(df["PMID"].astype("int64").to_numpy(), df["title"].fillna("").tolist(), out_dir)
+
+
+def zapisz_z_pliku(papers_file: str, out_dir: str) -> str:
+    """
+    Funkcja zapisuje indeks tytułów z zapisanego pubmed_papers.csv (pobieranie strumieniowe) - wczytywane są
+    tylko kolumny PMID i title
+
+    :param papers_file: Ścieżka pliku pubmed_papers.csv
+    :param out_dir: Katalog wynikowy
+    :return: Ścieżka zapisanego pliku
+    """
+    df = pd.read_csv(papers_file, usecols=["PMID", "title"], dtype=str, keep_default_na=False)
+    return zapisz_z_danych(df, out_dir)
+
+#-------------------------------------ZAPYTANIA------------------------------------
+
+def parsuj_zapytanie(zapytanie: str) -> tuple:
+    """
+    Funkcja zamienia zapytanie na drzewo: ("lub"/"i"/"bez", a, b), ("nie", a), ("slowo", s), ("prefiks", s)
+
+    :param zapytanie: Zapytanie, np. '(pm2.5 OR "particulate matter") AND pollut* NOT review'
+    :return: Drzewo zapytania
+    """
+    elementy = ELEMENTY_ZAPYTANIA.findall(ZNACZNIK_POLA.sub(" ", zapytanie))
+    pozycja = 0
+
+    def nastepny() -> str | None:
+        return elementy[pozycja] if pozycja < len(elementy) else None
+
+    def lub() -> tuple:
+        nonlocal pozycja
+        wezel = i()
+        while nastepny() == "OR":
+            pozycja += 1
+            wezel = ("lub", wezel, i())
+        return wezel
+
+    def i() -> tuple:
+        nonlocal pozycja
+        wezel = jednoargumentowe()
+        while nastepny() is not None and nastepny() not in ("OR", ")"):
+            if nastepny() == "NOT":
+                pozycja += 1
+                wezel = ("bez", wezel, jednoargumentowe())
+                continue
+            if nastepny() == "AND":
+                pozycja += 1
+            wezel = ("i", wezel, jednoargumentowe())
+        return wezel
+
+    def jednoargumentowe() -> tuple:
+        nonlocal pozycja
+        element = nastepny()
+        if element is None or element in ("OR", "AND", ")"):
+            raise ValueError(f"Niepoprawne zapytanie: {zapytanie!r}")
+        pozycja += 1
+
+        if element == "NOT":
+            return ("nie", jednoargumentowe())
+        if element == "(":
+            wezel = lub()
+            if nastepny() != ")":
+                raise ValueError(f"Niepoprawne zapytanie (brak nawiasu): {zapytanie!r}")
+            pozycja += 1
+            return wezel
+        return slowa(element)
+
+    def slowa(element: str) -> tuple:
+        #Fraza i słowo dzielone na kilka tokenów ("PM2.5-bound") to AND tokenów - indeks nie ma pozycji słów
+        prefiks = element.endswith("*") and not element.startswith('"')
+        czesci = tokeny(element.strip('"'))
+        if not czesci:
+            raise ValueError(f"Niepoprawne zapytanie (puste słowo {element!r}): {zapytanie!r}")
+
+        wezly = [("slowo", c) for c in czesci]
+        if prefiks:
+            wezly[-1] = ("prefiks", czesci[-1])
+
+        wezel = wezly[0]
+        for w in wezly[1:]:
+            wezel = ("i", wezel, w)
+        return wezel
+
+    drzewo = lub()
+    if nastepny() is not None:
+        raise ValueError(f"Niepoprawne zapytanie: {zapytanie!r}")
+    return drzewo
+
+
+def slowa_pozytywne(drzewo: tuple) -> list[tuple]:
+    """
+    Funkcja zwraca liście drzewa, które nie są zanegowane (do szeregowania wyników)
+
+    :param drzewo: Drzewo zapytania
+    :return: Lista węzłów ("slowo", s) / ("prefiks", s)
+    """
+    rodzaj = drzewo[0]
+    if rodzaj in ("slowo", "prefiks"):
+        return [drzewo]
+    if rodzaj == "nie":
+        return []
+    if rodzaj == "bez":
+        return slowa_pozytywne(drzewo[1])
+    return slowa_pozytywne(drzewo[1]) + slowa_pozytywne(drzewo[2])
+
+
+class IndeksTytulow:
+    """
+    Indeks tytułów wczytany z pliku title_index.npz - listy publikacji dekodowane dopiero przy zapytaniu
+    """
+
+    def __init__(self, path: str):
+        with np.load(path) as dane:
+            self.slownik = dane["slownik"]
+            self.liczby = dane["liczby"]
+            self.granice = dane["granice"]
+            self.postings = dane["postings"]
+            self.pmid = dane["pmid"]
+            self.dlugosc = dane["dlugosc"]
+            self._tytuly = dane["tytuly"].tobytes()
+            self._tytuly_offsets = dane["tytuly_offsets"]
+
+        self.n = len(self.pmid)
+        self.srednia_dlugosc = max(float(self.dlugosc.mean()), 1.0) if self.n else 1.0
+
+    def listy(self, od: int, do: int) -> np.ndarray:
+        """
+        Funkcja dekoduje listy publikacji słów słownika od..do-1 (leżą w buforze jedna za drugą)
+
+        :param od: Numer pierwszego słowa
+        :param do: Numer za ostatnim słowem
+        :return: Numery dokumentów kolejnych list (połączone)
+        """
+        bajty = self.postings[self.granice[od]:self.granice[do]]
+        liczby = self.liczby[od:do]
+        #Częste słowa - wszystkie różnice mieszczą się w jednym bajcie
+        roznice = bajty.astype(np.int64) if len(bajty) == liczby.sum() else dekoduj_varint(bajty)
+
+        suma = np.cumsum(roznice)
+        if do - od == 1:
+            return suma
+
+        #Pierwsza liczba każdej listy to numer dokumentu, nie różnica - odejmujemy sumę poprzednich list
+        starty = np.cumsum(liczby) - liczby
+        return suma - np.repeat(suma[starty] - roznice[starty], liczby)
+
+    def slowa_prefiksu(self, prefiks: str) -> tuple[int, int]:
+        #Słownik jest posortowany - słowa z prefiksem to ciągły zakres
+        od = np.searchsorted(self.slownik, prefiks, side="left")
+        do = np.searchsorted(self.slownik, prefiks + "\U0010ffff", side="left")
+        return int(od), int(do)
+
+    def nr_slowa(self, slowo: str) -> int | None:
+        nr = int(np.searchsorted(self.slownik, slowo))
+        return nr if nr < len(self.slownik) and self.slownik[nr] == slowo else None
+
+    def maska_slowa(self, wezel: tuple) -> np.ndarray:
+        #Dokumenty zawierające słowo / dowolne słowo z prefiksem
+        rodzaj, slowo = wezel
+        maska = np.zeros(self.n, dtype=bool)
+
+        if rodzaj == "slowo":
+            nr = self.nr_slowa(slowo)
+            od, do = (nr, nr + 1) if nr is not None else (0, 0)
+        else:
+            od, do = self.slowa_prefiksu(slowo)
+
+        if do > od:
+            maska[self.listy(od, do)] = True
+        return maska
+
+    def wykonaj(self, drzewo: tuple) -> np.ndarray:
+        """
+        Funkcja wylicza maskę dokumentów pasujących do drzewa zapytania (operacje logiczne na maskach
+        długości liczby dokumentów są szybsze od łączenia posortowanych list dla częstych słów)
+
+        :param drzewo: Drzewo z parsuj_zapytanie
+        :return: Maska dokumentów
+        """
+        rodzaj = drzewo[0]
+        if rodzaj in ("slowo", "prefiks"):
+            return self.maska_slowa(drzewo)
+        if rodzaj == "nie":
+            return ~self.wykonaj(drzewo[1])
+
+        a = self.wykonaj(drzewo[1])
+        b = self.wykonaj(drzewo[2])
+        if rodzaj == "i":
+            return a & b
+        if rodzaj == "lub":
+            return a | b
+        return a & ~b
+
+    def szukaj(self, zapytanie: str) -> np.ndarray:
+        """
+        Funkcja zwraca PMID publikacji, których tytuły pasują do zapytania
+
+        :param zapytanie: Zapytanie (AND/OR/NOT, nawiasy, frazy, prefiksy)
+        :return: Posortowane PMID
+        """
+        return self.pmid[self.wykonaj(parsuj_zapytanie(zapytanie))]
+
+    def tytul(self, nr: int) -> str:
+        return self._tytuly[self._tytuly_offsets[nr]:self._tytuly_offsets[nr + 1]].decode("utf-8")
+
+    def najtrafniejsze(self, zapytanie: str, n: int = 10) -> pd.DataFrame:
+        """
+        Funkcja zwraca n publikacji pasujących do zapytania z najwyższą oceną BM25 (słowa zapytania w tytule)
+
+        :param zapytanie: Zapytanie
+        :param n: Liczba publikacji
+        :return: df z kolumnami PMID, title, score
+        """
+        drzewo = parsuj_zapytanie(zapytanie)
+        dokumenty = np.flatnonzero(self.wykonaj(drzewo))
+
+        ocena = np.zeros(len(dokumenty))
+        for wezel in slowa_pozytywne(drzewo):
+            trafione = self.maska_slowa(wezel)
+            liczba = trafione.sum()
+            ocena += np.log(1 + (self.n - liczba + 0.5) / (liczba + 0.5)) * trafione[dokumenty]
+
+        #Każde słowo raz w tytule (tf = 1) - krótsze tytuły z tymi samymi słowami wyżej
+        norma = 1 + K1 * (1 - B + B * self.dlugosc[dokumenty] / self.srednia_dlugosc)
+        ocena = ocena * (K1 + 1) / norma
+
+        najlepsze = np.lexsort((self.pmid[dokumenty], -ocena))[:n]
+        return pd.DataFrame({
+            "PMID": self.pmid[dokumenty[najlepsze]],
+            "title": [self.tytul(d) for d in dokumenty[najlepsze]],
+            "score": np.round(ocena[najlepsze], 4),
+        })
+
+
+class KorpusTytulow:
+    """
+    Indeksy tytułów wszystkich lat z katalogu wyników (results/literature/{rok}) - wczytywane przy pierwszym użyciu
+    """
+
+    def __init__(self, katalog: str = "results/literature"):
+        self.katalog = katalog
+        self._indeksy = {}
+
+    def lata(self) -> list[int]:
+        return sorted(
+            int(rok) for rok in os.listdir(self.katalog)
+            if rok.isdigit() and os.path.exists(os.path.join(self.katalog, rok, INDEKS_PLIK))
+        )
+
+    def indeks(self, rok: int) -> IndeksTytulow:
+        if rok not in self._indeksy:
+            self._indeksy[rok] = IndeksTytulow(os.path.join(self.katalog, str(rok), INDEKS_PLIK))
+        return self._indeksy[rok]
+
+    def szukaj(self, zapytanie: str, lata: list[int] | None = None) -> pd.DataFrame:
+        """
+        Funkcja szuka publikacji pasujących do zapytania w indeksach podanych lat
+
+        :param zapytanie: Zapytanie
+        :param lata: Lata (domyślnie wszystkie z indeksem)
+        :return: df z kolumnami year, PMID
+        """
+        lata = self.lata() if lata is None else lata
+        wyniki = [pd.DataFrame({"year": rok, "PMID": self.indeks(rok).szukaj(zapytanie)}) for rok in lata]
+        return pd.concat(wyniki, ignore_index=True) if wyniki else pd.DataFrame(columns=["year", "PMID"])
+
+    def najtrafniejsze(self, zapytanie: str, n: int = 10, lata: list[int] | None = None) -> pd.DataFrame:
+        """
+        Funkcja zwraca n najtrafniejszych publikacji z każdego roku
+
+        :param zapytanie: Zapytanie
+        :param n: Liczba publikacji z roku
+        :param lata: Lata (domyślnie wszystkie z indeksem)
+        :return: df z kolumnami year, PMID, title, score
+        """
+        lata = self.lata() if lata is None else lata
+        wyniki = [self.indeks(rok).najtrafniejsze(zapytanie, n).assign(year=rok) for rok in lata]
+        if not wyniki:
+            return pd.DataFrame(columns=["year", "PMID", "title", "score"])
+        return pd.concat(wyniki, ignore_index=True)[["year", "PMID", "title", "score"]]
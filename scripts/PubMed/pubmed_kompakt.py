@@ -0,0 +1,199 @@
+import numpy as np
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import Any
+
+#Zwarta reprezentacja wyników z PubMed:
+# - papers: jeden wiersz na publikację, PMID jako int64, czasopisma jako kategorie
+# - autorzy w układzie offsets+values (autorzy publikacji i to values[offsets[i]:offsets[i+1]]), nazwiska jako kategorie
+# - linki: osobna tabela PMID <-> zapytanie, zamiast powielania metadanych dla każdego zapytania
+
+PAPERS_PLIK = "pubmed.parquet"
+LINKI_PARQUET = "pmid_query.parquet"
+
+#-------------------------------------BUDOWANIE------------------------------------
+
+class TabeleKompaktowe:
+    """
+    Tabele budowane przyrostowo - paczka po paczce (jak AgregatorPubMed) albo z gotowej tabeli z dl_papers.
+    Napisy czasopism i autorów są internowane (każdy zapisany raz, w wierszach tylko kody).
+    """
+
+    def __init__(self):
+        self.pmid = []
+        self.title = []
+        self.rok = []
+        self.journal_kody = []
+        self.journale = {}
+        self.autorzy_offsets = [0]
+        self.autorzy_kody = []
+        self.autorzy = {}
+        self.widziane = set()
+        self.linki = []
+
+    def dodaj_linki(self, df_pmids: pd.DataFrame) -> None:
+        """
+        Funkcja dodaje powiązania publikacja-zapytanie (wynik papers_per_query)
+
+        :param df_pmids: Df z kolumnami year, query, PMID
+        """
+        self.linki.append(pd.DataFrame({
+            "PMID": df_pmids["PMID"].astype("int64"),
+            "year": df_pmids["year"].astype("int16"),
+            "query": df_pmids["query"].astype(str),
+        }))
+
+    def dodaj_metadane(self, rows: list[dict[str, Any]]) -> None:
+        """
+        Funkcja dodaje paczkę metadanych (wiersze z metadata_batches)
+
+        :param rows: Lista słowników z metadanymi publikacji
+        """
+        for row in rows:
+            pmid = int(row["PMID"])
+            if pmid in self.widziane:
+                continue
+            self.widziane.add(pmid)
+
+            self.pmid.append(pmid)
+            self.title.append(row["title"])
+            self.rok.append(row["ppublish_year"])
+            self.journal_kody.append(self.journale.setdefault(row["journal"], len(self.journale)))
+
+            #Z metadata_batches dostajemy oryginalną listę - z pliku csv tylko połączony napis
+            autorzy = row.get("author_list")
+            if autorzy is None:
+                autorzy = [a for a in str(row.get("authors", "")).split(", ") if a and a != "nan"]
+
+            for autor in autorzy:
+                self.autorzy_kody.append(self.autorzy.setdefault(autor, len(self.autorzy)))
+            self.autorzy_offsets.append(len(self.autorzy_kody))
+
+    def tabele(self) -> dict[str, Any]:
+        """
+        Funkcja zwraca zbudowane tabele
+
+        :return: Słownik z kluczami papers, linki, autorzy_offsets, autorzy_values
+        """
+        papers = pd.DataFrame({
+            "PMID": np.array(self.pmid, dtype="int64"),
+            "title": pd.array(self.title, dtype="string"),
+            "journal": pd.Categorical.from_codes(np.array(self.journal_kody, dtype="int32"), list(self.journale)),
+            "ppublish_year": pd.to_numeric(pd.Series(self.rok, dtype="object"), errors="coerce").astype("Int16"),
+        })
+
+        if self.linki:
+            linki = pd.concat(self.linki, ignore_index=True).drop_duplicates(ignore_index=True)
+        else:
+            linki = pd.DataFrame({"PMID": pd.Series(dtype="int64"), "year": pd.Series(dtype="int16"),
+                                  "query": pd.Series(dtype="object")})
+        linki["query"] = linki["query"].astype("category")
+
+        return {
+            "papers": papers,
+            "linki": linki,
+            "autorzy_offsets": np.array(self.autorzy_offsets, dtype="int64"),
+            "autorzy_values": pd.Categorical.from_codes(np.array(self.autorzy_kody, dtype="int32"), list(self.autorzy)),
+        }
+
+
+def z_danych(df_data: pd.DataFrame) -> dict[str, Any]:
+    """
+    Funkcja zamienia tabele z dl_papers (wiersz na każde dopasowanie, napisy) na zwartą reprezentacje
+
+    :param df_data: tabela wszystkich danych z dopasowania
+    :return: Słownik z tabelami (jak TabeleKompaktowe.tabele)
+    """
+    budowniczy = TabeleKompaktowe()
+    budowniczy.dodaj_linki(df_data[["year", "query", "PMID"]])
+    budowniczy.dodaj_metadane(df_data.drop_duplicates("PMID").to_dict("records"))
+
+    return budowniczy.tabele()
+
+#-------------------------------------DOSTEP------------------------------------
+
+def autorzy_publikacji(tabele: dict[str, Any], i: int) -> list[str]:
+    """
+    Funkcja zwraca autorów i-tej publikacji z tabeli papers
+
+    :param tabele: Słownik z tabelami
+    :param i: Numer wiersza w tabeli papers
+    :return: Lista autorów
+    """
+    offsets = tabele["autorzy_offsets"]
+    return list(tabele["autorzy_values"][offsets[i]:offsets[i + 1]])
+
+
+def do_tabeli_szerokiej(tabele: dict[str, Any]) -> pd.DataFrame:
+    """
+    Funkcja odtwarza tabele w formacie z dl_papers (np. dla starszego kodu, który jej wymaga)
+
+    :param tabele: Słownik z tabelami
+    :return: Tabela jak z dl_papers
+    """
+    offsets = tabele["autorzy_offsets"]
+    values = np.asarray(tabele["autorzy_values"], dtype=object)
+    papers = tabele["papers"]
+
+    df_meta = pd.DataFrame({
+        "PMID": papers["PMID"].astype(str),
+        "title": papers["title"].astype(str),
+        "journal": papers["journal"].astype(str),
+        "ppublish_year": papers["ppublish_year"].astype(str),
+        "authors": [", ".join(values[offsets[i]:offsets[i + 1]]) for i in range(len(papers))],
+    })
+    df_linki = tabele["linki"].astype({"PMID": str, "year": int, "query": str})
+
+    return df_meta.merge(df_linki[["year", "query", "PMID"]], on="PMID", how="left")
+
+#-------------------------------------PARQUET------------------------------------
+
+def zapisz_parquet(tabele: dict[str, Any], out_dir: str) -> None:
+    """
+    Funkcja zapisuje tabele do plików Parquet (autorzy jako kolumna listowa, która w Arrow ma właśnie układ offsets+values)
+
+    :param tabele: Słownik z tabelami
+    :param out_dir: Katalog wynikowy
+    """
+    autorzy = tabele["autorzy_values"]
+    autorzy_arrow = pa.ListArray.from_arrays(
+        pa.array(tabele["autorzy_offsets"], pa.int32()),
+        pa.DictionaryArray.from_arrays(pa.array(autorzy.codes, pa.int32()), pa.array(autorzy.categories.astype(str)))
+    )
+
+    papers = pa.Table.from_pandas(tabele["papers"], preserve_index=False).append_column("authors", autorzy_arrow)
+    pq.write_table(papers, os.path.join(out_dir, PAPERS_PLIK), compression="zstd")
+
+    linki = pa.Table.from_pandas(tabele["linki"], preserve_index=False)
+    pq.write_table(linki, os.path.join(out_dir, LINKI_PARQUET), compression="zstd")
+
+
+def wczytaj_parquet(out_dir: str) -> dict[str, Any]:
+    """
+    Funkcja wczytuje tabele zapisane przez zapisz_parquet
+
+    :param out_dir: Katalog z plikami
+    :return: Słownik z tabelami
+    """
+    papers = pq.read_table(os.path.join(out_dir, PAPERS_PLIK))
+    autorzy = papers.column("authors").combine_chunks()
+
+    values = autorzy.values
+    if isinstance(values, pa.DictionaryArray):
+        values = pd.Categorical.from_codes(
+            values.indices.to_numpy(zero_copy_only=False), values.dictionary.to_pylist()
+        )
+    else:
+        values = pd.Categorical(values.to_pylist())
+
+    #Offsety z Arrow liczą się od początku bufora - odejmujemy pierwszy, gdyby tablica była wycinkiem
+    offsets = autorzy.offsets.to_numpy().astype("int64")
+
+    return {
+        "papers": papers.drop_columns(["authors"]).to_pandas(),
+        "linki": pq.read_table(os.path.join(out_dir, LINKI_PARQUET)).to_pandas(),
+        "autorzy_offsets": offsets - offsets[0],
+        "autorzy_values": values[offsets[0]:offsets[-1]],
+    }
@@ -0,0 +1,54 @@
+import fcntl
+import os
+import struct
+import tempfile
+import time
+from typing import Any
+
+#-------------------------------------WSPOLNY_LIMIT_NCBI------------------------------------
+
+#NCBI pozwala na 3 zapytania/s z jednego IP (10/s z kluczem API)
+DOMYSLNY_LIMIT = 3
+DOMYSLNY_PLIK = os.path.join(tempfile.gettempdir(), "ncbi_eutils.lock")
+
+
+def zarezerwuj_termin(path: str, limit: float) -> float:
+    """
+    Funkcja rezerwuje termin wysłania zapytania we wspólnym (dla wszystkich procesów na maszynie) harmonogramie.
+    W pliku trzymany jest najbliższy wolny termin - pod blokadą pliku pobieramy go i przesuwamy o 1/limit sekundy,
+    dzięki czemu równoległe joby Snakemake dzielą limit po równo, w kolejności zgłoszeń.
+
+    :param path: Ścieżka pliku z harmonogramem
+    :param limit: Maksymalna łączna liczba zapytań na sekundę
+    :return: Czas (time.time()) w którym można wysłać zapytanie
+    """
+    odstep = 1.0 / limit
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+        dane = os.pread(fd, 8, 0)
+        nastepny = struct.unpack("d", dane)[0] if len(dane) == 8 else 0.0
+
+        termin = max(time.time(), nastepny)
+        os.pwrite(fd, struct.pack("d", termin + odstep), 0)
+    finally:
+        #Zamknięcie deskryptora zwalnia blokadę
+        os.close(fd)
+
+    return termin
+
+
+def czekaj_na_zapytanie(config: dict[str, Any]) -> None:
+    """
+    Funkcja wstrzymuje proces do momentu, w którym może on wysłać kolejne zapytanie do E-utilities bez przekroczenia limitu.
+
+    :param config: słownik reprezentujący config (pubmed.yaml)
+    """
+    limit = float(config.get("limit_zapytan", DOMYSLNY_LIMIT))
+    path = config.get("plik_limitu", DOMYSLNY_PLIK)
+
+    opoznienie = zarezerwuj_termin(path, limit) - time.time()
+    if opoznienie > 0:
+        time.sleep(opoznienie)
@@ -0,0 +1,127 @@
+import numpy as np
+import os
+import pandas as pd
+
+#Nakładanie się wyników zapytań: dla każdego zapytania mapa bitowa po wszystkich znalezionych PMID
+#(bit i - czy zapytanie znalazło i-ty PMID z posortowanej listy), 64 publikacje na słowo uint64.
+#Część wspólna dwóch zapytań to liczba jedynek (popcount) w AND ich map - bez łączenia tabel w pandas.
+
+NAKLADANIE_PLIK = "query_overlap.csv"
+MACIERZ_PLIK = "query_overlap_matrix.csv"
+
+
+class BitsetyZapytan:
+    """
+    Mapy bitowe zapytanie x PMID zbudowane z powiązań publikacja-zapytanie
+    """
+
+    def __init__(self, linki: pd.DataFrame):
+        """
+        :param linki: df z kolumnami query, PMID (np. wynik papers_per_query albo tabela linki z pubmed_kompakt)
+        """
+        #Zapytania posortowane - ten sam układ wyników niezależnie od trybu pobierania
+        zapytania, kody = np.unique(linki["query"].astype(str).to_numpy(), return_inverse=True)
+        pmid = linki["PMID"].astype("int64").to_numpy()
+
+        self.zapytania = np.asarray(zapytania, dtype=object)
+        self.pmid, pozycja = np.unique(pmid, return_inverse=True)
+
+        slowa = (len(self.pmid) + 63) // 64
+        self.bity = np.zeros((len(self.zapytania), max(slowa, 1)), dtype=np.uint64)
+        np.bitwise_or.at(
+            self.bity,
+            (kody, pozycja >> 6),
+            np.left_shift(np.uint64(1), (pozycja & 63).astype(np.uint64))
+        )
+
+    def macierz(self) -> np.ndarray:
+        """
+        Funkcja liczy macierz części wspólnych: [i, j] - liczba publikacji znalezionych przez zapytania i oraz j
+        (na przekątnej - liczba publikacji zapytania)
+
+        :return: Macierz (zapytania, zapytania)
+        """
+        n = len(self.zapytania)
+        wynik = np.zeros((n, n), dtype=np.int64)
+        #Jeden wiersz naraz - pamięć (zapytania x słowa), a nie (zapytania x zapytania x słowa)
+        for i in range(n):
+            wynik[i] = np.bitwise_count(self.bity[i] & self.bity).sum(axis=1, dtype=np.int64)
+        return wynik
+
+    def tylko_jedno(self) -> np.ndarray:
+        """
+        Funkcja liczy publikacje znalezione wyłącznie przez dane zapytanie
+
+        :return: Liczba publikacji dla każdego zapytania
+        """
+        if len(self.zapytania) == 0:
+            return np.array([], dtype=np.int64)
+
+        #Suma (OR) map wszystkich pozostałych zapytań z sum prefiksowych od początku i od końca
+        zero = np.zeros((1, self.bity.shape[1]), dtype=np.uint64)
+        przed = np.concatenate((zero, np.bitwise_or.accumulate(self.bity, axis=0)[:-1]))
+        po = np.concatenate((np.bitwise_or.accumulate(self.bity[::-1], axis=0)[::-1][1:], zero))
+
+        return np.bitwise_count(self.bity & ~(przed | po)).sum(axis=1, dtype=np.int64)
+
+    def zapytania_publikacji(self, pmid: int) -> list[str]:
+        """
+        Funkcja zwraca zapytania, które znalazły publikację
+
+        :param pmid: PMID publikacji
+        :return: Lista zapytań
+        """
+        i = np.searchsorted(self.pmid, int(pmid))
+        if i == len(self.pmid) or self.pmid[i] != int(pmid):
+            return []
+
+        bit = (self.bity[:, i >> 6] >> np.uint64(i & 63)) & np.uint64(1)
+        return self.zapytania[bit.astype(bool)].tolist()
+
+    def tabela_macierzy(self) -> pd.DataFrame:
+        """
+        Funkcja zwraca macierz części wspólnych jako df z kolumną n_unique (publikacje tylko z tego zapytania)
+
+        :return: df z wierszem na zapytanie
+        """
+        df = pd.DataFrame(self.macierz(), index=pd.Index(self.zapytania, name="query"), columns=self.zapytania)
+        df["n_unique"] = self.tylko_jedno()
+        return df.reset_index()
+
+    def tabela_par(self) -> pd.DataFrame:
+        """
+        Funkcja zwraca tabele nakładania się dla każdej pary zapytań
+
+        :return: df z kolumnami query_a, query_b, n_a, n_b, n_both, jaccard, only_a, only_b
+        """
+        macierz = self.macierz()
+        a, b = np.triu_indices(len(self.zapytania), k=1)
+        n_a, n_b, n_both = macierz[a, a], macierz[b, b], macierz[a, b]
+        suma = n_a + n_b - n_both
+
+        return pd.DataFrame({
+            "query_a": self.zapytania[a],
+            "query_b": self.zapytania[b],
+            "n_a": n_a,
+            "n_b": n_b,
+            "n_both": n_both,
+            "jaccard": np.round(np.divide(n_both, suma, out=np.zeros(len(a)), where=suma > 0), 4),
+            "only_a": n_a - n_both,
+            "only_b": n_b - n_both,
+        })
+
+
+def zapisz_nakladanie(linki: pd.DataFrame, out_dir: str) -> BitsetyZapytan:
+    """
+    Funkcja zapisuje tabele nakładania się zapytań (query_overlap.csv) i macierz części wspólnych
+    (query_overlap_matrix.csv)
+
+    :param linki: df z kolumnami query, PMID
+    :param out_dir: Katalog wynikowy
+    :return: Zbudowane mapy bitowe
+    """
+    bitsety = BitsetyZapytan(linki)
+    bitsety.tabela_par().to_csv(os.path.join(out_dir, NAKLADANIE_PLIK), index=False)
+    bitsety.tabela_macierzy().to_csv(os.path.join(out_dir, MACIERZ_PLIK), index=False)
+
+    return bitsety
@@ -0,0 +1,287 @@
+from Bio import Entrez
+import pandas as pd
+import gzip
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+import sesja_http
+
+#Lokalny zamiennik E-utilities (esearch/esummary/efetch) do testów i pomiarów przepustowości bez dostępu do NCBI
+
+NCBI_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
+
+#-------------------------------------KORPUS------------------------------------
+
+def korpus_syntetyczny(n: int, year: int = 2021, n_czasopism: int = 50, seed: int = 0) -> pd.DataFrame:
+    """
+    Funkcja generuje sztuczny zbiór publikacji w formacie takim jak z metadata_table
+
+    :param n: Liczba publikacji
+    :param year: Rok publikacji
+    :param n_czasopism: Liczba różnych czasopism
+    :param seed: Ziarno generatora losowego
+    :return: Df z publikacjami
+    """
+    los = random.Random(seed)
+    miesiace = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+    rows = []
+    for i in range(n):
+        rows.append({
+            "PMID": str(30000000 + i),
+            "title": f"Synthetic article {i} on particulate matter exposure",
+            "journal": f"Journal of Synthetic Studies {los.randrange(n_czasopism)}",
+            "ppublish_year": f"{year} {los.choice(miesiace)}",
+            "authors": ", ".join(f"Author{los.randrange(5 * n + 1)} A" for _ in range(los.randint(1, 6))),
+        })
+
+    return pd.DataFrame(rows)
+
+
+def korpus_z_csv(path: str) -> pd.DataFrame:
+    """
+    Funkcja wczytuje wcześniej pobrany pubmed_papers.csv jako korpus serwera (odtwarzanie prawdziwych odpowiedzi)
+
+    :param path: Ścieżka pliku pubmed_papers.csv
+    :return: Df z publikacjami
+    """
+    return pd.read_csv(path, dtype=str).fillna("").drop_duplicates("PMID").reset_index(drop=True)
+
+#-------------------------------------ODPOWIEDZI_XML------------------------------------
+
+def xml_esearch(pmids: list[str], count: int, term: str) -> str:
+    """
+    Funkcja tworzy odpowiedź esearch (lista PMID) w formacie NCBI
+
+    :param pmids: Zwracane id artykułów
+    :param count: Łączna liczba dopasowanych artykułów
+    :param term: Treść zapytania
+    :return: Tekst XML
+    """
+    idy = "".join(f"<Id>{p}</Id>" for p in pmids)
+    return (
+        '<?xml version="1.0" encoding="UTF-8" ?>\n'
+        '<!DOCTYPE eSearchResult PUBLIC "-//NLM//DTD esearch 20060628//EN" '
+        '"https://eutils.ncbi.nlm.nih.gov/eutils/dtd/20060628/esearch.dtd">\n'
+        f"<eSearchResult><Count>{count}</Count><RetMax>{len(pmids)}</RetMax><RetStart>0</RetStart>"
+        f"<IdList>{idy}</IdList><TranslationSet/><QueryTranslation>{escape(term)}</QueryTranslation>"
+        "</eSearchResult>"
+    )
+
+
+def xml_esummary(df: pd.DataFrame) -> str:
+    """
+    Funkcja tworzy odpowiedź esummary (DocSum) dla podanych publikacji
+
+    :param df: Df z publikacjami
+    :return: Tekst XML
+    """
+    docs = []
+    for r in df.itertuples(index=False):
+        autorzy = "".join(
+            f'<Item Name="Author" Type="String">{escape(a)}</Item>' for a in r.authors.split(", ") if a
+        )
+        docs.append(
+            f"<DocSum><Id>{r.PMID}</Id>"
+            f'<Item Name="PubDate" Type="Date">{escape(r.ppublish_year)}</Item>'
+            f'<Item Name="EPubDate" Type="Date"></Item>'
+            f'<Item Name="Source" Type="String">{escape(r.journal)}</Item>'
+            f'<Item Name="AuthorList" Type="List">{autorzy}</Item>'
+            f'<Item Name="Title" Type="String">{escape(r.title)}</Item>'
+            f'<Item Name="FullJournalName" Type="String">{escape(r.journal)}</Item>'
+            "</DocSum>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" ?>\n'
+        '<!DOCTYPE eSummaryResult PUBLIC "-//NLM//DTD esummary v1 20041029//EN" '
+        '"https://eutils.ncbi.nlm.nih.gov/eutils/dtd/20041029/esummary-v1.dtd">\n'
+        f"<eSummaryResult>{''.join(docs)}</eSummaryResult>"
+    )
+
+
+def xml_efetch(df: pd.DataFrame) -> str:
+    """
+    Funkcja tworzy odpowiedź efetch (PubmedArticleSet) dla podanych publikacji
+
+    :param df: Df z publikacjami
+    :return: Tekst XML
+    """
+    artykuly = []
+    for r in df.itertuples(index=False):
+        artykuly.append(
+            "<PubmedArticle><MedlineCitation>"
+            f"<PMID>{r.PMID}</PMID><Article>"
+            f"<Journal><Title>{escape(r.journal)}</Title></Journal>"
+            f"<ArticleTitle>{escape(r.title)}</ArticleTitle>"
+            f"<Abstract><AbstractText>Synthetic abstract of {escape(r.title)}.</AbstractText></Abstract>"
+            "</Article>"
+            "<MeshHeadingList><MeshHeading><DescriptorName>Particulate Matter</DescriptorName></MeshHeading></MeshHeadingList>"
+            "</MedlineCitation></PubmedArticle>"
+        )
+    return f'<?xml version="1.0" ?>\n<PubmedArticleSet>{"".join(artykuly)}</PubmedArticleSet>'
+
+#-------------------------------------SERWER------------------------------------
+
+class SerwerEutils(ThreadingHTTPServer):
+    """
+    Serwer HTTP udający E-utilities. Pozwala ustawić opóźnienie odpowiedzi, limit zapytań na sekundę
+    (po przekroczeniu odpowiada 429, jak NCBI) oraz losowe wstrzykiwanie odpowiedzi 429.
+    """
+    daemon_threads = True
+
+    def __init__(self, korpus: pd.DataFrame, opoznienie: float = 0.0, limit: float | None = None,
+                 p429: float = 0.0, seed: int = 0, port: int = 0):
+        super().__init__(("127.0.0.1", port), ObslugaEutils)
+        self.korpus = korpus.set_index("PMID", drop=False)
+        self.pmids = korpus["PMID"].tolist()
+        self.lata = korpus["ppublish_year"].str[:4].tolist()
+        self.opoznienie = opoznienie
+        self.limit = limit
+        self.p429 = p429
+        self.los = random.Random(seed)
+        self.blokada = threading.Lock()
+        self.ostatnie = []
+        self.statystyki = {"zapytania": 0, "polaczenia": 0, "odpowiedzi_429": 0, "esearch": 0, "esummary": 0, "efetch": 0}
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/entrez/eutils/"
+
+    def czy_odrzucic(self) -> bool:
+        """
+        Funkcja rejestruje zapytanie i sprawdza czy należy na nie odpowiedzieć kodem 429
+
+        :return: "True" jeśli przekroczono limit lub wylosowano wstrzyknięcie błędu
+        """
+        with self.blokada:
+            teraz = time.monotonic()
+            self.statystyki["zapytania"] += 1
+            self.ostatnie = [t for t in self.ostatnie if teraz - t < 1.0]
+
+            odrzuc = self.los.random() < self.p429
+            if self.limit is not None and len(self.ostatnie) >= self.limit:
+                odrzuc = True
+            else:
+                self.ostatnie.append(teraz)
+
+            if odrzuc:
+                self.statystyki["odpowiedzi_429"] += 1
+            return odrzuc
+
+
+class ObslugaEutils(BaseHTTPRequestHandler):
+
+    #Jak NCBI: połączenia keep-alive i kompresja gzip, jeśli klient ją akceptuje
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.blokada:
+            self.server.statystyki["polaczenia"] += 1
+
+    def do_GET(self):
+        self.obsluz(parse_qs(urlsplit(self.path).query))
+
+    def do_POST(self):
+        dlugosc = int(self.headers.get("Content-Length", 0))
+        self.obsluz(parse_qs(self.rfile.read(dlugosc).decode("utf-8")))
+
+    def odpowiedz(self, kod: int, tresc: str, typ: str = "text/xml") -> None:
+        dane = tresc.encode("utf-8")
+        self.send_response(kod)
+        self.send_header("Content-Type", f"{typ}; charset=UTF-8")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            dane = gzip.compress(dane, compresslevel=1)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(dane)))
+        self.end_headers()
+        self.wfile.write(dane)
+
+    def obsluz(self, params: dict[str, list[str]]) -> None:
+        serwer = self.server
+        narzedzie = urlsplit(self.path).path.rsplit("/", 1)[-1].split(".")[0]
+
+        if serwer.opoznienie:
+            time.sleep(serwer.opoznienie)
+
+        if serwer.czy_odrzucic():
+            self.odpowiedz(429, '{"error":"API rate limit exceeded"}', "application/json")
+            return
+
+        if narzedzie not in ("esearch", "esummary", "efetch"):
+            self.odpowiedz(404, "")
+            return
+
+        with serwer.blokada:
+            serwer.statystyki[narzedzie] += 1
+
+        if narzedzie == "esearch":
+            term = params.get("term", [""])[0]
+            retmax = int(params.get("retmax", ["20"])[0])
+            #Zakresy lat z warunku RRRR/01/01:RRRR/12/31[PDAT] zawężają korpus do publikacji z tych lat
+            lata = {str(rok) for od, do in re.findall(r"(\d{4})/01/01:(\d{4})/12/31\[PDAT\]", term)
+                    for rok in range(int(od), int(do) + 1)}
+            pasujace = [p for p, rok in zip(serwer.pmids, serwer.lata) if not lata or rok in lata]
+            #Różne zapytania zwracają różne (ale powtarzalne) fragmenty korpusu
+            n = len(pasujace)
+            start = zlib.crc32(term.encode("utf-8")) % n if n else 0
+            pmids = (pasujace[start:] + pasujace[:start])[:retmax]
+            self.odpowiedz(200, xml_esearch(pmids, n, term))
+        else:
+            #Jak NCBI - rekordy w kolejności podanych id
+            ids = [p for p in ",".join(params.get("id", [""])).split(",") if p in serwer.korpus.index]
+            df = serwer.korpus.loc[ids]
+            tresc = xml_esummary(df) if narzedzie == "esummary" else xml_efetch(df)
+            self.odpowiedz(200, tresc)
+
+
+def uruchom_serwer(korpus: pd.DataFrame, **ustawienia: Any) -> SerwerEutils:
+    """
+    Funkcja uruchamia serwer w osobnym wątku (na wolnym porcie)
+
+    :param korpus: Df z publikacjami serwowanymi przez serwer
+    :param ustawienia: Parametry SerwerEutils (opoznienie, limit, p429, seed, port)
+    :return: Działający serwer - należy go zamknąć przez shutdown() i server_close()
+    """
+    serwer = SerwerEutils(korpus, **ustawienia)
+    threading.Thread(target=serwer.serve_forever, daemon=True).start()
+    return serwer
+
+
+@contextmanager
+def przekieruj_entrez(base_url: str) -> Iterator[None]:
+    """
+    Kontekst, w którym wszystkie zapytania Bio.Entrez trafiają pod podany adres zamiast do NCBI
+
+    :param base_url: Adres zastępczego serwera (np. SerwerEutils.url)
+    """
+    #Podmieniamy urlopen używany wewnątrz Bio.Entrez - jego obsługa błędów i ponowień zostaje bez zmian,
+    #a zapytania nadal idą przez wspólną sesję (jak przy NCBI). Po wyjściu Entrez wraca do stanu sprzed kontekstu.
+    przed = Entrez.urlopen
+    podlaczony = getattr(Entrez, "sesja_http", False)
+    sesja_http.podlacz_entrez()
+    oryginalny = Entrez.urlopen
+
+    def urlopen(request, *args, **kwargs):
+        request.full_url = request.full_url.replace(NCBI_URL, base_url)
+        return oryginalny(request, *args, **kwargs)
+
+    Entrez.urlopen = urlopen
+    try:
+        yield
+    finally:
+        Entrez.urlopen = przed
+        if not podlaczony:
+            del Entrez.sesja_http
@@ -0,0 +1,58 @@
+from pubmed_abstrakty import pobierz_abstrakty, wczytaj_abstrakty
+
+import io
+import pytest
+
+@pytest.fixture
+def mock_xml():
+    return b"""<?xml version="1.0" ?>
+<PubmedArticleSet>
+  <PubmedArticle>
+    <MedlineCitation>
+      <PMID>12345678</PMID>
+      <Article>
+        <Journal><Title>Fake journal name</Title></Journal>
+        <ArticleTitle>Fake <i>title</i></ArticleTitle>
+        <Abstract>
+          <AbstractText Label="BACKGROUND">Tlo.</AbstractText>
+          <AbstractText Label="RESULTS">Wyniki.</AbstractText>
+        </Abstract>
+      </Article>
+      <MeshHeadingList>
+        <MeshHeading><DescriptorName>Air Pollution</DescriptorName></MeshHeading>
+        <MeshHeading><DescriptorName>Particulate Matter</DescriptorName></MeshHeading>
+      </MeshHeadingList>
+    </MedlineCitation>
+  </PubmedArticle>
+  <PubmedArticle>
+    <MedlineCitation>
+      <PMID>87654321</PMID>
+      <Article>
+        <Journal><Title>Other journal</Title></Journal>
+        <ArticleTitle>No abstract</ArticleTitle>
+      </Article>
+    </MedlineCitation>
+  </PubmedArticle>
+</PubmedArticleSet>"""
+
+def test_pobierz_abstrakty(monkeypatch, mock_xml, tmp_path):
+    def mock_efetch(db, id, retmode):
+        assert id == "12345678,87654321"
+        return io.BytesIO(mock_xml)
+
+    monkeypatch.setattr("pubmed_abstrakty.Entrez.efetch", mock_efetch)
+
+    out_path = tmp_path / "abstracts.jsonl.gz"
+    n = pobierz_abstrakty(["12345678", "87654321"], {"email": "random@mail.com"}, str(out_path))
+
+    assert n == 2
+
+    rekordy = list(wczytaj_abstrakty(str(out_path)))
+
+    assert rekordy[0]["PMID"] == "12345678"
+    assert rekordy[0]["title"] == "Fake title"
+    assert rekordy[0]["journal"] == "Fake journal name"
+    assert rekordy[0]["abstract"] == "BACKGROUND: Tlo. RESULTS: Wyniki."
+    assert rekordy[0]["mesh"] == ["Air Pollution", "Particulate Matter"]
+    assert rekordy[1]["abstract"] == ""
+    assert rekordy[1]["mesh"] == []
@@ -1,5 +1,9 @@
-from pubmed_funkcje import metadata_table
+from pubmed_funkcje import metadata_table, dl_papers_przyrostowo, zapisz_stan, summary_ze_stanu, dl_papers_lata
 
+import pubmed_serwer_lokalny as srv
+import pubmed_indeks as ind
+
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -42,16 +46,317 @@ def test_metadata_table(monkeypatch, mock_record):
     assert row["authors"] == "Jan Nowak, Andrzej Kowalski"
 
 
+def test_dl_papers_przyrostowo(monkeypatch, tmp_path):
+    stare = pd.DataFrame({
+        "PMID": ["1", "1", "2"],
+        "title": ["A", "A", "B"],
+        "journal": ["J1", "J1", "J2"],
+        "ppublish_year": ["2021", "2021", "2021"],
+        "authors": ["", "", ""],
+        "year": [2021, 2021, 2021],
+        "query": ["q1", "q2", "q1"],
+    })
+    stan = {
+        "znaczniki": {"q1": "2021/06/01", "q2": "2021/06/01"},
+        "n_publikacji": {"q1": 2, "q2": 1},
+        "czasopisma": {"J1": 2, "J2": 1},
+    }
+    zapisz_stan(str(tmp_path), stare, stan)
+    stare.iloc[:, :-2].to_csv(tmp_path / "pubmed_papers.csv", index=False)
+
+    #edat: nowa publikacja 3 dla q1, mdat: publikacja 1 zmieniła czasopismo
+    def mock_papers_per_query(year, config, od_daty=None, typ_daty="edat"):
+        q = config["zapytania"][0]
+        assert od_daty == "2021/06/01"
+        pmids = {("q1", "edat"): ["3"], ("q1", "mdat"): ["1"]}.get((q, typ_daty), [])
+        return pd.DataFrame({"year": year, "query": q, "PMID": pmids}, columns=["year", "query", "PMID"])
+
+    def mock_metadata_table(pmids, config):
+        meta = {"1": ("A", "J3"), "3": ("C", "J2")}
+        return pd.DataFrame([
+            {"PMID": p, "title": meta[p][0], "journal": meta[p][1], "ppublish_year": "2021", "authors": ""}
+            for p in pmids
+        ])
+
+    monkeypatch.setattr("pubmed_funkcje.papers_per_query", mock_papers_per_query)
+    monkeypatch.setattr("pubmed_funkcje.metadata_table", mock_metadata_table)
+
+    config = {"email": "random@mail.com", "zapytania": ["q1", "q2"]}
+    df, nowy_stan = dl_papers_przyrostowo(2021, config, str(tmp_path))
+
+    assert sorted(df["PMID"].unique()) == ["1", "2", "3"]
+    assert len(df) == 4
+    assert set(df.loc[df["PMID"] == "1", "journal"]) == {"J3"}
+    assert nowy_stan["n_publikacji"] == {"q1": 3, "q2": 1}
+    assert {j: n for j, n in nowy_stan["czasopisma"].items() if n} == {"J2": 2, "J3": 2}
+
+    summary = summary_ze_stanu(nowy_stan, 2021)
+    assert summary["n_publications"].tolist() == [3, 1]
+
+
+def test_dl_papers_lata(monkeypatch):
+    #Publikacja 2 znaleziona przez oba zapytania - metadane pobierane raz; podział na lata według PubDate
+    def mock_papers_per_query_lata(years, config):
+        return pd.DataFrame({"query": ["q1", "q1", "q2", "q2", "q1"], "PMID": ["1", "2", "2", "3", "4"]})
+
+    def mock_metadata_table(pmids, config):
+        assert pmids == ["1", "2", "3", "4"]
+        return pd.DataFrame({
+            "PMID": ["1", "2", "3", "4"],
+            "title": ["A", "B", "C", "D"],
+            "journal": ["J1", "J2", "J1", "J2"],
+            "ppublish_year": ["2019 Mar", "2021", "2020 Jan", "2021 Dec"],
+            "authors": ["", "", "", ""],
+        })
+
+    monkeypatch.setattr("pubmed_funkcje.papers_per_query_lata", mock_papers_per_query_lata)
+    monkeypatch.setattr("pubmed_funkcje.metadata_table", mock_metadata_table)
+
+    config = {"email": "random@mail.com", "zapytania": ["q1", "q2"], "lim_wynikow": 100}
+    wynik = dl_papers_lata([2019, 2021], config)
+
+    #Publikacja 3 z roku 2020 (w zakresie, ale spoza listy lat) pominięta
+    assert sorted(wynik) == [2019, 2021]
+    assert wynik[2019]["PMID"].tolist() == ["1"]
+    assert wynik[2021]["PMID"].tolist() == ["2", "2", "4"]
+    assert wynik[2021]["query"].tolist() == ["q1", "q2", "q1"]
+    assert (wynik[2021]["year"] == 2021).all()
+    assert list(wynik[2021].columns) == ["PMID", "title", "journal", "ppublish_year", "authors", "year", "query"]
+
+
+def test_dl_papers_lata_jedno_wyszukiwanie(tmp_path):
+    from pubmed_funkcje import dl_papers
+
+    korpusy = []
+    for i, (year, n) in enumerate([(2019, 40), (2020, 20), (2021, 30)]):
+        korpus = srv.korpus_syntetyczny(n, year=year, seed=i)
+        korpus["PMID"] = [str(30000000 + 1000 * i + j) for j in range(n)]
+        korpusy.append(korpus)
+
+    serwer = srv.uruchom_serwer(pd.concat(korpusy, ignore_index=True))
+    config = {
+        "email": "random@mail.com",
+        "zapytania": ["q1", "q2"],
+        "lim_wynikow": 100,
+        "limit_zapytan": 100,
+        "plik_limitu": str(tmp_path / "limit.lock"),
+    }
+
+    try:
+        with srv.przekieruj_entrez(serwer.url):
+            osobno = {year: dl_papers(year, config) for year in (2019, 2021)}
+            przed = dict(serwer.statystyki)
+            razem = dl_papers_lata([2019, 2021], config)
+    finally:
+        serwer.shutdown()
+        serwer.server_close()
+
+    #Jedno esearch na zapytanie dla całego zakresu lat i jedna wspólna paczka esummary
+    assert serwer.statystyki["esearch"] - przed["esearch"] == 2
+    assert serwer.statystyki["esummary"] - przed["esummary"] == 1
+
+    #Bez obcięcia limitem wyników - te same publikacje i dopasowania co przy osobnym pobieraniu lat
+    klucz = ["PMID", "query"]
+    for year in (2019, 2021):
+        pd.testing.assert_frame_equal(razem[year].sort_values(klucz).reset_index(drop=True),
+                                      osobno[year].sort_values(klucz).reset_index(drop=True))
+    assert razem[2021]["PMID"].nunique() == 30
+
+
+def test_dl_papers_serwer_lokalny(tmp_path):
+    from pubmed_funkcje import dl_papers
+
+    serwer = srv.uruchom_serwer(srv.korpus_syntetyczny(250))
+    config = {
+        "email": "random@mail.com",
+        "zapytania": ["q1"],
+        "lim_wynikow": 210,
+        "limit_zapytan": 100,
+        "plik_limitu": str(tmp_path / "limit.lock"),
+    }
+
+    try:
+        with srv.przekieruj_entrez(serwer.url):
+            df = dl_papers(2021, config)
+    finally:
+        serwer.shutdown()
+        serwer.server_close()
+
+    #1 esearch + 2 paczki esummary (po 200 PMID) - jednym połączeniem z puli sesja_http
+    assert serwer.statystyki["esearch"] == 1
+    assert serwer.statystyki["esummary"] == 2
+    assert serwer.statystyki["polaczenia"] == 1
+    assert len(df) == 210
+    assert df["PMID"].is_unique
+    assert (df["ppublish_year"] == "2021").all()
+
+
+def test_dl_papers_watki_zgodne_z_sekwencyjnym(tmp_path):
+    from pubmed_funkcje import dl_papers
+
+    serwer = srv.uruchom_serwer(srv.korpus_syntetyczny(1000), opoznienie=0.02)
+    config = {
+        "email": "random@mail.com",
+        "zapytania": ["q1", "q2", "q3"],
+        "lim_wynikow": 900,
+        "limit_zapytan": 100,
+        "plik_limitu": str(tmp_path / "limit.lock"),
+    }
+
+    try:
+        with srv.przekieruj_entrez(serwer.url):
+            df = dl_papers(2021, config)
+            df_watki = dl_papers(2021, {**config, "watki": 4})
+    finally:
+        serwer.shutdown()
+        serwer.server_close()
+
+    pd.testing.assert_frame_equal(df_watki, df)
+
+
+def test_dl_papers_strumieniowo_zgodne_z_pandas(tmp_path):
+    from pubmed_funkcje import dl_papers, dl_papers_strumieniowo, make_summary_by_year, top_n_journals
+    from pubmed_agregacja import AgregatorPubMed
+
+    serwer = srv.uruchom_serwer(srv.korpus_syntetyczny(300, n_czasopism=8))
+    config = {
+        "email": "random@mail.com",
+        "zapytania": ["q1", "q2"],
+        "lim_wynikow": 250,
+        "top_n": 5,
+        "limit_zapytan": 100,
+        "plik_limitu": str(tmp_path / "limit.lock"),
+    }
+    papers_file = str(tmp_path / "pubmed_papers.csv")
+
+    try:
+        with srv.przekieruj_entrez(serwer.url):
+            df = dl_papers(2021, config)
+            agregator = AgregatorPubMed(config["top_n"])
+            linki = dl_papers_strumieniowo(2021, config, agregator, papers_file)
+            #Pojemność większa niż liczba czasopism - tryb przybliżony liczy dokładnie
+            przyblizony = AgregatorPubMed(config["top_n"], przyblizony=True, pojemnosc=20)
+            dl_papers_strumieniowo(2021, config, przyblizony, str(tmp_path / "pubmed_papers_przyblizone.csv"))
+    finally:
+        serwer.shutdown()
+        serwer.server_close()
+
+    pd.testing.assert_frame_equal(
+        agregator.summary_by_year().reset_index(drop=True),
+        make_summary_by_year(df).reset_index(drop=True),
+        check_dtype=False
+    )
+    assert agregator.top_journals()["num_publications"].tolist() == top_n_journals(df, config)["num_publications"].tolist()
+    pd.testing.assert_frame_equal(przyblizony.summary_by_year(), agregator.summary_by_year(), check_dtype=False)
+    pd.testing.assert_frame_equal(przyblizony.top_journals(), agregator.top_journals())
+
+    df_papers = pd.read_csv(papers_file, dtype=str)
+    assert df_papers["PMID"].tolist() == df["PMID"].tolist()
+
+    #Poza plikiem zostają tylko powiązania, a indeks tytułów z pliku jest taki sam jak z pełnej tabeli
+    assert len(linki) == len(df)
+    (tmp_path / "z_pliku").mkdir()
+    (tmp_path / "z_tabeli").mkdir()
+    z_pliku = np.load(ind.zapisz_z_pliku(papers_file, str(tmp_path / "z_pliku")))
+    z_tabeli = np.load(ind.zapisz_z_danych(df, str(tmp_path / "z_tabeli")))
+    for nazwa in z_tabeli.files:
+        np.testing.assert_array_equal(z_pliku[nazwa], z_tabeli[nazwa])
+
+
+def test_space_saving():
+    from pubmed_agregacja import SpaceSaving
+
+    ss = SpaceSaving(5)
+    strumien = ["A"] * 50 + ["B"] * 30 + [f"rzadkie{i}" for i in range(40)] + ["A"] * 10
+
+    for element in strumien:
+        ss.dodaj(element)
+
+    liczniki = dict(ss.items())
+    assert len(liczniki) == 5
+    #Częste elementy zostają, a błąd oszacowania jest ograniczony przez n/pojemnosc
+    assert 60 <= liczniki["A"] <= 60 + len(strumien) // 5
+    assert 30 <= liczniki["B"] <= 30 + len(strumien) // 5
+
+
+def test_tabele_kompaktowe_parquet(tmp_path):
+    import pubmed_kompakt as kmp
+
+    df = pd.DataFrame({
+        "PMID": ["11", "11", "12"],
+        "title": ["A", "A", "B"],
+        "journal": ["J1", "J1", "J1"],
+        "ppublish_year": ["2021", "2021", "2020"],
+        "authors": ["Nowak J, Kowalski A", "Nowak J, Kowalski A", ""],
+        "year": [2021, 2021, 2021],
+        "query": ["q1", "q2", "q1"],
+    })
+
+    tabele = kmp.z_danych(df)
+
+    assert len(tabele["papers"]) == 2
+    assert tabele["papers"]["PMID"].dtype == "int64"
+    assert tabele["papers"]["journal"].dtype == "category"
+    assert len(tabele["linki"]) == 3
+    assert kmp.autorzy_publikacji(tabele, 0) == ["Nowak J", "Kowalski A"]
+    assert kmp.autorzy_publikacji(tabele, 1) == []
+
+    kmp.zapisz_parquet(tabele, str(tmp_path))
+    wczytane = kmp.wczytaj_parquet(str(tmp_path))
+
+    assert kmp.autorzy_publikacji(wczytane, 0) == ["Nowak J", "Kowalski A"]
+    pd.testing.assert_frame_equal(kmp.do_tabeli_szerokiej(wczytane), df)
 
 
+def test_graf_autorow():
+    import pubmed_kompakt as kmp
+    import pubmed_graf as graf
 
+    df = pd.DataFrame({
+        "PMID": ["1", "2", "3", "4"],
+        "title": ["A", "B", "C", "D"],
+        "journal": ["J1", "J1", "J2", "J2"],
+        "ppublish_year": ["2020", "2021", "2021", "2021"],
+        "authors": ["Nowak J, Kowalski A", "Nowak J, Kowalski A, Wiśniewska E", "Nowak J, Nowak J", "Zieliński P"],
+        "year": [2021] * 4,
+        "query": ["q1"] * 4,
+    })
 
+    g = graf.GrafAutorow(kmp.z_danych(df))
+    stat = g.statystyki().set_index("author")
 
+    #Powtórzony autor na liście jednej publikacji liczy się raz
+    assert stat.loc["Nowak J", "n_papers"] == 3
+    assert stat.loc["Nowak J", "n_coauthors"] == 2
+    assert stat.loc["Nowak J", "n_journals"] == 2
+    assert stat.loc["Nowak J", "top_coauthor"] == "Kowalski A"
+    assert stat.loc["Nowak J", "top_coauthor_papers"] == 2
+    assert stat.loc["Zieliński P", "n_coauthors"] == 0
 
+    assert g.top_wspolautorzy("Wiśniewska E")["coauthor"].tolist() == ["Kowalski A", "Nowak J"]
 
+    lata = g.produktywnosc()
+    assert lata.loc[lata["author"] == "Nowak J", "n_papers"].tolist() == [1, 2]
 
 
+def test_nakladanie_zapytan():
+    import pubmed_nakladanie as nkl
 
+    #PMID ponad granicą słowa 64-bitowego, żeby sprawdzić kilka słów mapy
+    linki = pd.DataFrame({
+        "query": ["smog", "smog", "smog", "pm2.5", "pm2.5", "asthma"] + ["asthma"] * 70,
+        "PMID": ["1", "2", "3", "2", "3", "3"] + [str(100 + i) for i in range(70)],
+    })
+    b = nkl.BitsetyZapytan(linki)
 
+    pary = b.tabela_par().set_index(["query_a", "query_b"])
+    assert pary.loc[("pm2.5", "smog"), "n_both"] == 2
+    assert pary.loc[("pm2.5", "smog"), "jaccard"] == pytest.approx(2 / 3, abs=1e-4)
+    assert pary.loc[("pm2.5", "smog"), "only_b"] == 1
+    assert pary.loc[("asthma", "smog"), "n_a"] == 71
 
+    macierz = b.tabela_macierzy().set_index("query")
+    assert macierz["n_unique"].to_dict() == {"asthma": 70, "pm2.5": 0, "smog": 1}
 
+    assert b.zapytania_publikacji(3) == ["asthma", "pm2.5", "smog"]
+    assert b.zapytania_publikacji(4) == []
@@ -0,0 +1,42 @@
+from pubmed_indeks import koduj_varint, dekoduj_varint, zapisz_indeks, IndeksTytulow
+
+import numpy as np
+import pytest
+
+def test_varint():
+    wartosci = np.array([0, 1, 127, 128, 300, 2**40, 5])
+
+    assert (dekoduj_varint(koduj_varint(wartosci)) == wartosci).all()
+
+
+@pytest.fixture
+def indeks(tmp_path):
+    tytuly = [
+        "PM2.5 exposure and asthma in children",
+        "Winter smog episodes in Kraków",
+        "Particulate matter and mortality: a review",
+        "Asthma, smog and PM2.5 in Polish cities",
+        "Pollution of rivers",
+    ]
+    return IndeksTytulow(zapisz_indeks(np.array([50, 10, 40, 20, 30]), tytuly, str(tmp_path)))
+
+
+def test_zapytania(indeks):
+    assert indeks.szukaj("pm2.5").tolist() == [20, 50]
+    assert indeks.szukaj("PM2.5[Title/Abstract] AND (smog OR children)").tolist() == [20, 50]
+    assert indeks.szukaj("asthma NOT children").tolist() == [20]
+    assert indeks.szukaj('"particulate matter" review').tolist() == [40]
+    assert indeks.szukaj("pollut*").tolist() == [30]
+    assert indeks.szukaj("NOT smog").tolist() == [30, 40, 50]
+    assert indeks.szukaj("krakow OR ozone").tolist() == []
+
+    with pytest.raises(ValueError):
+        indeks.szukaj("(smog OR asthma")
+
+
+def test_najtrafniejsze(indeks):
+    #Oba tytuły mają "smog", ale tylko jeden też rzadsze "winter"
+    df = indeks.najtrafniejsze("smog OR winter", 2)
+
+    assert df["PMID"].tolist() == [10, 20]
+    assert df["title"].iloc[0] == "Winter smog episodes in Kraków"
@@ -0,0 +1,14 @@
+from pubmed_limit import zarezerwuj_termin
+
+import time
+
+def test_zarezerwuj_termin(tmp_path):
+    path = str(tmp_path / "limit.lock")
+
+    start = time.time()
+    terminy = [zarezerwuj_termin(path, 4) for _ in range(5)]
+
+    #Pierwsze zapytanie od razu, kolejne co 1/limit sekundy
+    assert terminy[0] - start < 0.1
+    for poprzedni, nastepny in zip(terminy, terminy[1:]):
+        assert abs((nastepny - poprzedni) - 0.25) < 1e-6
@@ -0,0 +1,340 @@
+import argparse
+import datetime
+import math
+import os
+import re
+import resource
+import socket
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+#Historia uruchomień reguł pipeline'u: każde wywołanie skryptu etapu dopisuje do lokalnej bazy SQLite czas,
+#czas procesora, szczytową pamięć, liczbę przetworzonych wierszy, ruch HTTP (sesja_http) i trafienia cache.
+#Wpisy jednego przebiegu Snakemake mają wspólny identyfikator (zmienna HISTORIA_URUCHOMIENIE ustawiana w Snakefile),
+#a polecenie "porownaj" wskazuje reguły, których czas w ostatnim przebiegu jest istotnie dłuższy niż wcześniej.
+
+#Domyślna ścieżka bazy - inną można podać w zmiennej HISTORIA_BAZA (czytanej przy zapisie, nie przy imporcie,
+#bo wykonawca zadań importuje moduł przed otrzymaniem środowiska zadania)
+BAZA = "results/historia_uruchomien.sqlite"
+ZMIENNA_URUCHOMIENIA = "HISTORIA_URUCHOMIENIE"
+#Ustawiana przez wykonawcę zadań (scripts/wykonawca.py) w procesie zadania. Zadanie jest kopią (fork) procesu
+#z zaimportowanymi wcześniej modułami, więc jego szczytowa pamięć zawiera pamięć wykonawcy, a czas nie obejmuje
+#importów - wpisy z obu trybów nie są porównywalne
+ZMIENNA_WYKONAWCY = "HISTORIA_WYKONAWCA"
+#Poziom istotności, minimalny wzrost czasu (względny) i liczba wcześniejszych przebiegów w porównaniu
+ALFA = 0.05
+MIN_WZROST = 0.1
+OKNO = 10
+
+KOLUMNY = {
+    "uruchomienie": "TEXT", "regula": "TEXT", "klucz": "TEXT", "start": "TEXT", "status": "TEXT", "host": "TEXT",
+    "tryb": "TEXT",
+    "czas_s": "REAL", "cpu_s": "REAL", "pamiec_mb": "REAL", "wiersze": "INTEGER",
+    "http_zapytania": "INTEGER", "http_bajty": "INTEGER", "cache_trafienia": "INTEGER", "cache_chybienia": "INTEGER",
+}
+
+#Liczniki zgłaszane przez skrypty w trakcie pomiaru (wiersze, cache_trafienia, cache_chybienia)
+_liczniki = {}
+
+#-------------------------------------POMIAR------------------------------------
+
+def dolicz(nazwa: str, n: int = 1) -> None:
+    """
+    Funkcja zwiększa licznik bieżącego pomiaru (bez pomiaru - bez skutku dla wyników)
+
+    :param nazwa: "wiersze", "cache_trafienia" albo "cache_chybienia"
+    :param n: Wartość do dodania
+    """
+    _liczniki[nazwa] = _liczniki.get(nazwa, 0) + int(n)
+
+
+def pamiec_szczytowa_mb() -> float:
+    #ru_maxrss w KB (Linux) - największy z procesu i jego zakończonych procesów potomnych (np. pula czyszczenia)
+    wlasna = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    potomne = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(wlasna, potomne) / 1024, 1)
+
+
+def tryb() -> str:
+    #"wykonawca" - zadanie wykonawcy zadań, "proces" - osobny interpreter
+    return "wykonawca" if os.environ.get(ZMIENNA_WYKONAWCY) else "proces"
+
+
+def ruch_http() -> dict[str, int]:
+    #Suma po hostach ze wspólnej sesji - tylko jeśli skrypt z niej korzystał (moduł zaimportowany)
+    modul = sys.modules.get("sesja_http")
+    if modul is None:
+        return {"zapytania": 0, "bajty": 0}
+    statystyki = modul.statystyki().values()
+    return {"zapytania": sum(s["zapytania"] for s in statystyki), "bajty": sum(s["bajty"] for s in statystyki)}
+
+
+def klucz_z_argumentow(argumenty: dict[str, Any]) -> str:
+    """
+    Funkcja wyznacza klucz wpisu (rok) z argumentów etapu - z "year" albo z roku w ścieżce (results/pm25/2019/...)
+
+    :param argumenty: Argumenty wywołania (vars(args))
+    :return: Klucz albo ""
+    """
+    if argumenty.get("year"):
+        return str(argumenty["year"])
+    for wartosc in argumenty.values():
+        #Listy ścieżek (np. dane wszystkich lat dla indeksu stacji) nie wskazują jednego roku
+        if isinstance(wartosc, list):
+            continue
+        rok = re.search(r"(?:^|/)((?:19|20)\d{2})(?:/|\.|$)", str(wartosc))
+        if rok:
+            return rok.group(1)
+    return ""
+
+
+@contextmanager
+def pomiar(regula: str, klucz: str = "", baza: str | None = None) -> Iterator[None]:
+    """
+    Kontekst mierzący wykonanie reguły i dopisujący wynik do historii (także gdy wykonanie zakończy się błędem)
+
+    :param regula: Nazwa reguły (jak w Snakefile)
+    :param klucz: Klucz wpisu, np. rok
+    :param baza: Ścieżka bazy (domyślnie HISTORIA_BAZA albo BAZA)
+    """
+    _liczniki.clear()
+    http_przed = ruch_http()
+    cpu_przed = time.process_time()
+    start = datetime.datetime.now()
+    t0 = time.perf_counter()
+    status = "ok"
+
+    try:
+        yield
+    except BaseException as e:
+        status = "ok" if isinstance(e, SystemExit) and not e.code else "blad"
+        raise
+    finally:
+        http = ruch_http()
+        wpis = {
+            "uruchomienie": os.environ.get(ZMIENNA_URUCHOMIENIA) or f"{start:%Y%m%d-%H%M%S}-{os.getpid()}",
+            "regula": regula,
+            "klucz": str(klucz),
+            "start": start.isoformat(timespec="seconds"),
+            "status": status,
+            "host": socket.gethostname(),
+            "tryb": tryb(),
+            "czas_s": round(time.perf_counter() - t0, 3),
+            "cpu_s": round(time.process_time() - cpu_przed, 3),
+            "pamiec_mb": pamiec_szczytowa_mb(),
+            "wiersze": _liczniki.get("wiersze"),
+            "http_zapytania": http["zapytania"] - http_przed["zapytania"],
+            "http_bajty": http["bajty"] - http_przed["bajty"],
+            "cache_trafienia": _liczniki.get("cache_trafienia"),
+            "cache_chybienia": _liczniki.get("cache_chybienia"),
+        }
+        try:
+            zapisz_wpis(wpis, baza or os.environ.get("HISTORIA_BAZA", BAZA))
+        except (sqlite3.Error, OSError) as e:
+            #Historia nie może zatrzymać pipeline'u
+            print(f"Nie zapisano historii uruchomienia ({e})", file=sys.stderr)
+
+#-------------------------------------BAZA------------------------------------
+
+def polacz(baza: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(baza) or ".", exist_ok=True)
+    #Równoległe joby Snakemake piszą do tej samej bazy - WAL i oczekiwanie na blokadę zamiast błędu
+    polaczenie = sqlite3.connect(baza, timeout=30)
+    polaczenie.execute("PRAGMA journal_mode=WAL")
+    polaczenie.execute(
+        f"CREATE TABLE IF NOT EXISTS historia (id INTEGER PRIMARY KEY, "
+        f"{', '.join(f'{nazwa} {typ}' for nazwa, typ in KOLUMNY.items())})"
+    )
+    #Bazy sprzed dodania kolumny (tryb) - brakujące kolumny dopisywane, stare wpisy mają w nich NULL
+    istniejace = {wiersz[1] for wiersz in polaczenie.execute("PRAGMA table_info(historia)")}
+    for nazwa, typ in KOLUMNY.items():
+        if nazwa not in istniejace:
+            polaczenie.execute(f"ALTER TABLE historia ADD COLUMN {nazwa} {typ}")
+    return polaczenie
+
+
+def zapisz_wpis(wpis: dict[str, Any], baza: str = BAZA) -> None:
+    """
+    Funkcja dopisuje wpis do historii
+
+    :param wpis: Słownik z polami KOLUMNY
+    :param baza: Ścieżka bazy
+    """
+    polaczenie = polacz(baza)
+    try:
+        with polaczenie:
+            polaczenie.execute(
+                f"INSERT INTO historia ({', '.join(KOLUMNY)}) VALUES ({', '.join('?' * len(KOLUMNY))})",
+                [wpis.get(nazwa) for nazwa in KOLUMNY]
+            )
+    finally:
+        polaczenie.close()
+
+
+def wczytaj_historie(baza: str = BAZA) -> Any:
+    """
+    Funkcja wczytuje całą historię
+
+    :param baza: Ścieżka bazy
+    :return: df z wpisami (kolumny KOLUMNY) w kolejności zapisu
+    """
+    import pandas as pd
+
+    polaczenie = polacz(baza)
+    try:
+        df = pd.read_sql_query(f"SELECT {', '.join(KOLUMNY)} FROM historia ORDER BY id", polaczenie)
+    finally:
+        polaczenie.close()
+
+    #Wpisy sprzed zapisywania trybu - wykonawca zadań był wtedy domyślnie wyłączony
+    df["tryb"] = df["tryb"].fillna("proces")
+    trafienia, chybienia = df["cache_trafienia"], df["cache_chybienia"]
+    df["cache_proc"] = (100 * trafienia / (trafienia + chybienia)).round(1)
+    return df
+
+#-------------------------------------POROWNANIE------------------------------------
+
+def porownaj(df: Any, uruchomienie: str | None = None, okno: int = OKNO, alfa: float = ALFA,
+             min_wzrost: float = MIN_WZROST) -> Any:
+    """
+    Funkcja porównuje czasy reguł w przebiegu z wcześniejszymi przebiegami. Dla każdej pary (reguła, klucz) czas
+    traktowany jest jako kolejna obserwacja z rozkładu logarytmów czasów z okna wcześniejszych przebiegów
+    (jednostronny test t dla nowej obserwacji: t = (x - średnia) / (s * sqrt(1 + 1/n)), n - 1 stopni swobody).
+    Spowolnienie to p < alfa i wzrost względem mediany co najmniej min_wzrost. Porównywane są tylko wpisy z tym samym
+    trybem (wykonawca zadań albo osobny proces) - czasy i pamięć obu trybów nie są porównywalne.
+
+    :param df: Historia (wczytaj_historie)
+    :param uruchomienie: Porównywany przebieg (domyślnie ostatni)
+    :param okno: Liczba wcześniejszych przebiegów, z którymi porównujemy
+    :param alfa: Poziom istotności
+    :param min_wzrost: Minimalny względny wzrost czasu
+    :return: df z wierszem na (regula, klucz): tryb, n_bazowe, czas_bazowy (mediana), czas, zmiana_proc, p,
+             pamiec_mb, pamiec_bazowa, spowolnienie
+    """
+    import numpy as np
+    import pandas as pd
+    from scipy import stats
+
+    ok = df[df["status"] == "ok"]
+    kolejnosc = ok.groupby("uruchomienie", sort=False)["start"].min().sort_values()
+    if uruchomienie is None:
+        if kolejnosc.empty:
+            return pd.DataFrame()
+        uruchomienie = kolejnosc.index[-1]
+
+    if uruchomienie not in kolejnosc.index:
+        raise ValueError(f"Brak zakończonego przebiegu {uruchomienie} w historii")
+
+    poprzednie = kolejnosc.index[:kolejnosc.index.get_loc(uruchomienie)][-okno:]
+    biezacy = ok[ok["uruchomienie"] == uruchomienie].groupby(["regula", "klucz"]).last()
+    bazowe = ok[ok["uruchomienie"].isin(poprzednie)].groupby(["regula", "klucz", "tryb"])
+
+    wiersze = []
+    for (regula, klucz), wpis in biezacy.iterrows():
+        grupa = (regula, klucz, wpis["tryb"])
+        proby = bazowe.get_group(grupa) if grupa in bazowe.groups else ok.iloc[:0]
+        czasy = proby["czas_s"].to_numpy(dtype=float)
+        n = len(czasy)
+        mediana = float(np.median(czasy)) if n else math.nan
+
+        p = math.nan
+        if n >= 2:
+            logi = np.log(np.maximum(czasy, 1e-3))
+            #Odchylenie co najmniej 1% - przy identycznych czasach każdy wzrost byłby "istotny"
+            s = max(float(logi.std(ddof=1)), 0.01)
+            t = (math.log(max(wpis["czas_s"], 1e-3)) - logi.mean()) / (s * math.sqrt(1 + 1 / n))
+            p = float(stats.t.sf(t, n - 1))
+
+        zmiana = wpis["czas_s"] / mediana - 1 if n and mediana > 0 else math.nan
+        wiersze.append({
+            "regula": regula,
+            "klucz": klucz,
+            "tryb": wpis["tryb"],
+            "n_bazowe": n,
+            "czas_bazowy": round(mediana, 3),
+            "czas": wpis["czas_s"],
+            "zmiana_proc": round(100 * zmiana, 1),
+            "p": round(p, 4),
+            "pamiec_mb": wpis["pamiec_mb"],
+            "pamiec_bazowa": float(proby["pamiec_mb"].median()) if n else math.nan,
+            "spowolnienie": bool(p < alfa and zmiana >= min_wzrost),
+        })
+
+    return pd.DataFrame(wiersze)
+
+
+def podsumuj_przebiegi(df: Any) -> Any:
+    """
+    Funkcja zestawia przebiegi: początek, liczba zadań, błędy, łączny czas reguł, bajty HTTP i trafienia cache
+
+    :param df: Historia (wczytaj_historie)
+    :return: df z wierszem na przebieg (od najstarszego)
+    """
+    grupy = df.groupby("uruchomienie", sort=False)
+    wynik = grupy.agg(
+        start=("start", "min"),
+        tryb=("tryb", "first"),
+        zadania=("regula", "size"),
+        bledy=("status", lambda s: int((s != "ok").sum())),
+        czas_s=("czas_s", "sum"),
+        pamiec_mb=("pamiec_mb", "max"),
+        http_bajty=("http_bajty", "sum"),
+        cache_trafienia=("cache_trafienia", "sum"),
+        cache_chybienia=("cache_chybienia", "sum"),
+    )
+    wynik["czas_s"] = wynik["czas_s"].round(1)
+    return wynik.sort_values("start").reset_index()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--baza", default=os.environ.get("HISTORIA_BAZA", BAZA))
+    polecenia = parser.add_subparsers(dest="polecenie", required=True)
+
+    p = polecenia.add_parser("porownaj", help="Spowolnienia reguł w przebiegu względem wcześniejszych przebiegów")
+    p.add_argument("--uruchomienie", default=None, help="Identyfikator przebiegu (domyślnie ostatni)")
+    p.add_argument("--okno", type=int, default=OKNO)
+    p.add_argument("--alfa", type=float, default=ALFA)
+    p.add_argument("--min-wzrost", type=float, default=MIN_WZROST)
+    p.add_argument("--kod-bledu", action="store_true", help="Kod wyjścia 1, jeśli wykryto spowolnienie")
+
+    p = polecenia.add_parser("przebiegi", help="Zestawienie ostatnich przebiegów")
+    p.add_argument("-n", type=int, default=10)
+
+    p = polecenia.add_parser("regula", help="Historia jednej reguły")
+    p.add_argument("nazwa")
+    p.add_argument("-n", type=int, default=20)
+
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.baza):
+        print(f"Brak historii uruchomień: {args.baza}")
+        return 0
+
+    df = wczytaj_historie(args.baza)
+
+    if args.polecenie == "porownaj":
+        wynik = porownaj(df, args.uruchomienie, args.okno, args.alfa, args.min_wzrost)
+        if wynik.empty:
+            print("Brak zakończonych przebiegów")
+            return 0
+        print(wynik.to_string(index=False))
+        spowolnione = wynik[wynik["spowolnienie"]]
+        if spowolnione.empty:
+            print("Brak istotnych spowolnień")
+        else:
+            opis = ", ".join(f"{r.regula}[{r.klucz}] +{r.zmiana_proc}%" for r in spowolnione.itertuples())
+            print(f"Istotne spowolnienia: {opis}")
+            return 1 if args.kod_bledu else 0
+    elif args.polecenie == "przebiegi":
+        print(podsumuj_przebiegi(df).tail(args.n).to_string(index=False))
+    elif args.polecenie == "regula":
+        print(df[df["regula"] == args.nazwa].tail(args.n).to_string(index=False))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+import os
+import threading
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any
+
+#----------------------------------------DANE_RAPORTU-------------------------------------------
+
+#Pliki wynikowe potrzebne w raporcie - tylko używane kolumny, z jawnymi typami
+PLIKI = {
+    "exceedance_days": "results/pm25/{year}/exceedance_days.csv",
+    "pubmed_papers": "results/literature/{year}/pubmed_papers.csv",
+    "summary_by_year": "results/literature/{year}/summary_by_year.csv",
+    "top_journals": "results/literature/{year}/top_journals.csv",
+}
+
+KOLUMNY = {
+    "exceedance_days.csv": {"Miejscowosc_Stacja": "str", "Ilosc dni z przekroczeniem": "int64"},
+    "pubmed_papers.csv": {"title": "str", "ppublish_year": "str"},
+    "summary_by_year.csv": {"query": "str", "n_publications": "int64"},
+    "top_journals.csv": {"journal": "str", "num_publications": "int64"},
+}
+
+#Kolumny liczbowe z możliwymi brakami i wartościami nieliczbowymi (rok z PubDate, np. "2019 Spring") -
+#czytane jako tekst, a wartości nieliczbowe zamieniane na brak
+KOLUMNY_LICZBOWE = {
+    "pubmed_papers.csv": ["ppublish_year"],
+}
+
+_pamiec = {}
+_blokada = threading.Lock()
+
+
+def wczytaj_csv(path: str) -> pd.DataFrame:
+    """
+    Funkcja wczytuje plik wynikowy, zapamiętując go (klucz: ścieżka i czas modyfikacji pliku).
+    Kolejne wywołania dla niezmienionego pliku nie czytają go z dysku ponownie.
+    Zwracany df jest współdzielony - nie należy go modyfikować w miejscu.
+
+    :param path: Ścieżka pliku
+    :return: df z danymi z pliku
+    """
+    sciezka = os.path.abspath(path)
+    klucz = (sciezka, os.stat(sciezka).st_mtime_ns)
+
+    with _blokada:
+        if klucz in _pamiec:
+            return _pamiec[klucz]
+
+    typy = KOLUMNY.get(os.path.basename(sciezka))
+    if typy is None:
+        df = pd.read_csv(sciezka)
+    else:
+        df = pd.read_csv(sciezka, usecols=list(typy), dtype=typy)
+    for kolumna in KOLUMNY_LICZBOWE.get(os.path.basename(sciezka), []):
+        df[kolumna] = pd.to_numeric(df[kolumna], errors="coerce").astype("Int64")
+
+    with _blokada:
+        #Starsze wersje tego samego pliku nie będą już potrzebne
+        for stary in [k for k in _pamiec if k[0] == sciezka]:
+            del _pamiec[stary]
+        _pamiec[klucz] = df
+
+    return df
+
+
+def wczytaj_pliki(zadania: list[tuple[str, int]]) -> dict[str, dict[int, pd.DataFrame]]:
+    """
+    Funkcja wczytuje równolegle (wątki) pliki wynikowe dla podanych par (nazwa pliku z PLIKI, rok)
+
+    :param zadania: Lista par (nazwa pliku, rok)
+    :return: Słownik nazwa pliku -> (rok -> df)
+    """
+    with ThreadPoolExecutor(max_workers=min(8, len(zadania)) or 1) as pula:
+        dfs = list(pula.map(lambda z: wczytaj_csv(PLIKI[z[0]].format(year=z[1])), zadania))
+
+    dane = {}
+    for (nazwa, year), df in zip(zadania, dfs):
+        dane.setdefault(nazwa, {})[year] = df
+
+    return dane
+
+#----------------------------------------INDEKS_STACJI-------------------------------------------
+
+#Indeks stacji tworzony przez scripts/PM2,5/pm25_stacje.py - mapa bitowa lat z danymi dla każdej stacji
+INDEKS_STACJI = "results/pm25/stacje_indeks.parquet"
+
+
+def stacje_wspolne(years: list[int], path: str = INDEKS_STACJI) -> list[str] | None:
+    """
+    Funkcja wybiera z indeksu stacje mające dane we wszystkich podanych latach (pm25_stacje.wspolne_stacje)
+
+    :param years: Lata raportu
+    :param path: Ścieżka indeksu stacji
+    :return: Lista stacji albo "None" jeśli indeksu nie ma
+    """
+    if not os.path.exists(path):
+        return None
+
+    import pm25_stacje as st
+
+    return st.wspolne_stacje(st.wczytaj_indeks(path), years)
+
+#----------------------------------------INDEKS_TYTULOW-------------------------------------------
+
+#Indeks tytułów tworzony przez scripts/PubMed/pubmed_fetch.py - wyszukiwanie z modułu pubmed_indeks.py
+INDEKS_TYTULOW = "results/literature/{year}/title_index.npz"
+
+
+def najtrafniejsze_tytuly(year: int, zapytanie: str, n: int) -> pd.DataFrame | None:
+    """
+    Funkcja zwraca n tytułów z danego roku najlepiej pasujących do zapytania (indeks tytułów, ocena BM25)
+
+    :param year: Rok wyników
+    :param zapytanie: Zapytanie w składni PubMed (jak w pubmed.yaml)
+    :param n: Liczba tytułów
+    :return: df z kolumnami PMID, title, score albo "None" jeśli indeksu nie ma
+    """
+    path = INDEKS_TYTULOW.format(year=year)
+    if not os.path.exists(path):
+        return None
+
+    indeks = wczytaj_indeks(path, os.stat(path).st_mtime_ns)
+    import pubmed_indeks as ind
+
+    try:
+        return indeks.najtrafniejsze(zapytanie, n)
+    except ValueError:
+        #Składnia PubMed, której indeks nie obsługuje - szukamy dowolnego ze słów zapytania
+        slowa = ind.tokeny(zapytanie)
+        if not slowa:
+            return pd.DataFrame(columns=["PMID", "title", "score"])
+        return indeks.najtrafniejsze(" OR ".join(slowa), n)
+
+
+@lru_cache(maxsize=16)
+def wczytaj_indeks(path: str, mtime_ns: int) -> Any:
+    #Indeks wczytywany raz na plik (i jego wersję) - sekcje raportu pytają go wielokrotnie
+    import pubmed_indeks as ind
+
+    return ind.IndeksTytulow(path)
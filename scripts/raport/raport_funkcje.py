@@ -1,7 +1,12 @@
+import os
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.figure import Figure
 import numpy as np
+import raport_dane as rd
+from typing import TYPE_CHECKING, Any
+
+#matplotlib importowany dopiero przy rysowaniu - tekstowy backend raportu go nie potrzebuje
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
 
 #----------------------------------------BAZA-------------------------------------------
 
@@ -25,11 +30,8 @@ def combine_results(years: list[str], path: str) -> pd.DataFrame:
     :return: df z połączonymi wynikami
     """
 
-    dfs = []
-    for year in years:
-        df = pd.read_csv(path.format(year=year))
-        df["year"] = year
-        dfs.append(df)
+    #Pliki są czytane raz (raport_dane zapamiętuje je) - tu tylko dokładamy kolumnę z rokiem
+    dfs = [rd.wczytaj_csv(path.format(year=year)).assign(year=year) for year in years]
 
     return pd.concat(dfs, ignore_index=True)
 
@@ -42,38 +44,102 @@ def combine_exceedence_days(years: list[str]) -> pd.DataFrame:
     :param years: Lata z których pobieramy dane do złączenia
     :return: Tabela wynikowa
     """
-    df_polaczone = combine_results(years, "results/pm25/{year}/exceedance_days.csv")
+    return zestaw_dni_przekroczen({year: dni_przekroczen_roku(year) for year in years})
 
-    df_wynik = (
-        df_polaczone
-        .pivot(
-            index="Miejscowosc_Stacja",
-            columns="year",
-            values="Ilosc dni z przekroczeniem"
-        )
-        .reset_index()
-        .dropna()
+
+def dni_przekroczen_roku(year: str) -> dict[str, list]:
+    """
+    Funkcja zwraca liczbę dni z przekroczeniem dla stacji z jednego roku (fragment tabeli przekroczeń)
+
+    :param year: Rok danych
+    :return: Słownik z listami stacji i liczb dni
+    """
+    df = rd.wczytaj_csv(f"results/pm25/{year}/exceedance_days.csv")
+
+    return {"stacje": df["Miejscowosc_Stacja"].tolist(), "dni": df["Ilosc dni z przekroczeniem"].tolist()}
+
+
+def zestaw_dni_przekroczen(fragmenty: dict[str, dict[str, list]]) -> pd.DataFrame:
+    """
+    Funkcja składa tabele przekroczeń z fragmentów poszczególnych lat (dni_przekroczen_roku)
+
+    :param fragmenty: Słownik rok -> fragment
+    :return: Tabela wynikowa
+    """
+    df_pivot = (
+        pd.DataFrame({year: pd.Series(f["dni"], index=f["stacje"], dtype="int64") for year, f in fragmenty.items()})
+        .sort_index()
+        .rename_axis(index="Miejscowosc_Stacja", columns="year")
     )
+    df_pivot = df_pivot[sorted(df_pivot.columns)]
 
-    return df_wynik
+    #Stacje wspólne dla wszystkich lat bierzemy z indeksu stacji, bez indeksu - odrzucamy wiersze z brakami
+    stacje = rd.stacje_wspolne(list(fragmenty))
+    if stacje is None:
+        return df_pivot.reset_index().dropna()
+
+    return df_pivot.loc[df_pivot.index.intersection(stacje)].reset_index()
 
 #---------------------------------------LITERATURA----------------------------------------
 
-def combine_literature(years: list[str]) -> pd.DataFrame:
+def zapytania_roku(year: str) -> list[str]:
+    """
+    Funkcja zwraca zapytania, dla których pobrano publikacje w danym roku (z summary_by_year.csv)
+
+    :param year: Rok wyników
+    :return: Lista zapytań
     """
-    Funkcja wybiera pierwsze 10 tytułów publikacji z każdego roku, i tworzy tabele z nimi
+    return rd.wczytaj_csv(f"results/literature/{year}/summary_by_year.csv")["query"].drop_duplicates().tolist()
+
+
+def combine_literature(years: list[str], n: int = 3) -> pd.DataFrame:
+    """
+    Funkcja wybiera z każdego roku n publikacji najlepiej pasujących do każdego zapytania (indeks tytułów),
+    a bez indeksu - pierwsze 10 tytułów publikacji z każdego roku, i tworzy tabele z nimi
 
     :param years: Zakres lat
-    :return: df z tytułami  i rokiem z którego pochodzi dopasowanie
+    :param n: Liczba tytułów dla zapytania z danego roku
+    :return: df z tytułami, rokiem z którego pochodzi dopasowanie (i zapytaniem)
     """
+    return zestaw_literatury({year: literatura_roku(year, n) for year in years})
 
-    df_polaczone = combine_results(years, "results/literature/{year}/pubmed_papers.csv")
 
-    df_wynik = df_polaczone.groupby("year").head(10).reset_index(drop=True)
+def literatura_roku(year: str, n: int = 3) -> dict[str, Any]:
+    """
+    Funkcja wybiera publikacje z jednego roku (fragment tabeli literatury): n najlepiej pasujących do każdego
+    zapytania, jeśli rok ma indeks tytułów, oraz pierwsze 10 tytułów
 
-    df_wynik = df_wynik[["title", "year"]]
+    :param year: Rok wyników
+    :param n: Liczba tytułów dla zapytania
+    :return: Słownik z listą dopasowań (albo "None" bez indeksu) i listą pierwszych tytułów
+    """
+    df_papers = rd.wczytaj_csv(f"results/literature/{year}/pubmed_papers.csv")
+    fragment = {"indeks": None, "pierwsze": df_papers["title"].head(10).tolist()}
 
-    return df_wynik
+    if os.path.exists(rd.INDEKS_TYTULOW.format(year=year)):
+        fragment["indeks"] = [
+            {"title": title, "query": zapytanie}
+            for zapytanie in zapytania_roku(year)
+            for title in rd.najtrafniejsze_tytuly(year, zapytanie, n)["title"]
+        ]
+
+    return fragment
+
+
+def zestaw_literatury(fragmenty: dict[str, dict[str, Any]]) -> pd.DataFrame:
+    """
+    Funkcja składa tabele literatury z fragmentów poszczególnych lat (literatura_roku)
+
+    :param fragmenty: Słownik rok -> fragment
+    :return: df z tytułami, rokiem z którego pochodzi dopasowanie (i zapytaniem)
+    """
+    #Bez indeksu tytułów któregoś roku - tabela jak dotąd, pierwsze tytuły z każdego roku
+    if not all(f["indeks"] is not None for f in fragmenty.values()):
+        rows = [{"title": title, "year": year} for year, f in fragmenty.items() for title in f["pierwsze"]]
+        return pd.DataFrame(rows, columns=["title", "year"])
+
+    rows = [{"title": r["title"], "year": year, "query": r["query"]} for year, f in fragmenty.items() for r in f["indeks"]]
+    return pd.DataFrame(rows, columns=["title", "year", "query"])
 
 #-------------------------------DOPASOWANIA_DO_ZAPYTANIA----------------------------------
 
@@ -101,16 +167,28 @@ def combine_summary_by_year(years: list[str]) -> pd.DataFrame:
 
 #----------------------------------TREND_PUBLIKACJI-------------------------------------
 
-def trend_ppublish(years: list[str]) -> Figure:
+def trend_dane(years: list[str]) -> pd.Series:
+    """
+    Funkcja liczy liczbę publikacji printów w kolejnych latach wydania
+
+    :param years: Zakres lat danych
+    :return: Seria rok wydania -> liczba publikacji
+    """
+    df_polaczone = combine_results(years, "results/literature/{year}/pubmed_papers.csv")
+
+    return df_polaczone.groupby("ppublish_year").size()
+
+
+def trend_ppublish(years: list[str]) -> "Figure":
     """
     Funckja tworzy wykres trendu liczby publikacji printów z w danych latach
 
     :param years: Zakres lat danych
     :return: Wykres z linią trendu publikacji
     """
-    df_polaczone = combine_results(years, "results/literature/{year}/pubmed_papers.csv")
+    import matplotlib.pyplot as plt
 
-    df_trend = df_polaczone.groupby("ppublish_year").size()
+    df_trend = trend_dane(years)
 
     fig, ax = plt.subplots(figsize=(10, 6))
 
@@ -128,6 +206,44 @@ def trend_ppublish(years: list[str]) -> Figure:
 
     return fig
 
+def sparkline_svg(wartosci: pd.Series, szer: int = 240, wys: int = 48) -> str:
+    """
+    Funkcja tworzy mały wykres liniowy (sparkline) jako napis SVG, który można wstawić bezpośrednio do markdown.
+    Braki (NaN) przerywają linię i nie mają punktu.
+
+    :param wartosci: Seria z wartościami (indeks - oś x)
+    :param szer: Szerokość obrazka w pikselach
+    :param wys: Wysokość obrazka w pikselach
+    :return: Kod SVG
+    """
+    y = wartosci.to_numpy(dtype=float)
+    margines = 4
+
+    if len(y) > 1:
+        x = np.linspace(margines, szer - margines, len(y))
+    else:
+        x = np.array([szer / 2])
+
+    jest = ~np.isnan(y)
+    dol = y[jest].min() if jest.any() else 0
+    zakres = y[jest].max() - dol if jest.any() else 0
+    skala = (y - dol) / zakres if zakres else np.full(len(y), 0.5)
+    y_px = wys - margines - skala * (wys - 2 * margines)
+
+    #Osobna linia dla każdego ciągu wartości bez braków
+    nr_ciagu = np.cumsum(~jest)[jest]
+    x, y_px = x[jest], y_px[jest]
+    linie = []
+    for n in np.unique(nr_ciagu):
+        punkty = " ".join(f"{a:.1f},{b:.1f}" for a, b in zip(x[nr_ciagu == n], y_px[nr_ciagu == n]))
+        linie.append(f'<polyline points="{punkty}" fill="none" stroke="#2b7bba" stroke-width="2"/>')
+    kropki = "".join(f'<circle cx="{a:.1f}" cy="{b:.1f}" r="2" fill="#2b7bba"/>' for a, b in zip(x, y_px))
+
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{szer}" height="{wys}" viewBox="0 0 {szer} {wys}">'
+        f'{"".join(linie)}{kropki}</svg>'
+    )
+
 #----------------------------------TOP_CZASOPISMA---------------------------------------
 
 def combine_top_journals(years: list[str]) -> pd.DataFrame:
@@ -166,14 +282,39 @@ def combine_top_journals(years: list[str]) -> pd.DataFrame:
 
 #----------------------------------TYTUŁY--------------------------------------------
 
-def example_titles(years: list[str], n: int) -> Figure:
+def przykladowe_tytuly(years: list[str], n: int) -> dict[str, list[str]]:
+    """
+    Funkcja wybiera przykładowe tytuły dla każdego roku z zakresu - najlepiej pasujące do dowolnego z zapytań
+    (indeks tytułów), a bez indeksu pierwsze z listy
+
+    :param years: Zakres lat
+    :param n: Maksymalna liczba tytułów dla danego roku
+    :return: Słownik rok -> lista tytułów
+    """
+    tytuly = {}
+    for year in years:
+        zapytania = zapytania_roku(year)
+        df_tytuly = rd.najtrafniejsze_tytuly(year, " OR ".join(f"({z})" for z in zapytania), n) if zapytania else None
+
+        if df_tytuly is None:
+            df_papers = rd.wczytaj_csv(f"results/literature/{year}/pubmed_papers.csv")
+            tytuly[year] = df_papers["title"].head(n).tolist()
+        else:
+            tytuly[year] = df_tytuly["title"].tolist()
+
+    return tytuly
+
+
+def example_titles(years: list[str], n: int, tytuly: dict[str, list[str]] | None = None) -> "Figure":
     """
     Funkcja tworzy obrazek z przykładowymi tytułami (pierwsze z listy) dla każdego roku z zakresu
 
     :param years: Zakres lat
     :param n: Maksymalna liczba wyświetlanych tytułów dla danego roku
+    :param tytuly: Gotowe tytuły (rok -> lista) - domyślnie wybierane przez przykladowe_tytuly
     :return: Obrazek z tytułami
     """
+    import matplotlib.pyplot as plt
 
     fig, ax = plt.subplots(figsize=(10, 2+2*len(years)))
     ax.axis('off')
@@ -181,10 +322,10 @@ def example_titles(years: list[str], n: int) -> Figure:
     y = 1.0
     line_height = 0.08
 
-    df_polaczone = combine_results(years, "results/literature/{year}/pubmed_papers.csv")
+    if tytuly is None:
+        tytuly = przykladowe_tytuly(years, n)
 
     for year in years:
-        df_year = df_polaczone[df_polaczone["year"] == year].head(n)
 
         ax.text(
             0.01, y,
@@ -195,7 +336,7 @@ def example_titles(years: list[str], n: int) -> Figure:
         )
         y -= line_height
 
-        for i, title in enumerate(df_year["title"], start=1):
+        for i, title in enumerate(tytuly[year], start=1):
             ax.text(
                 0.03, y,
                 f'{i}) {title}',
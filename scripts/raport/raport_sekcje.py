@@ -0,0 +1,462 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Callable
+
+import raport_dane as rd
+
+#Raport składany z sekcji. Każda sekcja ma skrót (hash) swoich danych wejściowych, parametrów i kodu -
+#gotowe fragmenty markdown i rysunki trzymane są w katalogu cache i liczone ponownie tylko gdy skrót się zmieni.
+
+FIG_PATH = "results/report_misc"
+CACHE_DIR = "results/report_misc/cache"
+
+#Zmiana kodu sekcji/funkcji raportu też unieważnia cache
+PLIKI_KODU = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "raport_funkcje.py"),
+    os.path.abspath(__file__),
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "PubMed", "pubmed_indeks.py"),
+]
+
+#----------------------------------------SEKCJE-------------------------------------------
+
+def sekcja_przekroczenia(years: list[int], fig_path: str, fragmenty: dict[int, Any]) -> tuple[str, dict[str, Any]]:
+    """
+    Sekcja (1) Tabela dni z przekroczeniem normy PM2.5 dla stacji
+
+    :param years: Lata raportu
+    :param fig_path: Katalog z rysunkami raportu
+    :param fragmenty: Fragmenty lat (rok -> fun.dni_przekroczen_roku)
+    :return: Fragment markdown oraz słownik nazwa pliku -> rysunek
+    """
+    import raport_funkcje as fun
+
+    df_ex_days = fun.zestaw_dni_przekroczen(fragmenty)
+
+    tekst = (
+        "## Zestawienie exceedance_days dla wszystkich lat\n\n"
+        "Dla każdej stacji w kolumnie oznaczonej odpowiednim rokiem, przedstawiono liczbę dni w których wystąpiło przekroczenie średniej dobowej normy stężenia PM2.5 (15 µg/m³).\n\n"
+        "Zostały przedstwione tylko dane stacji dla których istniały pomiary z całego zakresu lat\n\n"
+        f"{fun.df_to_markdown(df_ex_days)}\n\n"
+    )
+    return tekst, {}
+
+
+def sekcja_literatura(years: list[int], fig_path: str, fragmenty: dict[int, Any]) -> tuple[str, dict[str, Any]]:
+    """
+    Sekcja (2) Przykładowe publikacje z każdego roku
+
+    :param years: Lata raportu
+    :param fig_path: Katalog z rysunkami raportu
+    :param fragmenty: Fragmenty lat (rok -> fun.literatura_roku)
+    :return: Fragment markdown oraz słownik nazwa pliku -> rysunek
+    """
+    import raport_funkcje as fun
+
+    df_literature = fun.zestaw_literatury(fragmenty)
+
+    tekst = (
+        "## Literatura\n\n"
+        "Publikacje z każdego roku najlepiej pasujące do zapytań (ocena BM25 słów zapytania w tytule, indeks tytułów "
+        "z `title_index.npz`; bez indeksu - pierwsze 10 z każdego roku)\n\n"
+        f"{fun.df_to_markdown(df_literature)}\n\n"
+    )
+    return tekst, {}
+
+
+def sekcja_zapytania(years: list[int], fig_path: str) -> tuple[str, dict[str, Any]]:
+    """
+    Sekcja (3) Liczba publikacji znalezionych dla zapytań
+
+    :param years: Lata raportu
+    :param fig_path: Katalog z rysunkami raportu
+    :return: Fragment markdown oraz słownik nazwa pliku -> rysunek
+    """
+    import raport_funkcje as fun
+
+    df_query_hits = fun.combine_summary_by_year(years)
+
+    tekst = (
+        "## Liczba publikacji znalezionych dla zadanych zapytań\n\n"
+        "Dla każdego zapytania, liczba znalezionych artykułow opublikowanych w danym roku\n\n"
+        f"{fun.df_to_markdown(df_query_hits)}\n\n"
+    )
+    return tekst, {}
+
+
+def sekcja_trend(years: list[int], fig_path: str) -> tuple[str, dict[str, Any]]:
+    """
+    Sekcja (4) Wykres trendu liczby publikacji printów
+
+    :param years: Lata raportu
+    :param fig_path: Katalog z rysunkami raportu
+    :return: Fragment markdown oraz słownik nazwa pliku -> rysunek
+    """
+    import raport_funkcje as fun
+
+    fig_trend = fun.trend_ppublish(years)
+
+    tekst = (
+        "## Trend liczby publikacji printów\n\n"
+        f"![Linia trendu publikacji]({fig_path}/trend_line.png)\n"
+    )
+    return tekst, {"trend_line.png": fig_trend}
+
+
+def sekcja_czasopisma(years: list[int], fig_path: str) -> tuple[str, dict[str, Any]]:
+    """
+    Sekcja (5) Czasopisma z największą liczbą publikacji
+
+    :param years: Lata raportu
+    :param fig_path: Katalog z rysunkami raportu
+    :return: Fragment markdown oraz słownik nazwa pliku -> rysunek
+    """
+    import raport_funkcje as fun
+
+    df_top_journals = fun.combine_top_journals(years)
+
+    tekst = (
+        "## Czasopisma z top 10 ilością publikacji w danych latach\n"
+        "Dla każdego czasopisma, przedstawiona: łączna liczba artykułów, liczba artykułów w poszczególnych latach\n\n"
+        f"{fun.df_to_markdown(df_top_journals)}\n\n"
+    )
+    return tekst, {}
+
+
+def sekcja_tytuly(years: list[int], fig_path: str, fragmenty: dict[int, Any]) -> tuple[str, dict[str, Any]]:
+    """
+    Sekcja (6) Obrazek z przykładowymi tytułami
+
+    :param years: Lata raportu
+    :param fig_path: Katalog z rysunkami raportu
+    :param fragmenty: Fragmenty lat (rok -> lista tytułów)
+    :return: Fragment markdown oraz słownik nazwa pliku -> rysunek
+    """
+    import raport_funkcje as fun
+
+    fig_titles = fun.example_titles(years, LICZBA_TYTULOW, fragmenty)
+
+    tekst = (
+        "## Przykładowe tytuły znalezionych publikacji\n\n"
+        f"![Przykładowe tytuły publikacji]({fig_path}/example_titles.png)\n"
+    )
+    return tekst, {"example_titles.png": fig_titles}
+
+
+#----------------------------------------SEKCJE_TEKSTOWE-------------------------------------------
+#Wersje sekcji (4) i (6) bez rysunków (backend "tekst") - markdown i SVG wstawione w tekst, bez importu matplotlib
+
+def sekcja_trend_tekst(years: list[int], fig_path: str) -> tuple[str, dict[str, Any]]:
+    """
+    Sekcja (4) Trend liczby publikacji printów jako wykres SVG w tekście i tabela
+
+    :param years: Lata raportu
+    :param fig_path: Katalog z rysunkami raportu
+    :return: Fragment markdown oraz słownik nazwa pliku -> rysunek (pusty)
+    """
+    import raport_funkcje as fun
+
+    df_trend = fun.trend_dane(years)
+    df_tabela = df_trend.rename("Liczba publikacji").rename_axis("Rok").reset_index()
+
+    tekst = (
+        "## Trend liczby publikacji printów\n\n"
+        f"{fun.sparkline_svg(df_trend)}\n\n"
+        f"{fun.df_to_markdown(df_tabela)}\n\n"
+    )
+    return tekst, {}
+
+
+def sekcja_tytuly_tekst(years: list[int], fig_path: str, fragmenty: dict[int, Any]) -> tuple[str, dict[str, Any]]:
+    """
+    Sekcja (6) Przykładowe tytuły jako lista markdown
+
+    :param years: Lata raportu
+    :param fig_path: Katalog z rysunkami raportu
+    :param fragmenty: Fragmenty lat (rok -> lista tytułów)
+    :return: Fragment markdown oraz słownik nazwa pliku -> rysunek (pusty)
+    """
+    czesci = ["## Przykładowe tytuły znalezionych publikacji\n\n"]
+    for year in years:
+        czesci.append(f"**Dla {year} roku:**\n\n")
+        czesci.extend(f"{i}. {title}\n" for i, title in enumerate(fragmenty[year], start=1))
+        czesci.append("\n")
+
+    return "".join(czesci), {}
+
+
+#----------------------------------------FRAGMENTY_ROCZNE-------------------------------------------
+#Części sekcji (1), (2) i (6) liczone dla jednego roku - wspólne dla obu backendów
+
+LICZBA_TYTULOW = 2
+
+
+def fragment_przekroczenia(year: int) -> dict[str, list]:
+    import raport_funkcje as fun
+    return fun.dni_przekroczen_roku(year)
+
+
+def fragment_literatura(year: int) -> dict[str, Any]:
+    import raport_funkcje as fun
+    return fun.literatura_roku(year)
+
+
+def fragment_tytuly(year: int) -> list[str]:
+    import raport_funkcje as fun
+    return fun.przykladowe_tytuly([year], LICZBA_TYTULOW)[year]
+
+
+#Nazwa sekcji, pliki wynikowe z których korzysta (klucze raport_dane.PLIKI), funkcja tworząca sekcje
+SEKCJE: list[tuple[str, list[str], Callable]] = [
+    ("przekroczenia", ["exceedance_days"], sekcja_przekroczenia),
+    ("literatura", ["pubmed_papers", "summary_by_year"], sekcja_literatura),
+    ("zapytania", ["summary_by_year"], sekcja_zapytania),
+    ("trend", ["pubmed_papers"], sekcja_trend),
+    ("czasopisma", ["top_journals"], sekcja_czasopisma),
+    ("tytuly", ["pubmed_papers", "summary_by_year"], sekcja_tytuly),
+]
+
+#Sekcje składane z fragmentów liczonych osobno dla każdego roku (funkcja(rok) -> dane JSON). Fragmenty mają
+#własne wpisy w cache, więc po zmianie listy lat liczone są tylko fragmenty nowych lat, a sekcja jest tylko sklejana.
+FRAGMENTY_ROCZNE: dict[str, Callable] = {
+    "przekroczenia": fragment_przekroczenia,
+    "literatura": fragment_literatura,
+    "tytuly": fragment_tytuly,
+}
+
+#Backend "tekst" podmienia sekcje z rysunkami na ich wersje tekstowe
+BACKENDY = ["matplotlib", "tekst"]
+SEKCJE_TEKSTOWE: dict[str, Callable] = {
+    "trend": sekcja_trend_tekst,
+    "tytuly": sekcja_tytuly_tekst,
+}
+
+#----------------------------------------CACHE-------------------------------------------
+
+#Pliki, z których sekcja korzysta tylko jeśli istnieją ({year} - osobny plik dla każdego roku)
+PLIKI_OPCJONALNE = {
+    "przekroczenia": [rd.INDEKS_STACJI],
+    "literatura": [rd.INDEKS_TYTULOW],
+    "tytuly": [rd.INDEKS_TYTULOW],
+}
+
+
+#Skróty plików w bieżącym procesie (klucz: ścieżka, rozmiar i czas modyfikacji) - skrót sekcji i skróty fragmentów
+#lat korzystają z tych samych plików
+_skroty_plikow = {}
+
+
+def skrot_pliku(path: str) -> str:
+    """
+    Funkcja liczy skrót zawartości pliku
+
+    :param path: Ścieżka pliku
+    :return: Skrót sha256 (hex)
+    """
+    stat = os.stat(path)
+    klucz = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if klucz in _skroty_plikow:
+        return _skroty_plikow[klucz]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for kawalek in iter(lambda: f.read(1 << 20), b""):
+            h.update(kawalek)
+
+    _skroty_plikow[klucz] = h.hexdigest()
+    return _skroty_plikow[klucz]
+
+
+def skrot_plikow_roku(nazwa: str, pliki: list[str], year: int, h: Any) -> None:
+    #Pliki wynikowe sekcji z danego roku i jego pliki opcjonalne (bez plików wspólnych dla wszystkich lat)
+    for plik in pliki:
+        h.update(skrot_pliku(rd.PLIKI[plik].format(year=year)).encode("utf-8"))
+
+    for path in PLIKI_OPCJONALNE.get(nazwa, []):
+        if "{year}" in path:
+            path = path.format(year=year)
+            h.update((skrot_pliku(path) if os.path.exists(path) else "brak").encode("utf-8"))
+
+
+def skrot_sekcji(nazwa: str, pliki: list[str], years: list[int], parametry: dict[str, Any]) -> str:
+    """
+    Funkcja liczy skrót sekcji z zawartości plików wejściowych, parametrów i kodu raportu
+
+    :param nazwa: Nazwa sekcji
+    :param pliki: Klucze plików wynikowych z raport_dane.PLIKI
+    :param years: Lata raportu
+    :param parametry: Dodatkowe parametry wpływające na wynik
+    :return: Skrót sha256 (hex)
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps({"sekcja": nazwa, "lata": years, "parametry": parametry}, sort_keys=True).encode("utf-8"))
+
+    for path in PLIKI_KODU:
+        h.update(skrot_pliku(path).encode("utf-8"))
+
+    for year in years:
+        skrot_plikow_roku(nazwa, pliki, year, h)
+
+    for path in PLIKI_OPCJONALNE.get(nazwa, []):
+        if "{year}" not in path:
+            h.update((skrot_pliku(path) if os.path.exists(path) else "brak").encode("utf-8"))
+
+    return h.hexdigest()
+
+
+def skrot_fragmentu(nazwa: str, pliki: list[str], year: int) -> str:
+    """
+    Funkcja liczy skrót fragmentu sekcji dla jednego roku - z plików tego roku i kodu raportu
+
+    :param nazwa: Nazwa sekcji
+    :param pliki: Klucze plików wynikowych z raport_dane.PLIKI
+    :param year: Rok fragmentu
+    :return: Skrót sha256 (hex)
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps({"fragment": nazwa, "rok": year}).encode("utf-8"))
+
+    for path in PLIKI_KODU:
+        h.update(skrot_pliku(path).encode("utf-8"))
+
+    skrot_plikow_roku(nazwa, pliki, year, h)
+
+    return h.hexdigest()
+
+
+def czy_w_cache(cache_dir: str, nazwa: str, skrot: str) -> bool:
+    """
+    Funkcja sprawdza czy w cache jest fragment sekcji o danym skrócie wraz ze wszystkimi rysunkami
+
+    :param cache_dir: Katalog z zapisanymi fragmentami i rysunkami
+    :param nazwa: Nazwa sekcji
+    :param skrot: Skrót sekcji
+    :return: "True" jeśli sekcji nie trzeba liczyć od nowa
+    """
+    path = os.path.join(cache_dir, f"{nazwa}_{skrot}.json")
+    if not os.path.exists(path):
+        return False
+
+    with open(path, encoding="utf-8") as f:
+        rysunki = json.load(f)["rysunki"]
+
+    return all(os.path.exists(os.path.join(cache_dir, f"{nazwa}_{skrot}_{r}")) for r in rysunki)
+
+
+def wyczysc_cache(cache_dir: str, aktualne: set[str]) -> int:
+    """
+    Funkcja usuwa z cache pliki, które nie należą do bieżącego raportu (stare skróty sekcji i fragmentów)
+
+    :param cache_dir: Katalog z zapisanymi fragmentami i rysunkami
+    :param aktualne: Nazwy plików do zachowania
+    :return: Liczba usuniętych plików
+    """
+    usuniete = 0
+    for plik in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, plik)
+        if plik not in aktualne and os.path.isfile(path):
+            os.remove(path)
+            usuniete += 1
+
+    return usuniete
+
+
+def zbuduj_raport(years: list[int], fig_path: str = FIG_PATH, cache_dir: str = CACHE_DIR,
+                  parametry: dict[str, Any] | None = None, backend: str = "matplotlib") -> tuple[str, list[str]]:
+    """
+    Funkcja składa raport z sekcji - aktualne sekcje brane są z cache, pozostałe liczone od nowa i zapisywane do cache.
+    Sekcje z FRAGMENTY_ROCZNE sklejane są z fragmentów lat - od nowa liczone są tylko fragmenty bez wpisu w cache.
+    Na koniec z cache usuwane są wpisy, które nie należą do bieżącego raportu.
+
+    :param years: Lata raportu
+    :param fig_path: Katalog z rysunkami, do którego odwołuje się raport
+    :param cache_dir: Katalog z zapisanymi fragmentami i rysunkami
+    :param parametry: Dodatkowe parametry wpływające na wynik sekcji
+    :param backend: "matplotlib" (rysunki png) albo "tekst" (markdown i SVG, bez matplotlib)
+    :return: Treść raportu oraz lista sekcji, które zostały przeliczone
+    """
+    if backend not in BACKENDY:
+        raise ValueError(f"Nieznany backend raportu: {backend}")
+
+    parametry = {"fig_path": fig_path, **(parametry or {})}
+    os.makedirs(cache_dir, exist_ok=True)
+
+    sekcje = SEKCJE
+    if backend == "tekst":
+        sekcje = [(nazwa, pliki, SEKCJE_TEKSTOWE.get(nazwa, funkcja)) for nazwa, pliki, funkcja in SEKCJE]
+
+    #Backend zmienia tylko sekcje, które mają wersję tekstową - pozostałe zostają w cache po zmianie backendu
+    skroty = {
+        nazwa: skrot_sekcji(nazwa, pliki, years, {**parametry, "backend": backend} if nazwa in SEKCJE_TEKSTOWE else parametry)
+        for nazwa, pliki, _ in sekcje
+    }
+    nieaktualne = [
+        (nazwa, pliki, funkcja) for nazwa, pliki, funkcja in sekcje
+        if not czy_w_cache(cache_dir, nazwa, skroty[nazwa])
+    ]
+
+    #Fragmenty lat (także sekcji aktualnych - żeby zostały w cache dla kolejnych zmian listy lat)
+    skroty_fragmentow = {
+        (nazwa, year): skrot_fragmentu(nazwa, pliki, year)
+        for nazwa, pliki, _ in sekcje if nazwa in FRAGMENTY_ROCZNE for year in years
+    }
+    pliki_fragmentow = {
+        (nazwa, year): os.path.join(cache_dir, f"{nazwa}_{year}_{skrot}.json")
+        for (nazwa, year), skrot in skroty_fragmentow.items()
+    }
+    brakujace_fragmenty = [
+        (nazwa, pliki, year) for nazwa, pliki, _ in nieaktualne if nazwa in FRAGMENTY_ROCZNE
+        for year in years if not os.path.exists(pliki_fragmentow[(nazwa, year)])
+    ]
+
+    #Dane wczytujemy tylko wtedy, gdy jakaś sekcja wymaga przeliczenia - dla sekcji z fragmentami tylko lata bez fragmentu
+    zadania = {(plik, year) for nazwa, pliki, _ in nieaktualne if nazwa not in FRAGMENTY_ROCZNE for plik in pliki for year in years}
+    zadania |= {(plik, year) for _, pliki, year in brakujace_fragmenty for plik in pliki}
+    if zadania:
+        rd.wczytaj_pliki(sorted(zadania))
+
+    for nazwa, _, year in brakujace_fragmenty:
+        with open(pliki_fragmentow[(nazwa, year)], "w", encoding="utf-8") as f:
+            json.dump({"dane": FRAGMENTY_ROCZNE[nazwa](year)}, f, ensure_ascii=False)
+
+    for nazwa, pliki, funkcja in nieaktualne:
+        if nazwa in FRAGMENTY_ROCZNE:
+            fragmenty = {}
+            for year in years:
+                with open(pliki_fragmentow[(nazwa, year)], encoding="utf-8") as f:
+                    fragmenty[year] = json.load(f)["dane"]
+            tekst, rysunki = funkcja(years, fig_path, fragmenty)
+        else:
+            tekst, rysunki = funkcja(years, fig_path)
+
+        if rysunki:
+            import matplotlib.pyplot as plt
+
+        for nazwa_rys, fig in rysunki.items():
+            fig.savefig(os.path.join(cache_dir, f"{nazwa}_{skroty[nazwa]}_{nazwa_rys}"), dpi=300, bbox_inches="tight")
+            plt.close(fig)
+
+        with open(os.path.join(cache_dir, f"{nazwa}_{skroty[nazwa]}.json"), "w", encoding="utf-8") as f:
+            json.dump({"tekst": tekst, "rysunki": list(rysunki)}, f, ensure_ascii=False)
+
+    #Składanie raportu z fragmentów i kopiowanie rysunków na ich docelowe miejsce
+    aktualne = {os.path.basename(path) for path in pliki_fragmentow.values()}
+    czesci = ["# Raport task 4\n\n"]
+    for nazwa, _, _ in sekcje:
+        with open(os.path.join(cache_dir, f"{nazwa}_{skroty[nazwa]}.json"), encoding="utf-8") as f:
+            fragment = json.load(f)
+        aktualne.add(f"{nazwa}_{skroty[nazwa]}.json")
+
+        for nazwa_rys in fragment["rysunki"]:
+            zrodlo = os.path.join(cache_dir, f"{nazwa}_{skroty[nazwa]}_{nazwa_rys}")
+            cel = os.path.join(fig_path, nazwa_rys)
+            if not os.path.exists(cel) or skrot_pliku(cel) != skrot_pliku(zrodlo):
+                shutil.copyfile(zrodlo, cel)
+            aktualne.add(os.path.basename(zrodlo))
+
+        czesci.append(fragment["tekst"])
+
+    wyczysc_cache(cache_dir, aktualne)
+
+    return "".join(czesci), [nazwa for nazwa, _, _ in nieaktualne]
@@ -1,72 +1,37 @@
-import raport_funkcje as fun
-
 import argparse
-import matplotlib.pyplot as plt
-
-
-parser = argparse.ArgumentParser()
-parser.add_argument("--years", nargs="+", type=int, required=True)
-parser.add_argument("--output", type=str, required=True)
-args = parser.parse_args()
-
-##fig_path = Path("results/report_misc/")
-##fig_path.parent.mkdir(parents=True, exist_ok=True)
-fig_path = "results/report_misc"
 
-#years = json.loads(args.years)
-years = args.years
+import historia_uruchomien as hist
 
-#(1) Dni z przekorczeniem
-df_ex_days = fun.combine_exceedence_days(years)
 
-#(2) "Literatura"
-df_literature = fun.combine_literature(years)
+def main(argv: list[str] | None = None) -> None:
+    #raport_sekcje importuje pandas - dopiero przy wywołaniu, nie przy imporcie skryptu
+    import raport_sekcje as sek
 
-#(3) Ile publications dla query
-df_query_hits = fun.combine_summary_by_year(years)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", nargs="+", type=int, required=True)
+    parser.add_argument("--output", type=str, required=True)
+    parser.add_argument("--backend", choices=sek.BACKENDY, default="matplotlib",
+                        help="tekst - sekcje z wykresami jako markdown i SVG, bez matplotlib")
+    args = parser.parse_args(argv)
 
-#(4) Trend liczby publikacji w czasie
-fig_trend = fun.trend_ppublish(years)
+    ##fig_path = Path("results/report_misc/")
+    ##fig_path.parent.mkdir(parents=True, exist_ok=True)
+    fig_path = "results/report_misc"
 
-fig_trend.savefig(f'{fig_path}/trend_line.png', dpi=300, bbox_inches="tight")
-plt.close(fig_trend)
+    #years = json.loads(args.years)
+    years = args.years
 
-#(5) Top czasopisma
-df_top_journals = fun.combine_top_journals(years)
+    #Sekcje (1)-(6) są brane z cache w results/report_misc/cache, jeśli ich dane wejściowe się nie zmieniły
+    with hist.pomiar("report_task4", "_".join(map(str, years))):
+        raport, przeliczone = sek.zbuduj_raport(years, fig_path, backend=args.backend)
+        hist.dolicz("cache_trafienia", len(sek.SEKCJE) - len(przeliczone))
+        hist.dolicz("cache_chybienia", len(przeliczone))
 
-#(6) Przykładowe tytuły
-fig_titles = fun.example_titles(years, 2)
+        print(f"Przeliczone sekcje raportu: {', '.join(przeliczone) if przeliczone else 'brak'}")
 
-fig_titles.savefig(f'{fig_path}/example_titles.png', dpi=300, bbox_inches="tight")
-plt.close(fig_titles)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(raport)
 
 
-with open(args.output, "w", encoding="utf-8") as f:
-    f.write("# Raport task 4\n\n")
-    #(1)
-    f.write("## Zestawienie exceedance_days dla wszystkich lat\n\n")
-    f.write("Dla każdej stacji w kolumnie oznaczonej odpowiednim rokiem, przedstawiono liczbę dni w których wystąpiło przekroczenie średniej dobowej normy stężenia PM2.5 (15 µg/m³).\n\n")
-    f.write("Zostały przedstwione tylko dane stacji dla których istniały pomiary z całego zakresu lat\n\n")
-    f.write(fun.df_to_markdown(df_ex_days))
-    f.write("\n\n")
-    #(2)
-    f.write("## Literatura\n\n")
-    f.write("Przykładowe publikacje, 10 z każddego roku\n\n")
-    f.write(fun.df_to_markdown(df_literature))
-    f.write("\n\n")
-    #(3)
-    f.write("## Liczba publikacji znalezionych dla zadanych zapytań\n\n")
-    f.write("Dla każdego zapytania, liczba znalezionych artykułow opublikowanych w danym roku\n\n")
-    f.write(fun.df_to_markdown(df_query_hits))
-    f.write("\n\n")
-    #(4)
-    f.write("## Trend liczby publikacji printów\n\n")
-    f.write(f"![Linia trendu publikacji]({fig_path}/trend_line.png)\n")
-    #(5)
-    f.write("## Czasopisma z top 10 ilością publikacji w danych latach\n")
-    f.write("Dla każdego czasopisma, przedstawiona: łączna liczba artykułów, liczba artykułów w poszczególnych latach\n\n")
-    f.write(fun.df_to_markdown(df_top_journals))
-    f.write("\n\n")
-    #(6)
-    f.write("## Przykładowe tytuły znalezionych publikacji\n\n")
-    f.write(f"![Przykładowe tytuły publikacji]({fig_path}/example_titles.png)\n")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
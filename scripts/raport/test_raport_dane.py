@@ -0,0 +1,42 @@
+import os
+import pandas as pd
+
+import raport_dane as rd
+
+
+def zapisz(path, df: pd.DataFrame, mtime_ns: int) -> str:
+    df.to_csv(path, index=False)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    return str(path)
+
+
+def test_wczytaj_csv_zapamietuje_niezmieniony_plik(tmp_path):
+    path = zapisz(tmp_path / "exceedance_days.csv",
+                  pd.DataFrame({"Miejscowosc_Stacja": ["Kraków_A"], "Ilosc dni z przekroczeniem": [3]}), 10**18)
+
+    pierwszy = rd.wczytaj_csv(path)
+    assert rd.wczytaj_csv(path) is pierwszy
+
+
+def test_wczytaj_csv_wczytuje_nadpisany_plik(tmp_path):
+    df = pd.DataFrame({"Miejscowosc_Stacja": ["Kraków_A"], "Ilosc dni z przekroczeniem": [3]})
+    path = zapisz(tmp_path / "exceedance_days.csv", df, 10**18)
+    assert rd.wczytaj_csv(path)["Ilosc dni z przekroczeniem"].tolist() == [3]
+
+    zapisz(path, df.assign(**{"Ilosc dni z przekroczeniem": [7]}), 10**18 + 1)
+    assert rd.wczytaj_csv(path)["Ilosc dni z przekroczeniem"].tolist() == [7]
+    #Poprzednia wersja pliku usunięta z pamięci
+    assert [k for k in rd._pamiec if k[0] == os.path.abspath(path)] == [(os.path.abspath(path), 10**18 + 1)]
+
+
+def test_wczytaj_csv_rok_publikacji_nieliczbowy(tmp_path):
+    path = zapisz(tmp_path / "pubmed_papers.csv", pd.DataFrame({
+        "PMID": ["1", "2", "3"],
+        "title": ["a", "b", "c"],
+        "ppublish_year": ["2019", "2019 Spring", None],
+    }), 10**18)
+
+    df = rd.wczytaj_csv(path)
+    assert str(df["ppublish_year"].dtype) == "Int64"
+    assert df["ppublish_year"].tolist()[0] == 2019
+    assert df["ppublish_year"].isna().tolist() == [False, True, True]
@@ -0,0 +1,20 @@
+import re
+import numpy as np
+import pandas as pd
+
+import raport_funkcje as fun
+
+
+def test_sparkline_przerwana_na_brakach():
+    svg = fun.sparkline_svg(pd.Series([1.0, np.nan, 3.0, 5.0], index=[2019, 2020, 2021, 2022]), szer=100, wys=20)
+
+    #Brak dzieli linię na dwie części i nie ma punktu, skala tylko z wartości bez braków
+    assert re.findall(r'<polyline points="([^"]*)"', svg) == ["4.0,16.0", "65.3,10.0 96.0,4.0"]
+    assert len(re.findall(r"<circle ", svg)) == 3
+    assert "nan" not in svg
+
+
+def test_sparkline_same_braki_i_stala_seria():
+    assert "<polyline" not in fun.sparkline_svg(pd.Series([np.nan, np.nan]))
+    #Stała seria rysowana w połowie wysokości
+    assert re.findall(r'<polyline points="([^"]*)"', fun.sparkline_svg(pd.Series([2.0, 2.0]), szer=100, wys=20)) == ["4.0,10.0 96.0,10.0"]
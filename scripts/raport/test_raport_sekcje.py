@@ -0,0 +1,102 @@
+import os
+import subprocess
+import sys
+import pandas as pd
+import pytest
+
+import raport_sekcje as sek
+
+LATA = [2019, 2020]
+
+
+def zapisz(path: str, df: pd.DataFrame) -> None:
+    #Kolejne zapisy tego samego pliku dostają nowszy czas modyfikacji także przy zgrubnym zegarze systemu plików
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    mtime_ns = os.stat(path).st_mtime_ns + 10**9 if os.path.exists(path) else None
+    df.to_csv(path, index=False)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def zapisz_przekroczenia(year: int, dni: list[int]) -> None:
+    zapisz(f"results/pm25/{year}/exceedance_days.csv",
+           pd.DataFrame({"Miejscowosc_Stacja": ["Kraków_A", "Gdańsk_C"], "Ilosc dni z przekroczeniem": dni}))
+
+
+@pytest.fixture
+def wyniki(tmp_path, monkeypatch) -> list[tuple[str, int]]:
+    #Wyniki pipeline'u dla dwóch lat w katalogu tymczasowym oraz lista policzonych fragmentów lat
+    monkeypatch.chdir(tmp_path)
+    for year in LATA:
+        zapisz_przekroczenia(year, [10, 3])
+        zapisz(f"results/literature/{year}/pubmed_papers.csv", pd.DataFrame({
+            "PMID": [1, 2, 3], "title": [f"Tytuł {year} {i}" for i in range(3)], "journal": ["J1", "J1", "J2"],
+            "ppublish_year": [year, year, year - 1], "authors": ["A", "B", "C"],
+        }))
+        zapisz(f"results/literature/{year}/summary_by_year.csv",
+               pd.DataFrame({"year": [year], "query": ["pm2.5"], "n_publications": [3]}))
+        zapisz(f"results/literature/{year}/top_journals.csv",
+               pd.DataFrame({"journal": ["J1", "J2"], "num_publications": [2, 1]}))
+
+    policzone = []
+    for nazwa, funkcja in list(sek.FRAGMENTY_ROCZNE.items()):
+        def licz(year, nazwa=nazwa, funkcja=funkcja):
+            policzone.append((nazwa, year))
+            return funkcja(year)
+        monkeypatch.setitem(sek.FRAGMENTY_ROCZNE, nazwa, licz)
+
+    os.makedirs(sek.FIG_PATH)
+    return policzone
+
+
+def test_niezmienione_dane_z_cache(wyniki):
+    raport, przeliczone = sek.zbuduj_raport(LATA, backend="tekst")
+    assert przeliczone == [nazwa for nazwa, _, _ in sek.SEKCJE]
+    assert sorted(wyniki) == sorted((nazwa, year) for nazwa in sek.FRAGMENTY_ROCZNE for year in LATA)
+
+    wyniki.clear()
+    raport_z_cache, przeliczone = sek.zbuduj_raport(LATA, backend="tekst")
+    assert przeliczone == []
+    assert wyniki == []
+    assert raport_z_cache == raport
+
+
+def test_zmiana_pliku_przelicza_fragment_roku(wyniki):
+    sek.zbuduj_raport(LATA, backend="tekst")
+    wyniki.clear()
+
+    zapisz_przekroczenia(2020, [12, 4])
+    raport, przeliczone = sek.zbuduj_raport(LATA, backend="tekst")
+
+    assert przeliczone == ["przekroczenia"]
+    assert wyniki == [("przekroczenia", 2020)]
+    assert "| Kraków_A             |     10 |     12 |" in raport
+
+
+def test_zmiana_backendu_przelicza_sekcje_z_rysunkami(wyniki):
+    sek.zbuduj_raport(LATA, backend="tekst")
+    wyniki.clear()
+
+    raport, przeliczone = sek.zbuduj_raport(LATA, backend="matplotlib")
+
+    #Fragmenty lat są wspólne dla obu backendów - przeliczane są tylko sekcje z wersją tekstową
+    assert sorted(przeliczone) == sorted(sek.SEKCJE_TEKSTOWE)
+    assert wyniki == []
+    assert os.path.exists(os.path.join(sek.FIG_PATH, "trend_line.png"))
+    assert f"]({sek.FIG_PATH}/example_titles.png)" in raport
+
+
+def test_backend_tekst_bez_matplotlib(wyniki):
+    #Osobny interpreter - w procesie testów matplotlib mógł już zostać zaimportowany przez inne testy
+    katalog = os.path.dirname(os.path.abspath(__file__))
+    kod = (
+        "import sys, raport_sekcje as sek\n"
+        f"raport, _ = sek.zbuduj_raport({LATA}, backend='tekst')\n"
+        "assert '<svg' in raport and '.png' not in raport, raport\n"
+        "assert not [m for m in sys.modules if m.split('.')[0] == 'matplotlib'], 'zaimportowano matplotlib'\n"
+    )
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([katalog, os.path.join(os.path.dirname(katalog), "PubMed"),
+                                                         os.path.join(os.path.dirname(katalog), "PM2,5")])}
+    wynik = subprocess.run([sys.executable, "-c", kod], env=env, capture_output=True, text=True)
+
+    assert wynik.returncode == 0, wynik.stderr
@@ -0,0 +1,203 @@
+import io
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from email.message import Message
+from typing import Any, Iterator
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+#Wspólna warstwa HTTP dla GIOŚ (requests) i NCBI (Bio.Entrez): jedna sesja na proces z pulą połączeń keep-alive
+#(kolejne zapytania do tego samego hosta nie otwierają nowego połączenia TCP/TLS), kompresją gzip, domyślnymi
+#limitami czasu i limitem jednoczesnych zapytań do jednego hosta - wspólnym dla wszystkich wątków procesu.
+#Sesja tworzona jest przy pierwszym zapytaniu i od nowa w procesie potomnym (fork wykonawcy zadań),
+#bo połączeń z puli rodzica nie wolno współdzielić.
+
+#(połączenie, odczyt) w sekundach
+TIMEOUT = (10, 60)
+DOMYSLNY_LIMIT_HOSTA = 4
+LIMITY_HOSTOW = {
+    #NCBI przyjmuje 3 zapytania/s bez klucza API - więcej jednoczesnych połączeń nic nie przyspieszy
+    "eutils.ncbi.nlm.nih.gov": 3,
+    "powietrze.gios.gov.pl": 4,
+}
+NAGLOWKI = {"Accept-Encoding": "gzip, deflate"}
+
+_blokada = threading.Lock()
+_stan = {"pid": None, "sesja": None, "semafory": {}}
+_statystyki = {}
+
+#-------------------------------------SESJA------------------------------------
+
+def sesja() -> requests.Session:
+    """
+    Funkcja zwraca wspólną sesję HTTP procesu (tworzy ją przy pierwszym użyciu i po fork)
+
+    :return: Sesja requests z pulą połączeń
+    """
+    with _blokada:
+        if _stan["pid"] != os.getpid():
+            nowa = requests.Session()
+            #Pula na host co najmniej tak duża, jak limit jednoczesnych zapytań - inaczej połączenia są zamykane
+            rozmiar = max([DOMYSLNY_LIMIT_HOSTA, *LIMITY_HOSTOW.values()])
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=rozmiar, max_retries=0)
+            nowa.mount("https://", adapter)
+            nowa.mount("http://", adapter)
+            nowa.headers.update(NAGLOWKI)
+            _stan.update(pid=os.getpid(), sesja=nowa, semafory={})
+            _statystyki.clear()
+        return _stan["sesja"]
+
+
+def ustaw_limit(host: str, limit: int) -> None:
+    """
+    Funkcja zmienia limit jednoczesnych zapytań do hosta (np. NCBI z kluczem API)
+
+    :param host: Nazwa hosta
+    :param limit: Maksymalna liczba jednoczesnych zapytań
+    """
+    with _blokada:
+        LIMITY_HOSTOW[host] = limit
+        _stan["semafory"].pop(host, None)
+
+
+@contextmanager
+def slot_hosta(url: str) -> Iterator[None]:
+    """
+    Kontekst zajmujący jedno z miejsc na jednoczesne zapytania do hosta z adresu (czeka, jeśli wszystkie są zajęte)
+
+    :param url: Adres zapytania
+    """
+    host = urlsplit(url).hostname or ""
+    sesja()
+    with _blokada:
+        semafor = _stan["semafory"].get(host)
+        if semafor is None:
+            semafor = threading.BoundedSemaphore(LIMITY_HOSTOW.get(host, DOMYSLNY_LIMIT_HOSTA))
+            _stan["semafory"][host] = semafor
+
+    with semafor:
+        yield
+
+#-------------------------------------ZAPYTANIA------------------------------------
+
+def dolicz(url: str, bajty: int, czas: float) -> None:
+    """
+    Funkcja dopisuje zapytanie do statystyk hosta
+
+    :param url: Adres zapytania
+    :param bajty: Liczba bajtów odebranych z sieci (przed rozpakowaniem gzip)
+    :param czas: Czas zapytania w sekundach
+    """
+    host = urlsplit(url).hostname or ""
+    with _blokada:
+        wpis = _statystyki.setdefault(host, {"zapytania": 0, "bajty": 0, "czas": 0.0})
+        wpis["zapytania"] += 1
+        wpis["bajty"] += bajty
+        wpis["czas"] += czas
+
+
+def statystyki() -> dict[str, dict[str, Any]]:
+    """
+    Funkcja zwraca statystyki zapytań bieżącego procesu
+
+    :return: Słownik host -> {zapytania, bajty, czas}
+    """
+    with _blokada:
+        return {host: dict(wpis) for host, wpis in _statystyki.items()}
+
+
+@contextmanager
+def zapytanie(metoda: str, url: str, **kwargs: Any) -> Iterator[requests.Response]:
+    """
+    Kontekst wykonujący zapytanie przez wspólną sesję, w limicie jednoczesnych zapytań do hosta.
+    Odpowiedź strumieniową (stream=True) należy przeczytać wewnątrz kontekstu - po wyjściu połączenie
+    wraca do puli, a miejsce hosta jest zwalniane.
+
+    :param metoda: Metoda HTTP
+    :param url: Adres
+    :param kwargs: Parametry requests (headers, data, stream, timeout, ...) - domyślny timeout TIMEOUT
+    :return: Odpowiedź
+    """
+    kwargs.setdefault("timeout", TIMEOUT)
+    with slot_hosta(url):
+        start = time.monotonic()
+        response = sesja().request(metoda, url, **kwargs)
+        try:
+            yield response
+        finally:
+            response.close()
+            dolicz(url, response.raw.tell() if response.raw is not None else 0, time.monotonic() - start)
+
+
+def pobierz(url: str, **kwargs: Any) -> requests.Response:
+    """
+    Funkcja wykonuje zapytanie GET i zwraca odpowiedź z przeczytaną treścią (błąd HTTP - wyjątek)
+
+    :param url: Adres
+    :param kwargs: Parametry requests (bez stream)
+    :return: Odpowiedź
+    """
+    with zapytanie("GET", url, **kwargs) as response:
+        response.raise_for_status()
+        return response
+
+#-------------------------------------ENTREZ------------------------------------
+
+class OdpowiedzEntrez(io.BytesIO):
+    """
+    Przeczytana odpowiedź w miejsce http.client.HTTPResponse z urllib (url, status, headers, read)
+    """
+
+    def __init__(self, response: requests.Response):
+        super().__init__(response.content)
+        self.url = response.url
+        self.status = self.code = response.status_code
+        self.headers = Message()
+        for klucz, wartosc in response.headers.items():
+            self.headers[klucz] = wartosc
+
+    def geturl(self) -> str:
+        return self.url
+
+    def getcode(self) -> int:
+        return self.status
+
+
+def urlopen_entrez(request: urllib.request.Request, *args: Any, **kwargs: Any) -> OdpowiedzEntrez:
+    """
+    Funkcja w miejsce urllib.request.urlopen używanego przez Bio.Entrez - zapytanie przez wspólną sesję.
+    Błędy zamieniane są na wyjątki urllib, więc ponowienia i limit zapytań Bio.Entrez działają bez zmian.
+    Odpowiedź czytana jest w całości (paczki E-utilities mają najwyżej kilka MB), żeby od razu zwolnić połączenie.
+
+    :param request: Zapytanie zbudowane przez Bio.Entrez
+    :return: Odpowiedź
+    """
+    try:
+        with zapytanie(request.get_method(), request.full_url, data=request.data,
+                       headers=dict(request.header_items())) as response:
+            odpowiedz = OdpowiedzEntrez(response)
+    except (requests.ConnectionError, requests.Timeout) as e:
+        raise urllib.error.URLError(e)
+
+    if odpowiedz.status >= 400:
+        raise urllib.error.HTTPError(odpowiedz.url, odpowiedz.status, response.reason, odpowiedz.headers, odpowiedz)
+
+    return odpowiedz
+
+
+def podlacz_entrez() -> None:
+    """
+    Funkcja kieruje zapytania Bio.Entrez przez wspólną sesję (raz na proces - kolejne wywołania nic nie zmieniają,
+    więc nie nadpisują np. przekierowania na lokalny serwer testowy)
+    """
+    from Bio import Entrez
+
+    if not getattr(Entrez, "sesja_http", False):
+        Entrez.urlopen = urlopen_entrez
+        Entrez.sesja_http = True
@@ -0,0 +1,67 @@
+import math
+import pandas as pd
+
+import historia_uruchomien as hist
+
+
+def historia(czasy: dict[str, list[float | None]], tryb: str = "proces") -> pd.DataFrame:
+    #Kolejne przebiegi (r0, r1, ...) z czasami reguł (None - reguła nie uruchomiona) - ostatni przebieg to porównywany
+    wiersze = []
+    for regula, wartosci in czasy.items():
+        for i, czas in enumerate(wartosci):
+            if czas is None:
+                continue
+            wiersze.append({
+                "uruchomienie": f"r{i}", "regula": regula, "klucz": "2024", "start": f"2026-01-{i + 1:02d}T12:00:00",
+                "status": "ok", "tryb": tryb, "czas_s": czas, "pamiec_mb": 100.0,
+            })
+    return pd.DataFrame(wiersze)
+
+
+def test_porownaj_za_malo_przebiegow():
+    wynik = hist.porownaj(historia({"jeden": [1.0, 5.0], "bez_bazy": [None, 5.0]})).set_index("regula")
+
+    #Jeden wcześniejszy przebieg - mediana i zmiana są, ale bez testu (p = NaN) i bez spowolnienia
+    assert wynik.loc["jeden", "n_bazowe"] == 1
+    assert wynik.loc["jeden", "zmiana_proc"] == 400.0
+    assert math.isnan(wynik.loc["jeden", "p"])
+    assert not wynik.loc["jeden", "spowolnienie"]
+
+    #Brak wcześniejszych przebiegów reguły - mediana NaN nie daje spowolnienia
+    assert wynik.loc["bez_bazy", "n_bazowe"] == 0
+    assert math.isnan(wynik.loc["bez_bazy", "czas_bazowy"])
+    assert math.isnan(wynik.loc["bez_bazy", "zmiana_proc"])
+    assert not wynik.loc["bez_bazy", "spowolnienie"]
+
+
+def test_porownaj_identyczne_czasy():
+    wynik = hist.porownaj(historia({"maly_wzrost": [10.0] * 5 + [10.5], "duzy_wzrost": [10.0] * 5 + [20.0],
+                                    "bez_zmian": [10.0] * 6})).set_index("regula")
+
+    #Zerowe odchylenie ograniczone do 1% - wzrost o 5% jest istotny, ale poniżej min_wzrost
+    assert wynik.loc["maly_wzrost", "p"] < hist.ALFA
+    assert not wynik.loc["maly_wzrost", "spowolnienie"]
+    assert wynik.loc["duzy_wzrost", "spowolnienie"]
+    assert wynik.loc["bez_zmian", "p"] == 0.5
+    assert not wynik.loc["bez_zmian", "spowolnienie"]
+
+
+def test_porownaj_mediana_nan():
+    #Brak czasu we wcześniejszym wpisie (NaN) - mediana i p nieokreślone, bez spowolnienia
+    wynik = hist.porownaj(historia({"braki": [10.0, math.nan, 10.0, 50.0]}))
+
+    assert wynik.loc[0, "n_bazowe"] == 3
+    assert math.isnan(wynik.loc[0, "czas_bazowy"])
+    assert math.isnan(wynik.loc[0, "zmiana_proc"])
+    assert math.isnan(wynik.loc[0, "p"])
+    assert not wynik.loc[0, "spowolnienie"]
+
+
+def test_porownaj_tylko_ten_sam_tryb():
+    #Przebiegi w wykonawcy zadań są krótsze (bez importów) - nie są bazą dla przebiegu w osobnym procesie
+    df = pd.concat([historia({"etap": [1.0] * 5}, tryb="wykonawca"), historia({"etap": [None] * 5 + [10.0]})])
+    wynik = hist.porownaj(df)
+
+    assert wynik.loc[0, "tryb"] == "proces"
+    assert wynik.loc[0, "n_bazowe"] == 0
+    assert not wynik.loc[0, "spowolnienie"]
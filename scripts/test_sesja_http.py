@@ -0,0 +1,109 @@
+import os
+import threading
+import urllib.error
+import urllib.request
+import pytest
+from Bio import Entrez
+
+import sesja_http
+import gios_serwer_lokalny as gsl
+import pubmed_serwer_lokalny as psl
+
+
+@pytest.fixture
+def serwer_eutils():
+    serwer = psl.uruchom_serwer(psl.korpus_syntetyczny(20), opoznienie=0.1)
+    yield serwer
+    serwer.shutdown()
+    serwer.server_close()
+
+
+def test_sesja_jedna_na_proces():
+    sesja = sesja_http.sesja()
+    assert sesja_http.sesja() is sesja
+
+    #Proces potomny (fork wykonawcy zadań) tworzy własną sesję zamiast używać połączeń z puli rodzica
+    odczyt, zapis = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            w_potomnym = sesja_http.sesja()
+            os.write(zapis, b"1" if w_potomnym is not sesja and sesja_http.sesja() is w_potomnym else b"0")
+        finally:
+            os._exit(0)
+    os.close(zapis)
+    wynik = os.read(odczyt, 1)
+    os.close(odczyt)
+    os.waitpid(pid, 0)
+
+    assert wynik == b"1"
+    assert sesja_http.sesja() is sesja
+
+
+def test_limit_jednoczesnych_zapytan_hosta(serwer_eutils, monkeypatch):
+    #Liczymy zapytania w toku na poziomie sesji - limit hosta musi je ograniczać niezależnie od liczby wątków
+    monkeypatch.setitem(sesja_http.LIMITY_HOSTOW, "127.0.0.1", 2)
+    monkeypatch.setitem(sesja_http._stan, "semafory", {})
+    sesja = sesja_http.sesja()
+    oryginalne = sesja.request
+    blokada = threading.Lock()
+    w_toku = {"teraz": 0, "max": 0}
+
+    def request(*args, **kwargs):
+        with blokada:
+            w_toku["teraz"] += 1
+            w_toku["max"] = max(w_toku["max"], w_toku["teraz"])
+        try:
+            return oryginalne(*args, **kwargs)
+        finally:
+            with blokada:
+                w_toku["teraz"] -= 1
+
+    monkeypatch.setattr(sesja, "request", request)
+    watki = [threading.Thread(target=sesja_http.pobierz, args=(serwer_eutils.url + "esearch.fcgi?term=q",)) for _ in range(6)]
+    for watek in watki:
+        watek.start()
+    for watek in watki:
+        watek.join()
+
+    assert w_toku["max"] == 2
+    assert serwer_eutils.statystyki["esearch"] == 6
+    #Połączenia keep-alive z puli - nie więcej niż limit hosta
+    assert serwer_eutils.statystyki["polaczenia"] <= 2
+
+
+def test_urlopen_entrez(serwer_eutils):
+    przed = sesja_http.statystyki().get("127.0.0.1", {"zapytania": 0})["zapytania"]
+    odpowiedz = sesja_http.urlopen_entrez(urllib.request.Request(serwer_eutils.url + "esearch.fcgi?term=q&retmax=5"))
+
+    #Odpowiedź jak z urllib - przeczytana i rozpakowana z gzip
+    assert odpowiedz.getcode() == 200
+    assert odpowiedz.headers["Content-Type"].startswith("text/xml")
+    assert b"<eSearchResult>" in odpowiedz.read()
+    assert sesja_http.statystyki()["127.0.0.1"]["zapytania"] == przed + 1
+
+    #Błędy HTTP jako wyjątki urllib - na nich opiera się obsługa ponowień Bio.Entrez
+    with pytest.raises(urllib.error.HTTPError) as e:
+        sesja_http.urlopen_entrez(urllib.request.Request(serwer_eutils.url + "einfo.fcgi"))
+    assert e.value.code == 404
+
+    serwer = gsl.uruchom_serwer({})
+    adres = serwer.url
+    serwer.shutdown()
+    serwer.server_close()
+    with pytest.raises(urllib.error.URLError):
+        sesja_http.urlopen_entrez(urllib.request.Request(adres + "582"))
+
+
+def test_przekieruj_entrez_przywraca_urlopen(serwer_eutils):
+    przed = Entrez.urlopen
+    podlaczony = getattr(Entrez, "sesja_http", False)
+
+    with psl.przekieruj_entrez(serwer_eutils.url):
+        Entrez.email = "random@mail.com"
+        with Entrez.esearch(db="pubmed", term="q", retmax=3) as uchwyt:
+            assert len(Entrez.read(uchwyt)["IdList"]) == 3
+
+    assert Entrez.urlopen is przed
+    assert getattr(Entrez, "sesja_http", False) == podlaczony
+    assert serwer_eutils.statystyki["esearch"] == 1
@@ -0,0 +1,115 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+import pytest
+
+import wykonawca
+
+SKRYPT = """import os, sys
+print("argv", sys.argv[1:])
+print("cwd", os.getcwd())
+print("wykonawca", os.environ.get("HISTORIA_WYKONAWCA"))
+print("blad", file=sys.stderr)
+sys.exit(int(sys.argv[1]))
+"""
+
+
+def czekaj(warunek, limit_s: float = 10) -> bool:
+    koniec = time.monotonic() + limit_s
+    while time.monotonic() < koniec:
+        if warunek():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def czy_dziala(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+@pytest.fixture
+def skrypt(tmp_path, monkeypatch) -> str:
+    #Wykonanie w bieżącym procesie zmienia sys.argv i sys.path - przywracane po teście
+    monkeypatch.setattr(sys, "argv", list(sys.argv))
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    monkeypatch.chdir(tmp_path)
+    sciezka = tmp_path / "zadanie.py"
+    sciezka.write_text(SKRYPT)
+    return str(sciezka)
+
+
+@pytest.fixture
+def gniazdo(tmp_path) -> str:
+    gniazdo = str(tmp_path / "w.sock")
+    wykonawca.uruchom_w_tle(gniazdo, log=str(tmp_path / "wykonawca.log"))
+    yield gniazdo
+    wykonawca.zatrzymaj(gniazdo)
+
+
+def test_zadanie_w_wykonawcy(gniazdo, skrypt, tmp_path, capfd):
+    kod = wykonawca.zlec(skrypt, ["3", "--opcja"], gniazdo)
+    wyjscie = capfd.readouterr()
+
+    #Kod wyjścia, stdout/stderr i katalog roboczy klienta - jak przy zwykłym wywołaniu skryptu
+    assert kod == 3
+    assert "argv ['3', '--opcja']" in wyjscie.out
+    assert f"cwd {tmp_path}" in wyjscie.out
+    assert "wykonawca 1" in wyjscie.out
+    assert "blad" in wyjscie.err
+
+    #Stan globalny zadania nie przechodzi na kolejne - każde zadanie w nowym procesie potomnym
+    assert wykonawca.zlec(skrypt, ["0"], gniazdo) == 0
+    assert "argv ['0']" in capfd.readouterr().out
+
+
+def test_bez_wykonawcy_w_biezacym_procesie(skrypt, tmp_path, capfd):
+    kod = wykonawca.zlec(skrypt, ["2"], str(tmp_path / "brak.sock"))
+    wyjscie = capfd.readouterr()
+
+    assert kod == 2
+    assert "argv ['2']" in wyjscie.out
+    assert "wykonawca None" in wyjscie.out
+
+
+def test_zakonczenie_klienta_konczy_zadanie(gniazdo, tmp_path):
+    plik_pid = tmp_path / "pid"
+    (tmp_path / "dlugie.py").write_text(
+        "import os, sys, time\n"
+        f"open({str(plik_pid)!r}, 'w').write(str(os.getpid()))\n"
+        "time.sleep(60)\n"
+    )
+    klient = subprocess.Popen(
+        [sys.executable, wykonawca.__file__, "--gniazdo", gniazdo, "uruchom", str(tmp_path / "dlugie.py")],
+        cwd=tmp_path
+    )
+    try:
+        assert czekaj(lambda: plik_pid.exists() and plik_pid.read_text())
+        pid = int(plik_pid.read_text())
+        assert pid != klient.pid
+
+        #Zabicie klienta (np. przerwanie reguły) zamyka jego koniec gniazda - SIGIO kończy proces zadania
+        klient.send_signal(signal.SIGKILL)
+        klient.wait()
+        assert czekaj(lambda: not czy_dziala(pid))
+    finally:
+        klient.kill()
+        klient.wait()
+
+
+def test_zatrzymaj(tmp_path, skrypt, capfd):
+    gniazdo = str(tmp_path / "w.sock")
+    wykonawca.uruchom_w_tle(gniazdo, log=str(tmp_path / "wykonawca.log"))
+
+    assert wykonawca.zatrzymaj(gniazdo)
+    assert czekaj(lambda: not os.path.exists(gniazdo))
+    assert not wykonawca.zatrzymaj(gniazdo)
+
+    #Po zatrzymaniu zlecenia wykonywane są w bieżącym procesie
+    assert wykonawca.zlec(skrypt, ["0"], gniazdo) == 0
+    assert "wykonawca None" in capfd.readouterr().out
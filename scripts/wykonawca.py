@@ -0,0 +1,331 @@
+import argparse
+import fcntl
+import importlib
+import json
+import os
+import runpy
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+#Wykonawca zadań pipeline'u - proces, który raz importuje ciężkie biblioteki (pandas, matplotlib, Bio, ...)
+#oraz moduły skryptów, a każde zlecone zadanie wykonuje w procesie potomnym (fork). Zadanie dostaje gotowe
+#importy, a stan globalny i błędy jednego zadania nie przechodzą na kolejne.
+#Klient przekazuje skrypt, argumenty, katalog roboczy, zmienne środowiskowe oraz swoje stdin/stdout/stderr
+#(przez gniazdo uniksowe), więc wyjście zadania trafia tam, gdzie przy zwykłym wywołaniu skryptu.
+#Gdy wykonawca nie działa, klient uruchamia skrypt sam - reguły działają tak samo, tylko wolniej.
+#Wykonawca musi pozostać jednowątkowy (fork kopiuje tylko wątek wywołujący, więc blokady trzymane przez inne wątki
+#zostałyby w procesie potomnym zajęte na zawsze) - dlatego wyłączany jest wątek tła alokatora pyarrow (jemalloc).
+#Zakończenie klienta (np. przerwanie reguły przez Snakemake) kończy też proces zadania.
+
+GNIAZDO = os.environ.get("WYKONAWCA_GNIAZDO", ".snakemake/wykonawca.sock")
+KATALOGI_SKRYPTOW = ["scripts", "scripts/PM2,5", "scripts/PubMed", "scripts/raport"]
+
+BIBLIOTEKI = [
+    "numpy", "pandas", "pyarrow.parquet", "yaml", "requests", "openpyxl",
+    "matplotlib.pyplot", "seaborn", "Bio.Entrez", "scipy.sparse",
+]
+MODULY_SKRYPTOW = [
+    "sesja_http", "historia_uruchomien", "stale_gios", "wczytywanie_i_czyszczenie_danych", "gios_pobieranie", "gios_katalog", "pm25_etapy", "pm25_stacje", "statystyki_stacji", "epizody_smogowe",
+    "srednie_dla_stacji_i_roku", "heatmap", "grouped_barplot",
+    "pubmed_funkcje", "pubmed_abstrakty", "pubmed_agregacja", "pubmed_kompakt", "pubmed_graf", "pubmed_indeks", "pubmed_nakladanie",
+    "raport_dane", "raport_funkcje", "raport_sekcje",
+]
+
+#----------------------------------------ZADANIE-------------------------------------------
+
+def wykonaj_skrypt(skrypt: str, argv: list[str]) -> int:
+    """
+    Funkcja wykonuje skrypt tak, jak przy wywołaniu "python3 skrypt argv..." (w bieżącym procesie)
+
+    :param skrypt: Ścieżka skryptu
+    :param argv: Argumenty skryptu
+    :return: Kod wyjścia
+    """
+    sys.argv = [skrypt] + list(argv)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(skrypt)))
+
+    try:
+        runpy.run_path(skrypt, run_name="__main__")
+        kod = 0
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            kod = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            kod = 1
+    except BaseException:
+        traceback.print_exc()
+        kod = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+    return kod
+
+
+def czy_zmieniony(nazwa: str, czas: float) -> bool:
+    try:
+        return os.path.getmtime(sys.modules[nazwa].__file__) != czas
+    except OSError:
+        return True
+
+
+def odswiez_zmienione(czasy: dict[str, float]) -> None:
+    #Moduły skryptów importują się nawzajem (np. "import wczytywanie_i_czyszczenie_danych as wicd") - po zmianie
+    #któregokolwiek z nich usuwamy z sys.modules wszystkie, inaczej niezmienione trzymałyby starą wersję zmienionego
+    if any(czy_zmieniony(nazwa, czas) for nazwa, czas in czasy.items() if nazwa in sys.modules):
+        for nazwa in czasy:
+            sys.modules.pop(nazwa, None)
+
+
+def wczytaj_moduly(katalog_repo: str) -> dict[str, float]:
+    """
+    Funkcja importuje biblioteki i moduły skryptów (koszt płacony raz na całe uruchomienie)
+
+    :param katalog_repo: Katalog główny repozytorium
+    :return: Słownik moduł skryptu -> czas modyfikacji pliku przy imporcie
+    """
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    #pyarrow (importowany przez pandas) uruchamia inaczej wątek tła jemalloc
+    os.environ.setdefault("JE_ARROW_MALLOC_CONF", "background_thread:false")
+    for katalog in KATALOGI_SKRYPTOW:
+        sys.path.append(os.path.join(katalog_repo, katalog))
+
+    for nazwa in BIBLIOTEKI:
+        try:
+            importlib.import_module(nazwa)
+        except ImportError:
+            pass
+
+    czasy = {}
+    for nazwa in MODULY_SKRYPTOW:
+        try:
+            modul = importlib.import_module(nazwa)
+        except Exception as e:
+            print(f"Wykonawca: pominięto moduł {nazwa} ({e})", file=sys.stderr)
+            continue
+        czasy[nazwa] = os.path.getmtime(modul.__file__)
+
+    return czasy
+
+
+def liczba_watkow() -> int:
+    #Wątki systemowe procesu (także te uruchomione przez biblioteki w C, niewidoczne w module threading)
+    try:
+        return len(os.listdir("/proc/self/task"))
+    except OSError:
+        return threading.active_count()
+
+#----------------------------------------PROTOKOL-------------------------------------------
+
+def wyslij_zlecenie(polaczenie: socket.socket, zlecenie: dict, fds: list[int]) -> None:
+    dane = json.dumps(zlecenie).encode("utf-8")
+    socket.send_fds(polaczenie, [struct.pack("!I", len(dane)) + dane], fds)
+
+
+def odbierz_zlecenie(polaczenie: socket.socket) -> tuple[dict, list[int]]:
+    dane, fds, _, _ = socket.recv_fds(polaczenie, 1 << 16, 3)
+    dlugosc = struct.unpack("!I", dane[:4])[0]
+    dane = dane[4:]
+    while len(dane) < dlugosc:
+        czesc = polaczenie.recv(dlugosc - len(dane))
+        if not czesc:
+            raise ConnectionError("Przerwane zlecenie")
+        dane += czesc
+
+    return json.loads(dane), fds
+
+#----------------------------------------WYKONAWCA-------------------------------------------
+
+def obsluz_zadanie(polaczenie: socket.socket, zlecenie: dict, fds: list[int], czasy: dict[str, float]) -> None:
+    #Proces potomny - przejmuje stdin/stdout/stderr, katalog i środowisko klienta
+    #Klient po wysłaniu zlecenia tylko czeka na kod wyjścia - zamknięcie jego końca gniazda (klient zakończony
+    #lub zabity) wyzwala SIGIO, którego domyślna akcja kończy proces zadania
+    signal.signal(signal.SIGIO, signal.SIG_DFL)
+    fcntl.fcntl(polaczenie.fileno(), fcntl.F_SETOWN, os.getpid())
+    fcntl.fcntl(polaczenie.fileno(), fcntl.F_SETFL, fcntl.fcntl(polaczenie.fileno(), fcntl.F_GETFL) | os.O_ASYNC)
+
+    for docelowy, fd in enumerate(fds):
+        os.dup2(fd, docelowy)
+        os.close(fd)
+    os.chdir(zlecenie["cwd"])
+    os.environ.clear()
+    os.environ.update(zlecenie["env"])
+    #Historia uruchomień zapisuje tryb zadania - pamięć i czas w wykonawcy nie są porównywalne z osobnym procesem
+    os.environ["HISTORIA_WYKONAWCA"] = "1"
+
+    odswiez_zmienione(czasy)
+    kod = wykonaj_skrypt(zlecenie["skrypt"], zlecenie["argv"])
+    polaczenie.sendall(str(kod).encode())
+
+
+def uruchom_wykonawce(gniazdo: str = GNIAZDO) -> None:
+    """
+    Funkcja uruchamia wykonawcę zadań - działa do polecenia "stop" lub sygnału SIGTERM
+
+    :param gniazdo: Ścieżka gniazda uniksowego
+    """
+    czasy = wczytaj_moduly(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    os.makedirs(os.path.dirname(gniazdo) or ".", exist_ok=True)
+    if os.path.exists(gniazdo):
+        os.unlink(gniazdo)
+    serwer = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    serwer.bind(gniazdo)
+    serwer.listen(64)
+
+    #Zakończone procesy potomne sprzątane automatycznie
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    if liczba_watkow() > 1:
+        print(f"Wykonawca: {liczba_watkow()} wątków po imporcie modułów - fork zadań nie jest bezpieczny", file=sys.stderr)
+    print(f"Wykonawca gotowy: {gniazdo} ({len(czasy)} modułów)", flush=True)
+
+    try:
+        while True:
+            polaczenie, _ = serwer.accept()
+            try:
+                zlecenie, fds = odbierz_zlecenie(polaczenie)
+            except (ConnectionError, ValueError, struct.error):
+                polaczenie.close()
+                continue
+
+            if zlecenie.get("polecenie") == "stop":
+                polaczenie.sendall(b"0")
+                polaczenie.close()
+                break
+
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                serwer.close()
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                try:
+                    obsluz_zadanie(polaczenie, zlecenie, fds, czasy)
+                finally:
+                    os._exit(0)
+
+            for fd in fds:
+                os.close(fd)
+            polaczenie.close()
+    finally:
+        serwer.close()
+        if os.path.exists(gniazdo):
+            os.unlink(gniazdo)
+
+#----------------------------------------KLIENT-------------------------------------------
+
+def polacz(gniazdo: str) -> socket.socket | None:
+    klient = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        klient.connect(gniazdo)
+    except (FileNotFoundError, ConnectionRefusedError):
+        klient.close()
+        return None
+    return klient
+
+
+def zlec(skrypt: str, argv: list[str], gniazdo: str = GNIAZDO) -> int:
+    """
+    Funkcja zleca wykonanie skryptu wykonawcy, a jeśli ten nie działa - wykonuje skrypt sama
+
+    :param skrypt: Ścieżka skryptu
+    :param argv: Argumenty skryptu
+    :param gniazdo: Ścieżka gniazda uniksowego
+    :return: Kod wyjścia skryptu
+    """
+    klient = polacz(gniazdo)
+    if klient is None:
+        return wykonaj_skrypt(skrypt, argv)
+
+    with klient:
+        zlecenie = {"skrypt": skrypt, "argv": list(argv), "cwd": os.getcwd(), "env": dict(os.environ)}
+        wyslij_zlecenie(klient, zlecenie, [0, 1, 2])
+
+        odpowiedz = b""
+        while czesc := klient.recv(64):
+            odpowiedz += czesc
+
+    #Brak odpowiedzi - proces zadania zakończył się bez zwrócenia kodu
+    return int(odpowiedz) if odpowiedz else 1
+
+
+def zatrzymaj(gniazdo: str = GNIAZDO) -> bool:
+    klient = polacz(gniazdo)
+    if klient is None:
+        return False
+    with klient:
+        wyslij_zlecenie(klient, {"polecenie": "stop"}, [])
+        klient.recv(1)
+    return True
+
+
+def uruchom_w_tle(gniazdo: str = GNIAZDO, log: str | None = None, limit_s: float = 120) -> None:
+    """
+    Funkcja uruchamia wykonawcę w tle (np. w onstart Snakemake) i czeka, aż zacznie przyjmować zadania
+
+    :param gniazdo: Ścieżka gniazda uniksowego
+    :param log: Plik z wyjściem wykonawcy (domyślnie obok gniazda)
+    :param limit_s: Maksymalny czas oczekiwania na start
+    """
+    klient = polacz(gniazdo)
+    if klient is not None:
+        klient.close()
+        return
+
+    log = log or f"{gniazdo}.log"
+    os.makedirs(os.path.dirname(log) or ".", exist_ok=True)
+    with open(log, "a") as f:
+        proces = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "start", "--gniazdo", gniazdo],
+            stdout=f, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, start_new_session=True
+        )
+
+    koniec = time.monotonic() + limit_s
+    while time.monotonic() < koniec:
+        if proces.poll() is not None:
+            raise RuntimeError(f"Wykonawca zakończył się przy starcie - szczegóły w {log}")
+        klient = polacz(gniazdo)
+        if klient is not None:
+            klient.close()
+            return
+        time.sleep(0.1)
+
+    raise TimeoutError(f"Wykonawca nie wystartował w {limit_s} s - szczegóły w {log}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--gniazdo", default=GNIAZDO)
+    polecenia = parser.add_subparsers(dest="polecenie", required=True)
+
+    p = polecenia.add_parser("start")
+    p.add_argument("--gniazdo", default=argparse.SUPPRESS)
+    p.add_argument("--tlo", action="store_true", help="Uruchom w tle i wróć, gdy wykonawca jest gotowy")
+
+    p = polecenia.add_parser("stop")
+    p.add_argument("--gniazdo", default=argparse.SUPPRESS)
+
+    p = polecenia.add_parser("uruchom")
+    p.add_argument("skrypt")
+    p.add_argument("argumenty", nargs=argparse.REMAINDER)
+
+    args = parser.parse_args()
+
+    if args.polecenie == "start":
+        if args.tlo:
+            uruchom_w_tle(args.gniazdo)
+        else:
+            uruchom_wykonawce(args.gniazdo)
+    elif args.polecenie == "stop":
+        zatrzymaj(args.gniazdo)
+    elif args.polecenie == "uruchom":
+        sys.exit(zlec(args.skrypt, args.argumenty, args.gniazdo))